@@ -0,0 +1,175 @@
+import statistics
+from client import client_defaut
+
+# Clé de l'état des agrégats dans le stockage du cache
+CLE_AGREGATS = "agregats"
+
+STATS = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+
+
+def resume_valeurs(valeurs: list, percentiles=(10, 25, 75, 90)) -> dict:
+    """Moyenne, médiane, min, max et percentiles d'une liste de valeurs."""
+    if not valeurs:
+        return {"nombre": 0}
+    resume = {
+        "nombre": len(valeurs),
+        "moyenne": statistics.fmean(valeurs),
+        "mediane": statistics.median(valeurs),
+        "min": min(valeurs),
+        "max": max(valeurs),
+    }
+    if len(valeurs) > 1:
+        quantiles = statistics.quantiles(valeurs, n=100, method="inclusive")
+        for p in percentiles:
+            resume[f"p{p}"] = quantiles[p - 1]
+    else:
+        for p in percentiles:
+            resume[f"p{p}"] = valeurs[0]
+    return resume
+
+
+def _trier(compteurs: dict, k: int = None) -> dict:
+    """Trie un dictionnaire {clé: nombre} par nombre décroissant et garde les k premiers."""
+    tries = sorted(compteurs.items(), key=lambda element: -element[1])
+    return dict(tries[:k] if k is not None else tries)
+
+
+class Agregateur:
+    """
+    Calcule en un seul passage sur des Pokémon (liste ou flux) :
+    - la fréquence de chaque type, des Pokémon à type unique et des doubles types ;
+    - pour chaque type, les statistiques de base (moyenne, médiane, percentiles) ;
+    - la distribution des tailles et des poids.
+    Chaque Pokémon n'est compté qu'une fois (par ID), ce qui permet d'ajouter
+    uniquement les nouveaux Pokémon du cache sans tout recalculer.
+    """
+
+    def __init__(self):
+        self.ids = set()
+        self.types = {}
+        self.types_uniques = {}
+        self.doubles_types = {}
+        self.valeurs_par_type = {}
+        self.tailles = []
+        self.poids = []
+
+    def ajouter(self, pokemon: dict) -> bool:
+        """Ajoute un Pokémon (fiche brute ou compacte). Retourne False s'il était déjà compté."""
+        if pokemon["id"] in self.ids:
+            return False
+        self.ids.add(pokemon["id"])
+
+        noms_types = [t["type"]["name"] for t in pokemon["types"]]
+        par_stat = {s["stat"]["name"]: s["base_stat"] for s in pokemon["stats"]}
+        for type_name in noms_types:
+            self.types[type_name] = self.types.get(type_name, 0) + 1
+            valeurs = self.valeurs_par_type.setdefault(type_name, {stat: [] for stat in STATS})
+            for stat in STATS:
+                valeurs[stat].append(par_stat.get(stat, 0))
+
+        if len(noms_types) == 1:
+            self.types_uniques[noms_types[0]] = self.types_uniques.get(noms_types[0], 0) + 1
+        else:
+            combinaison = "/".join(sorted(noms_types))
+            self.doubles_types[combinaison] = self.doubles_types.get(combinaison, 0) + 1
+
+        self.tailles.append(pokemon["height"])
+        self.poids.append(pokemon["weight"])
+        return True
+
+    def ajouter_tout(self, pokemons) -> "Agregateur":
+        for pokemon in pokemons:
+            self.ajouter(pokemon)
+        return self
+
+    # ---------- résultats ----------
+
+    def frequences_types(self, k: int = None) -> dict:
+        """Nombre de Pokémon ayant chaque type, du plus fréquent au moins fréquent."""
+        return _trier(self.types, k)
+
+    def frequences_types_uniques(self, k: int = None) -> dict:
+        """Nombre de Pokémon n'ayant que ce type."""
+        return _trier(self.types_uniques, k)
+
+    def frequences_doubles_types(self, k: int = None) -> dict:
+        """Nombre de Pokémon par combinaison de deux types (ex : "fire/flying")."""
+        return _trier(self.doubles_types, k)
+
+    def stats_par_type(self, type_name: str, stat: str) -> dict:
+        """Résumé (moyenne, médiane, percentiles) d'une statistique pour un type."""
+        return resume_valeurs(self.valeurs_par_type.get(type_name, {}).get(stat, []))
+
+    def classement_types(self, stat: str, critere: str = "moyenne", k: int = None) -> list:
+        """Types triés par la moyenne (ou médiane, p90...) d'une statistique : [(type, valeur), ...]."""
+        valeurs = [(t, self.stats_par_type(t, stat)[critere]) for t in self.valeurs_par_type]
+        valeurs.sort(key=lambda element: -element[1])
+        return valeurs[:k] if k is not None else valeurs
+
+    def distribution(self, mesure: str) -> dict:
+        """Résumé de la distribution des tailles ("height") ou des poids ("weight")."""
+        return resume_valeurs(self.tailles if mesure == "height" else self.poids)
+
+    def resultats(self) -> dict:
+        return {
+            "nombre": len(self.ids),
+            "types": self.frequences_types(),
+            "types_uniques": self.frequences_types_uniques(),
+            "doubles_types": self.frequences_doubles_types(),
+            "stats_par_type": {
+                t: {stat: self.stats_par_type(t, stat) for stat in STATS} for t in self.valeurs_par_type
+            },
+            "height": self.distribution("height"),
+            "weight": self.distribution("weight"),
+        }
+
+    # ---------- persistance et mise à jour incrémentale ----------
+
+    def etat(self) -> dict:
+        return {
+            "ids": sorted(self.ids),
+            "types": self.types,
+            "types_uniques": self.types_uniques,
+            "doubles_types": self.doubles_types,
+            "valeurs_par_type": self.valeurs_par_type,
+            "tailles": self.tailles,
+            "poids": self.poids,
+        }
+
+    @classmethod
+    def depuis_etat(cls, etat: dict) -> "Agregateur":
+        agregateur = cls()
+        agregateur.ids = set(etat["ids"])
+        agregateur.types = etat["types"]
+        agregateur.types_uniques = etat["types_uniques"]
+        agregateur.doubles_types = etat["doubles_types"]
+        agregateur.valeurs_par_type = etat["valeurs_par_type"]
+        agregateur.tailles = etat["tailles"]
+        agregateur.poids = etat["poids"]
+        return agregateur
+
+
+def charger_agregats() -> Agregateur:
+    """Charge les agrégats sauvegardés dans le cache (ou un agrégateur vide)."""
+    etat = client_defaut().stockage.lire(CLE_AGREGATS)
+    return Agregateur.depuis_etat(etat) if etat else Agregateur()
+
+
+def mettre_a_jour_agregats() -> Agregateur:
+    """
+    Ajoute aux agrégats sauvegardés les Pokémon arrivés dans le cache depuis la dernière
+    mise à jour (seules leurs fiches sont lues), puis sauvegarde le résultat.
+    """
+    client = client_defaut()
+    agregateur = charger_agregats()
+    ids_en_cache = set()
+    for cle in client.stockage.cles():
+        id_pokemon = cle[len("compact_"):] if cle.startswith("compact_") else cle
+        if id_pokemon.isdigit():
+            ids_en_cache.add(int(id_pokemon))
+    nouveaux = sorted(ids_en_cache - agregateur.ids)
+    if nouveaux:
+        # La fiche compacte est dérivée de la réponse brute si besoin : aucun accès réseau
+        agregateur.ajouter_tout(client.pokemons_compacts(nouveaux).values())
+        client.stockage.ecrire(CLE_AGREGATS, agregateur.etat())
+    return agregateur
@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+# Requêtes mesurées par le scénario "requetes"
+REQUETES = [
+    "type=fire",
+    "speed>100 sort=-speed limit=10",
+    "type=water,grass attack>=80 sort=-total,id",
+    "total>500 sort=-attack limit=20",
+    "hp<50 defense>60",
+]
+
+# Scénarios, dans l'ordre d'exécution. Chaque scénario tourne dans un nouvel interpréteur ;
+# ceux d'un même groupe partagent un dossier de travail (le cache du premier sert aux suivants).
+SCENARIOS = {
+    "download_froid": "telechargement",
+    "download_chaud": "telechargement",
+    "rafraichissement": "telechargement",
+    "sprites": "telechargement",
+    "fiches": "telechargement",
+    "cartes": "telechargement",
+    "requetes": "telechargement",
+    "agregation": "telechargement",
+    "export": "telechargement",
+    "classement": "telechargement",
+    "calcul_stats": "telechargement",
+    "plage_froid": "plage",
+    "plage_chaud": "plage",
+}
+
+
+# ================================================
+# SCÉNARIOS (exécutés dans le processus fils)
+# ================================================
+
+def _chrono(fonction, *args) -> float:
+    debut = time.perf_counter()
+    fonction(*args)
+    return time.perf_counter() - debut
+
+
+def executer_scenario(nom: str, nombre: int, workers: int) -> dict:
+    """
+    Exécute un scénario dans le dossier courant, avec POKEAPI_URL pointant vers le serveur simulé.
+    Retourne {"operations": n, "duree": s} et, pour les mesures de latence, la liste "latences".
+    """
+    if nom in ("download_froid", "download_chaud"):
+        from cache import download_pokemons
+        # Tout l'appel est mesuré : à chaud, c'est la vérification des entrées existantes qui compte
+        debut = time.perf_counter()
+        resume = download_pokemons(1, nombre, workers, progression=False)
+        return {"operations": nombre, "duree": time.perf_counter() - debut, "echecs": len(resume["echecs"])}
+
+    if nom == "rafraichissement":
+        import metriques
+        from cache import rafraichir_cache
+        metriques.activer()
+        resume = rafraichir_cache(workers, progression=False)
+        operations = resume["inchangees"] + len(resume["modifiees"])
+        return {"operations": operations, "duree": resume["duree"], "echecs": len(resume["echecs"]),
+                "octets": metriques.rapport()["compteurs"].get("octets_transferes", 0)}
+
+    if nom == "sprites":
+        from sprites import MagasinSprites, urls_sprites
+        urls = urls_sprites(range(1, nombre + 1), workers)
+        resume = MagasinSprites().telecharger(urls, workers)
+        return {"operations": len(urls), "duree": resume["duree"], "echecs": len(resume["echecs"]),
+                "doublons": resume["doublons"]}
+
+    if nom in ("plage_froid", "plage_chaud"):
+        from pokestats import recuperer_pokemons_plage
+        debut = time.perf_counter()
+        try:
+            pokemons = recuperer_pokemons_plage(1, nombre)
+        except (OSError, ValueError):  # erreur simulée par le serveur, non rattrapée par le client
+            return {"operations": nombre, "duree": time.perf_counter() - debut, "echecs": 1}
+        return {"operations": len(pokemons), "duree": time.perf_counter() - debut}
+
+    if nom == "fiches":
+        from pokefiche import pokefiche
+        ids = range(1, nombre + 1)
+        # Premier passage non mesuré : espèces et types arrivent dans le cache
+        for i in ids:
+            pokefiche(i, "fiches", ouvrir=False, bavard=False)
+        duree = _chrono(lambda: [pokefiche(i, "fiches", ouvrir=False, bavard=False) for i in ids])
+        return {"operations": nombre, "duree": duree}
+
+    if nom == "cartes":
+        from client import client_defaut
+        from pokestats import generer_carte_pokemon
+        from traductions import id_depuis_url, nom_espece
+        pokemons = list(client_defaut().pokemons_compacts(range(1, nombre + 1)).values())
+        noms = [nom_espece(id_depuis_url(p["species"]["url"])) or p["name"] for p in pokemons]
+        os.makedirs("cartes", exist_ok=True)
+        debut = time.perf_counter()
+        for pokemon, nom_francais in zip(pokemons, noms):
+            generer_carte_pokemon(pokemon, nom_francais, os.path.join("cartes", f"{pokemon['id']}.html"), ouvrir=False)
+        return {"operations": len(pokemons), "duree": time.perf_counter() - debut}
+
+    if nom == "requetes":
+        from requete import charger_index
+        duree_index = _chrono(charger_index)
+        index = charger_index()
+        latences = []
+        for _ in range(20):
+            for requete in REQUETES:
+                latences.append(_chrono(index.executer, requete))
+        return {"operations": len(latences), "duree": sum(latences), "latences": latences,
+                "construction_index": duree_index}
+
+    if nom == "agregation":
+        from agregation import Agregateur
+        from client import client_defaut
+        pokemons = list(client_defaut().pokemons_compacts(range(1, nombre + 1)).values())
+        latences = [_chrono(lambda: Agregateur().ajouter_tout(pokemons).resultats()) for _ in range(20)]
+        return {"operations": len(latences), "duree": sum(latences), "latences": latences}
+
+    if nom == "classement":
+        import classement
+        from requete import charger_index
+        charger_index()
+        matrice = classement.depuis_index()
+        # 16 formules pondérées évaluées en un lot, un tri sur trois clés, des fronts de Pareto
+        criteres = [{"attack": 1, "special-attack": a / 4, "speed": (15 - a) / 4} for a in range(16)]
+        latences = []
+        for _ in range(20):
+            latences.append(_chrono(classement.top_k_lot, matrice, criteres, 10))
+            latences.append(_chrono(classement.tri_lexicographique, matrice, [("speed", True), ("attack", True), ("total", False)]))
+            latences.append(_chrono(classement.front_pareto, matrice, ["attack", "speed"]))
+            latences.append(_chrono(classement.front_pareto, matrice, ["hp", "attack", "defense", "speed"]))
+        return {"operations": len(latences), "duree": sum(latences), "latences": latences}
+
+    if nom == "calcul_stats":
+        from calcul_stats import NATURES, REPARTITIONS, grille
+        from classement import depuis_index
+        valeurs = depuis_index().valeurs
+        # Pokédex entier x 3 niveaux x 25 natures x toutes les répartitions d'EV
+        latences = [_chrono(grille, valeurs, (50, 75, 100), NATURES, tuple(REPARTITIONS)) for _ in range(20)]
+        return {"operations": len(latences), "duree": sum(latences), "latences": latences}
+
+    if nom == "export":
+        from export_binaire import charger, exporter
+        duree_export = exporter(1, nombre, "export", workers=workers)["duree"]
+        latences = [_chrono(charger, "export") for _ in range(20)]
+        return {"operations": len(latences), "duree": sum(latences), "latences": latences,
+                "construction_export": duree_export}
+
+    raise ValueError(f"Scénario inconnu : {nom}")
+
+
+# ================================================
+# ORCHESTRATION
+# ================================================
+
+def lancer_scenario(nom: str, dossier: str, url: str, nombre: int, workers: int, stockage: str) -> dict:
+    """Lance un scénario dans un nouvel interpréteur (aucun cache mémoire partagé entre scénarios)."""
+    env = dict(os.environ, POKEAPI_URL=url, POKE_STOCKAGE=stockage, PYTHONPATH=RACINE, MPLBACKEND="Agg")
+    env.pop("POKE_TTL", None)
+    resultat = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--interne", nom,
+         "--nombre", str(nombre), "--workers", str(workers)],
+        cwd=dossier, env=env, capture_output=True, text=True,
+    )
+    if resultat.returncode != 0:
+        raise RuntimeError(f"Scénario {nom} en échec :\n{resultat.stderr}")
+    return json.loads(resultat.stdout.strip().splitlines()[-1])
+
+
+def resumer(mesures: list) -> dict:
+    """Médiane, min et max des répétitions d'un scénario."""
+    durees = [m["duree"] for m in mesures]
+    resume = {
+        "operations": mesures[0]["operations"],
+        "duree_mediane_s": statistics.median(durees),
+        "duree_min_s": min(durees),
+        "duree_max_s": max(durees),
+        "debit_par_s": mesures[0]["operations"] / statistics.median(durees) if statistics.median(durees) else None,
+    }
+    latences = [latence for m in mesures for latence in m.get("latences", [])]
+    if latences:
+        latences.sort()
+        resume["latence_mediane_us"] = statistics.median(latences) * 1e6
+        resume["latence_p90_us"] = latences[int(0.9 * (len(latences) - 1))] * 1e6
+    if "octets" in mesures[0]:
+        resume["octets_transferes"] = statistics.median(m["octets"] for m in mesures)
+    if "doublons" in mesures[0]:
+        resume["doublons"] = mesures[0]["doublons"]
+    echecs = sum(m.get("echecs", 0) for m in mesures)
+    if echecs:
+        resume["echecs"] = echecs
+    return resume
+
+
+def lancer(nombre: int = 151, repetitions: int = 3, workers: int = 8, latence: float = 0.0,
+           taux_erreur: float = 0.0, remplissage: int = 0, graine: int = 0, stockage: str = "sqlite",
+           scenarios: list = None, statut_erreur: int = 503) -> dict:
+    """Démarre le serveur simulé et exécute chaque scénario repetitions fois. Retourne le rapport."""
+    from serveur_mock import demarrer_serveur
+
+    scenarios = scenarios or list(SCENARIOS)
+    serveur = demarrer_serveur(latence, taux_erreur, remplissage, graine, statut_erreur=statut_erreur)
+    serveur.donnees.prechauffer(nombre)
+    mesures = {nom: [] for nom in scenarios}
+    try:
+        for _ in range(repetitions):
+            dossiers = {}
+            try:
+                for nom in scenarios:
+                    groupe = SCENARIOS[nom]
+                    if groupe not in dossiers:
+                        dossiers[groupe] = tempfile.mkdtemp(prefix=f"bench_{groupe}_")
+                    mesures[nom].append(lancer_scenario(nom, dossiers[groupe], serveur.url, nombre, workers, stockage))
+            finally:
+                for dossier in dossiers.values():
+                    shutil.rmtree(dossier, ignore_errors=True)
+    finally:
+        serveur.shutdown()
+
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plateforme": platform.platform(),
+        "parametres": {
+            "nombre": nombre, "repetitions": repetitions, "workers": workers, "latence": latence,
+            "taux_erreur": taux_erreur, "statut_erreur": statut_erreur, "remplissage": remplissage, "graine": graine, "stockage": stockage,
+        },
+        "serveur": {"requetes": serveur.requetes, "octets": serveur.octets},
+        "scenarios": {nom: resumer(m) for nom, m in mesures.items()},
+    }
+
+
+def comparer(rapport: dict, reference: dict, tolerance: float) -> list:
+    """Scénarios dont la durée médiane dépasse celle de la référence de plus de tolerance (ex : 0.2 = 20 %)."""
+    regressions = []
+    for nom, mesure in rapport["scenarios"].items():
+        ancienne = reference.get("scenarios", {}).get(nom)
+        if ancienne and ancienne["duree_mediane_s"]:
+            ratio = mesure["duree_mediane_s"] / ancienne["duree_mediane_s"]
+            mesure["ratio_reference"] = ratio
+            if ratio > 1 + tolerance:
+                regressions.append(nom)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks contre une PokéAPI simulée en local.")
+    parser.add_argument("scenarios", nargs="*", help=f"Scénarios à mesurer (défaut : tous) parmi {', '.join(SCENARIOS)}")
+    parser.add_argument("--nombre", type=int, default=151, help="Nombre de Pokémon par scénario")
+    parser.add_argument("--repetitions", type=int, default=3, help="Nombre d'exécutions de chaque scénario")
+    parser.add_argument("--workers", type=int, default=8, help="Nombre de téléchargements simultanés")
+    parser.add_argument("--latence", type=float, default=0.0, help="Latence du serveur par requête (secondes)")
+    parser.add_argument("--taux-erreur", type=float, default=0.0, help="Proportion de réponses en erreur du serveur")
+    parser.add_argument("--statut-erreur", type=int, default=503, help="Code HTTP des erreurs simulées (ex : 429)")
+    parser.add_argument("--remplissage", type=int, default=0, help="Octets ajoutés à chaque fiche Pokémon")
+    parser.add_argument("--graine", type=int, default=0, help="Graine du tirage des erreurs")
+    parser.add_argument("--stockage", default="sqlite", choices=["sqlite", "repertoire"], help="Backend du cache")
+    parser.add_argument("--sortie", help="Fichier JSON où écrire le rapport (défaut : sortie standard)")
+    parser.add_argument("--reference", help="Rapport JSON d'une version précédente à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Ralentissement toléré par rapport à la référence")
+    parser.add_argument("--interne", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interne:
+        print(json.dumps(executer_scenario(args.interne, args.nombre, args.workers)))
+        sys.exit(0)
+
+    inconnus = [nom for nom in args.scenarios if nom not in SCENARIOS]
+    if inconnus:
+        parser.error(f"scénarios inconnus : {', '.join(inconnus)}")
+
+    rapport = lancer(args.nombre, args.repetitions, args.workers, args.latence, args.taux_erreur,
+                     args.remplissage, args.graine, args.stockage, args.scenarios, args.statut_erreur)
+    regressions = []
+    if args.reference:
+        with open(args.reference, "r") as f:
+            regressions = comparer(rapport, json.load(f), args.tolerance)
+
+    texte = json.dumps(rapport, indent=2)
+    if args.sortie:
+        with open(args.sortie, "w") as f:
+            f.write(texte + "\n")
+    else:
+        print(texte)
+    for nom, mesure in rapport["scenarios"].items():
+        ratio = f"  x{mesure['ratio_reference']:.2f}" if "ratio_reference" in mesure else ""
+        print(f"{nom:<16} {mesure['duree_mediane_s'] * 1000:>10.1f} ms  {mesure['debit_par_s'] or 0:>10.1f} /s{ratio}",
+              file=sys.stderr)
+    if regressions:
+        print(f"Régressions : {', '.join(regressions)}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
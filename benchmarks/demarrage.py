@@ -0,0 +1,84 @@
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Budget de temps d'import (en millisecondes) de chaque point d'entrée
+BUDGETS = {
+    "pokestats": 120,
+    "pokefiche": 120,
+    "cache": 120,
+    "client": 80,
+    "stockage": 60,
+}
+
+# Modules lourds qui ne doivent pas être chargés par un simple import
+INTERDITS = ["matplotlib", "markdown", "requests", "numpy", "webbrowser"]
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def mesurer_import(module: str) -> tuple:
+    """
+    Importe le module dans un nouvel interpréteur avec -X importtime.
+    Retourne (temps cumulé en ms, liste des modules importés).
+    """
+    resultat = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=RACINE, capture_output=True, text=True, check=True,
+    )
+    cumule = None
+    importes = []
+    for ligne in resultat.stderr.splitlines():
+        morceaux = re.match(r"import time:\s*(\d+) \|\s*(\d+) \|(\s*)(\S+)", ligne)
+        if not morceaux:
+            continue
+        importes.append(morceaux.group(4))
+        if morceaux.group(4) == module and len(morceaux.group(3)) == 1:
+            cumule = int(morceaux.group(2)) / 1000
+    return cumule, importes
+
+
+def mesurer(modules: list, repetitions: int) -> dict:
+    """Mesure chaque module repetitions fois et garde la médiane."""
+    rapport = {}
+    for module in modules:
+        temps = []
+        importes = []
+        for _ in range(repetitions):
+            cumule, importes = mesurer_import(module)
+            temps.append(cumule)
+        lourds = sorted({m.split(".")[0] for m in importes} & set(INTERDITS))
+        rapport[module] = {
+            "mediane_ms": round(statistics.median(temps), 2),
+            "min_ms": round(min(temps), 2),
+            "budget_ms": BUDGETS.get(module),
+            "modules_lourds": lourds,
+        }
+        rapport[module]["ok"] = not lourds and (
+            rapport[module]["budget_ms"] is None
+            or rapport[module]["mediane_ms"] <= rapport[module]["budget_ms"]
+        )
+    return rapport
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesurer le temps d'import des points d'entrée.")
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS), help="Modules à mesurer")
+    parser.add_argument("--repetitions", type=int, default=7, help="Nombre de mesures par module")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args()
+
+    rapport = mesurer(args.modules, args.repetitions)
+    if args.json:
+        print(json.dumps(rapport, indent=2))
+    else:
+        for module, mesure in rapport.items():
+            etat = "OK" if mesure["ok"] else "DÉPASSEMENT"
+            lourds = f" (charge {', '.join(mesure['modules_lourds'])})" if mesure["modules_lourds"] else ""
+            print(f"{module:<10} {mesure['mediane_ms']:>8.1f} ms / budget {mesure['budget_ms']} ms  {etat}{lourds}")
+
+    sys.exit(0 if all(mesure["ok"] for mesure in rapport.values()) else 1)
@@ -0,0 +1,287 @@
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import zlib
+import random
+import struct
+import argparse
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Types de PokéAPI (ID -> nom anglais, nom français), utilisés pour les fiches /type/
+TYPES = [
+    ("normal", "Normal"), ("fighting", "Combat"), ("flying", "Vol"), ("poison", "Poison"),
+    ("ground", "Sol"), ("rock", "Roche"), ("bug", "Insecte"), ("ghost", "Spectre"),
+    ("steel", "Acier"), ("fire", "Feu"), ("water", "Eau"), ("grass", "Plante"),
+    ("electric", "Électrik"), ("psychic", "Psy"), ("ice", "Glace"), ("dragon", "Dragon"),
+    ("dark", "Ténèbres"), ("fairy", "Fée"),
+]
+
+_ROUTE = re.compile(r"^/api/v2/(pokemon|pokemon-species|type)/?([^/?]*)/?(encounters)?/?(\?.*)?$")
+_ROUTE_SPRITE = re.compile(r"^/sprites/pokemon/(\d+)\.png$")
+
+
+def image_png(couleur: tuple, taille: int = 96) -> bytes:
+    """PNG valide d'une couleur unie (les sprites servis par le serveur)."""
+    def bloc(nature: bytes, donnees: bytes) -> bytes:
+        return struct.pack(">I", len(donnees)) + nature + donnees + struct.pack(">I", zlib.crc32(nature + donnees))
+    lignes = (b"\x00" + bytes(couleur) * taille) * taille
+    return (b"\x89PNG\r\n\x1a\n" + bloc(b"IHDR", struct.pack(">IIBBBBB", taille, taille, 8, 2, 0, 0, 0))
+            + bloc(b"IDAT", zlib.compress(lignes)) + bloc(b"IEND", b""))
+
+
+class DonneesMock:
+    """
+    Données servies par le serveur, tirées des fichiers du cache du dépôt (fixtures).
+    Les IDs absents des fixtures sont synthétisés à partir d'un Pokémon existant,
+    pour pouvoir mesurer des plages aussi grandes que le vrai Pokédex.
+    Si url_sprites est renseignée, les sprites pointent vers le serveur lui-même ; ceux d'un
+    Pokémon synthétisé sont identiques à ceux de son modèle (images en double, sous d'autres URL).
+    """
+
+    def __init__(self, dossier: str = None, remplissage: int = 0):
+        dossier = dossier or os.path.join(RACINE, "cache")
+        self.remplissage = remplissage
+        self.pokemons = {}
+        self.especes = {}
+        for nom in os.listdir(dossier):
+            if not nom.endswith(".json"):
+                continue
+            cle = nom[:-5]
+            try:
+                with open(os.path.join(dossier, nom), "r") as f:
+                    donnees = json.load(f)
+            except ValueError:
+                continue
+            if cle.isdigit():
+                self.pokemons[int(cle)] = donnees
+            elif cle.startswith("espece_") and cle[len("espece_"):].isdigit():
+                self.especes[int(cle[len("espece_"):])] = donnees
+        self.modeles = sorted(self.pokemons)
+        self.modeles_especes = sorted(self.especes)
+        self.url_sprites = None
+        self._corps = {}
+        self._verrou = threading.Lock()
+
+    def _modele(self, id_pokemon: int) -> int:
+        return id_pokemon if id_pokemon in self.pokemons else self.modeles[id_pokemon % len(self.modeles)]
+
+    def pokemon(self, id_pokemon: int) -> dict:
+        if id_pokemon in self.pokemons:
+            donnees = dict(self.pokemons[id_pokemon])
+        else:
+            modele = self.pokemons[self._modele(id_pokemon)]
+            donnees = dict(modele, id=id_pokemon, name=f"pokemon-{id_pokemon}")
+        if self.url_sprites:
+            donnees["sprites"] = dict(donnees["sprites"], front_default=f"{self.url_sprites}/pokemon/{id_pokemon}.png")
+        donnees["species"] = {
+            "name": donnees["name"],
+            "url": f"https://pokeapi.co/api/v2/pokemon-species/{id_pokemon}/",
+        }
+        if self.remplissage:
+            donnees["remplissage"] = "x" * self.remplissage
+        return donnees
+
+    def espece(self, id_espece: int) -> dict:
+        if id_espece in self.especes:
+            return self.especes[id_espece]
+        modele = self.especes[self.modeles_especes[id_espece % len(self.modeles_especes)]]
+        noms = [dict(n, name=f"{n['name']} {id_espece}") for n in modele["names"]]
+        return dict(modele, id=id_espece, name=f"pokemon-{id_espece}", names=noms)
+
+    def type(self, id_ou_nom: str) -> dict:
+        for numero, (nom, nom_fr) in enumerate(TYPES, start=1):
+            if id_ou_nom in (str(numero), nom):
+                return {
+                    "id": numero,
+                    "name": nom,
+                    "names": [
+                        {"language": {"name": "fr"}, "name": nom_fr},
+                        {"language": {"name": "en"}, "name": nom.capitalize()},
+                    ],
+                }
+        return None
+
+    def liste_types(self) -> dict:
+        return {
+            "count": len(TYPES),
+            "results": [
+                {"name": nom, "url": f"https://pokeapi.co/api/v2/type/{numero}/"}
+                for numero, (nom, _) in enumerate(TYPES, start=1)
+            ],
+        }
+
+    def corps(self, chemin: str):
+        """Retourne le JSON encodé d'un chemin de l'API, ou None s'il n'existe pas."""
+        with self._verrou:
+            if chemin in self._corps:
+                return self._corps[chemin]
+        route = _ROUTE.match(chemin)
+        if not route:
+            return None
+        ressource, identifiant, rencontres, _ = route.groups()
+        donnees = None
+        if ressource == "type":
+            donnees = self.type(identifiant) if identifiant else self.liste_types()
+        elif identifiant.isdigit() and int(identifiant) > 0:
+            if rencontres:
+                donnees = []
+            elif ressource == "pokemon":
+                donnees = self.pokemon(int(identifiant))
+            else:
+                donnees = self.espece(int(identifiant))
+        corps = json.dumps(donnees).encode() if donnees is not None else None
+        with self._verrou:
+            self._corps[chemin] = corps
+        return corps
+
+    def sprite(self, chemin: str):
+        """Retourne l'image PNG d'un chemin /sprites/pokemon/<id>.png, ou None."""
+        route = _ROUTE_SPRITE.match(chemin)
+        if not route:
+            return None
+        modele = self._modele(int(route.group(1)))
+        return image_png((modele * 37 % 256, modele * 91 % 256, modele * 53 % 256))
+
+    def prechauffer(self, nombre: int) -> None:
+        """Encode à l'avance les réponses des IDs 1 à nombre, pour ne pas mesurer le serveur lui-même."""
+        for i in range(1, nombre + 1):
+            self.corps(f"/api/v2/pokemon/{i}/")
+            self.corps(f"/api/v2/pokemon-species/{i}/")
+
+
+class ServeurMock(ThreadingHTTPServer):
+    """
+    Serveur HTTP local imitant pokeapi.co, avec latence et taux d'erreur configurables.
+    Comme l'API, il envoie ETag et Last-Modified, répond 304 aux requêtes conditionnelles
+    dont la ressource n'a pas changé et compresse en gzip si le client l'accepte.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, adresse, donnees: DonneesMock, latence: float = 0.0,
+                 taux_erreur: float = 0.0, statut_erreur: int = 503, graine: int = 0):
+        super().__init__(adresse, GestionnaireMock)
+        self.donnees = donnees
+        self.latence = latence
+        self.taux_erreur = taux_erreur
+        self.statut_erreur = statut_erreur
+        self.hasard = random.Random(graine)
+        self.verrou = threading.Lock()
+        self.requetes = 0
+        self.octets = 0
+        self.reponses_304 = 0
+        self.modification = time.time()
+        self._compresses = {}
+        donnees.url_sprites = f"http://{self.server_address[0]}:{self.server_address[1]}/sprites"
+
+    def compresse(self, corps: bytes) -> bytes:
+        compresse = self._compresses.get(corps)
+        if compresse is None:
+            compresse = self._compresses[corps] = gzip.compress(corps, 6)
+        return compresse
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/api/v2"
+
+
+class GestionnaireMock(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        serveur = self.server
+        with serveur.verrou:
+            serveur.requetes += 1
+            erreur = serveur.taux_erreur and serveur.hasard.random() < serveur.taux_erreur
+        if serveur.latence:
+            time.sleep(serveur.latence)
+
+        if erreur:
+            self._repondre(serveur.statut_erreur, b'{"detail": "erreur simulee"}', {"Retry-After": "1"})
+            return
+        if self.path.startswith("/sprites/"):
+            corps = serveur.donnees.sprite(self.path)
+            if corps is None:
+                self._repondre(404, b"Not Found")
+            else:
+                self._repondre(200, corps, type_contenu="image/png")
+            return
+        corps = serveur.donnees.corps(self.path)
+        if corps is None:
+            self._repondre(404, b"Not Found")
+            return
+
+        validateurs = {"ETag": f'"{zlib.crc32(corps):08x}"',
+                       "Last-Modified": formatdate(serveur.modification, usegmt=True)}
+        if self._inchange(validateurs["ETag"]):
+            with serveur.verrou:
+                serveur.reponses_304 += 1
+            self._repondre(304, b"", validateurs)
+        elif "gzip" in self.headers.get("Accept-Encoding", ""):
+            self._repondre(200, serveur.compresse(corps), dict(validateurs, **{"Content-Encoding": "gzip"}))
+        else:
+            self._repondre(200, corps, validateurs)
+
+    def _inchange(self, etag: str) -> bool:
+        """Sémantique HTTP : If-None-Match prime sur If-Modified-Since."""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [e.strip() for e in if_none_match.split(",")] or if_none_match.strip() == "*"
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= int(self.server.modification)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _repondre(self, statut: int, corps: bytes, entetes: dict = None, type_contenu: str = "application/json"):
+        self.send_response(statut)
+        if statut != 304:
+            self.send_header("Content-Type", type_contenu)
+            self.send_header("Content-Length", str(len(corps)))
+        for nom, valeur in (entetes or {}).items():
+            self.send_header(nom, valeur)
+        self.end_headers()
+        self.wfile.write(corps)
+        with self.server.verrou:
+            self.server.octets += len(corps)
+
+    def log_message(self, *args):
+        pass
+
+
+def demarrer_serveur(latence: float = 0.0, taux_erreur: float = 0.0, remplissage: int = 0,
+                     graine: int = 0, port: int = 0, statut_erreur: int = 503) -> ServeurMock:
+    """Démarre le serveur dans un thread en arrière-plan et le retourne (voir serveur.url)."""
+    serveur = ServeurMock(("127.0.0.1", port), DonneesMock(remplissage=remplissage),
+                          latence, taux_erreur, statut_erreur, graine)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur local imitant PokéAPI.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latence", type=float, default=0.0, help="Latence ajoutée par requête (secondes)")
+    parser.add_argument("--taux-erreur", type=float, default=0.0, help="Proportion de réponses en erreur")
+    parser.add_argument("--statut-erreur", type=int, default=503, help="Code HTTP des erreurs simulées")
+    parser.add_argument("--remplissage", type=int, default=0, help="Octets ajoutés à chaque fiche Pokémon")
+    parser.add_argument("--graine", type=int, default=0, help="Graine du tirage des erreurs")
+    args = parser.parse_args()
+
+    serveur = ServeurMock(("127.0.0.1", args.port), DonneesMock(remplissage=args.remplissage),
+                          args.latence, args.taux_erreur, args.statut_erreur, args.graine)
+    print(f"PokéAPI simulée sur {serveur.url} (POKEAPI_URL={serveur.url})", file=sys.stderr)
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,46 +1,178 @@
-import json
-import os
-import requests
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import metriques
+from client import ClientPokeAPI, analyser_url, chemin_depuis_cle, client_defaut, creer_session, est_ressource
+from ordonnanceur import Ordonnanceur
 
-def download(url: str, cache: str) -> dict: 
-    """Télécharge les données JSON depuis une URL et les sauvegarde dans un fichier spécifique."""
 
+def download(url: str, cle: str) -> dict:
+    """Télécharge les données JSON depuis une URL et les sauvegarde sous la clé donnée dans le stockage."""
+    chemin, _ = analyser_url(url)
+    return client_defaut().telecharger(chemin, cle)
 
-    response = requests.get(url)
-    json_data = response.json()
+def download_poke_cached(id: int) -> dict:
+    """Télécharge les données d'un Pokémon ou utilise le cache si disponible."""
+    return client_defaut().pokemon(id)
 
-    # Écrit les données dans le fichier cache
-    with open(cache, "w") as f:
-        json.dump(json_data, f)
 
-    return json_data  
+def _telecharger_un(client: ClientPokeAPI, id: int) -> None:
+    """Télécharge un Pokémon avec la session partagée du client et l'écrit dans le stockage."""
+    client.telecharger(f"pokemon/{id}", str(id))
+
+
+def download_pokemons(debut: int, fin: int, workers: int = 8, url_api: str = None, progression: bool = True) -> dict:
+    """Télécharge les données des Pokémon de debut à fin en parallèle et les sauvegarde dans le cache.
+
+    Ne pas mettre 0 pour la valeur du début car il n'y aucun pokemon avec cette id.
+    Retourne un résumé {"telecharges": [...], "ignores": [...], "echecs": {id: erreur}}.
+    """
+    session = creer_session(workers)
+    client = ClientPokeAPI(url_api, session=session, ordonnanceur=Ordonnanceur(session, concurrence=workers))
+
+    resume = {"telecharges": [], "ignores": [], "echecs": {}}
+    a_telecharger = []
+    debut_chrono = time.perf_counter()
+    ids = list(range(debut, fin + 1))
+    # Si l'entrée existe déjà et qu'elle est lisible, on ne la retélécharge pas : une entrée vide
+    # ou corrompue est traitée comme absente (et remplacée par le téléchargement).
+    with ThreadPoolExecutor(max_workers=workers) as executeur:
+        lisibles = list(executeur.map(lambda i: client.stockage.verifier_entree(str(i)), ids))
+    for i, lisible in zip(ids, lisibles):
+        if lisible:
+            resume["ignores"].append(i)
+        else:
+            a_telecharger.append(i)
+
+    total = len(a_telecharger)
+    with client.session, ThreadPoolExecutor(max_workers=workers) as executeur:
+        futurs = {executeur.submit(_telecharger_un, client, i): i for i in a_telecharger}
+        for n, futur in enumerate(as_completed(futurs), start=1):
+            i = futurs[futur]
+            try:
+                futur.result()
+                resume["telecharges"].append(i)
+            except (ValueError, OSError) as erreur:  # requests.RequestException hérite d'OSError
+                resume["echecs"][i] = str(erreur)
+            if progression:
+                print(f"\r[{n}/{total}] téléchargés", end="", file=sys.stderr, flush=True)
+
+    if progression and total:
+        print(file=sys.stderr)
+    resume["telecharges"].sort()
+    resume["duree"] = time.perf_counter() - debut_chrono
+    return resume
+
+
+def verifier_cache(reparer: bool = False, workers: int = 8, url_api: str = None) -> dict:
+    """Vérifie en parallèle toutes les entrées du cache.
+
+    Avec reparer=True, les entrées corrompues sont mises en quarantaine puis retéléchargées ;
+    celles qui ne viennent pas de l'API (index_*, agregats) sont seulement écartées : elles
+    seront recalculées à leur prochaine utilisation.
+    Retourne un résumé {"verifiees": n, "corrompues": [...], "reparees": [...], "ecartees": [...],
+    "echecs": {cle: erreur}}.
+    """
+    session = creer_session(workers)
+    client = ClientPokeAPI(url_api, session=session, ordonnanceur=Ordonnanceur(session, concurrence=workers))
+    stockage = client.stockage
+    cles = stockage.cles()
+
+    with ThreadPoolExecutor(max_workers=workers) as executeur:
+        etats = list(executeur.map(stockage.verifier_entree, cles))
+    corrompues = sorted(cle for cle, valide in zip(cles, etats) if not valide)
+
+    resume = {"verifiees": len(cles), "corrompues": corrompues, "reparees": [], "ecartees": [], "echecs": {}}
+    if not reparer or not corrompues:
+        return resume
+
+    for cle in corrompues:
+        stockage.mettre_en_quarantaine(cle, "détectée par verifier_cache")
+    # Les fiches compactes se reconstruisent depuis la réponse brute ; les autres clés dérivées
+    # n'ont pas de chemin dans l'API
+    a_reparer = [cle for cle in corrompues if est_ressource(cle) or cle.startswith("compact_")]
+    resume["ecartees"] = [cle for cle in corrompues if cle not in a_reparer]
+    with client.session, ThreadPoolExecutor(max_workers=workers) as executeur:
+        futurs = {executeur.submit(client.reparer, cle): cle for cle in a_reparer}
+        for futur in as_completed(futurs):
+            cle = futurs[futur]
+            try:
+                futur.result()
+                resume["reparees"].append(cle)
+            except (ValueError, OSError) as erreur:  # requests.RequestException hérite d'OSError
+                resume["echecs"][cle] = str(erreur)
+    resume["reparees"].sort()
+    return resume
 
-def download_poke_cached(id: int) -> dict:
-    """Télécharge les données d'un Pokémon ou utilise le cache si disponible."""
-    if not os.path.isdir("cache"):
-        os.mkdir("cache")
 
-    cache_file = f"cache/{id}.json"
+def rafraichir_cache(workers: int = 8, url_api: str = None, progression: bool = True) -> dict:
+    """Revalide toutes les réponses de l'API du cache par des requêtes conditionnelles.
 
-    # Vérifie si le fichier existe déjà dans le cache
-    if os.path.isfile(cache_file) == True:
-        with open(cache_file, "r") as f:
-            return json.load(f)
+    Les ressources inchangées reviennent en 304 (sans contenu) : seul leur horodatage est mis à jour.
+    Retourne un résumé {"inchangees": n, "modifiees": [...], "echecs": {cle: erreur}, "duree": s}.
+    """
+    session = creer_session(workers)
+    client = ClientPokeAPI(url_api, session=session, ordonnanceur=Ordonnanceur(session, concurrence=workers))
+    cles = [cle for cle in client.stockage.cles() if est_ressource(cle)]
 
-    url = f"https://pokeapi.co/api/v2/pokemon/{id}/"
-    return download(url, cache_file) 
+    resume = {"inchangees": 0, "modifiees": [], "echecs": {}}
+    debut_chrono = time.perf_counter()
+    with client.session, ThreadPoolExecutor(max_workers=workers) as executeur:
+        futurs = {executeur.submit(client.revalider, chemin_depuis_cle(cle), cle): cle for cle in cles}
+        for n, futur in enumerate(as_completed(futurs), start=1):
+            cle = futurs[futur]
+            try:
+                if futur.result()[1]:
+                    resume["modifiees"].append(cle)
+                else:
+                    resume["inchangees"] += 1
+            except (ValueError, OSError) as erreur:  # requests.RequestException hérite d'OSError
+                resume["echecs"][cle] = str(erreur)
+            if progression:
+                print(f"\r[{n}/{len(cles)}] revalidées", end="", file=sys.stderr, flush=True)
 
-def download_pokemons(debut: int, fin:int):
-    """Télécharge les données des n premiers Pokémon et les sauvegarde en fichiers JSON."""
-    """Ne pas mettre 0 pour la valeur du début car il n'y aucun pokemon avec cette id"""
+    if progression and cles:
+        print(file=sys.stderr)
+    resume["modifiees"].sort()
+    resume["duree"] = time.perf_counter() - debut_chrono
+    return resume
 
-    os.mkdir("cache")
-    for i in range(debut, fin+1):
-        cache_file = f"cache/{i}.json"
 
-        # Si le fichier n'existe pas déjà, on le crée.
-        if os.path.isfile(cache_file) == False:
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-remplir ou vérifier le cache des Pokémon.")
+    parser.add_argument("debut", type=int, nargs="?", help="Premier ID à télécharger")
+    parser.add_argument("fin", type=int, nargs="?", help="Dernier ID à télécharger")
+    parser.add_argument("--workers", type=int, default=8, help="Nombre de téléchargements simultanés")
+    parser.add_argument("--verifier", action="store_true", help="Vérifier toutes les entrées du cache")
+    parser.add_argument("--reparer", action="store_true", help="Vérifier et retélécharger les entrées corrompues")
+    parser.add_argument("--rafraichir", action="store_true", help="Revalider tout le cache (requêtes conditionnelles)")
+    metriques.ajouter_option(parser)
+    args = parser.parse_args()
+    metriques.depuis_arguments(args)
 
-            response = requests.get(f"https://pokeapi.co/api/v2/pokemon/{i}/")
-            with open(cache_file, "w") as f:
-                json.dump(response.json(), f)
\ No newline at end of file
+    if args.rafraichir:
+        resume = rafraichir_cache(workers=args.workers)
+        print(f"Inchangées : {resume['inchangees']}, modifiées : {len(resume['modifiees'])}, "
+              f"échecs : {len(resume['echecs'])} ({resume['duree']:.1f} s)")
+        for cle, erreur in sorted(resume["echecs"].items()):
+            print(f"  {cle} : {erreur}")
+    elif args.verifier or args.reparer:
+        resume = verifier_cache(reparer=args.reparer, workers=args.workers)
+        print(f"Vérifiées : {resume['verifiees']}, corrompues : {len(resume['corrompues'])}")
+        for cle in resume["corrompues"]:
+            print(f"  {cle}")
+        if args.reparer:
+            print(f"Réparées : {len(resume['reparees'])}, écartées (recalculées à la demande) : "
+                  f"{len(resume['ecartees'])}, échecs : {len(resume['echecs'])}")
+            for cle, erreur in sorted(resume["echecs"].items()):
+                print(f"  {cle} : {erreur}")
+    elif args.debut is None or args.fin is None:
+        parser.error("indiquer debut et fin, ou --verifier / --reparer / --rafraichir")
+    else:
+        resume = download_pokemons(args.debut, args.fin, workers=args.workers)
+        print(f"Téléchargés : {len(resume['telecharges'])}, "
+              f"déjà en cache : {len(resume['ignores'])}, "
+              f"échecs : {len(resume['echecs'])} ({resume['duree']:.1f} s)")
+        for i, erreur in sorted(resume["echecs"].items()):
+            print(f"  {i} : {erreur}")
@@ -0,0 +1,136 @@
+import numpy as np
+from matrice import STATS, MatriceStats
+
+# Statistiques réelles d'un Pokémon (formules depuis la 3e génération), colonnes dans l'ordre de STATS :
+#   PV     = floor((2 x base + IV + floor(EV / 4)) x niveau / 100) + niveau + 10
+#   autres = floor((floor((2 x base + IV + floor(EV / 4)) x niveau / 100) + 5) x nature)
+# avec nature = 1,1 pour la stat augmentée, 0,9 pour la stat diminuée, 1 sinon. Tout est calculé
+# en entiers (nature en dixièmes), sur des tableaux diffusés (broadcasting) : un Pokédex entier
+# x 25 natures x plusieurs répartitions d'EV se calcule en une seule opération.
+
+IV_MAX = 31
+EV_MAX = 252
+EV_TOTAL_MAX = 510
+
+# Natures dans l'ordre du jeu : la n-ième augmente la stat n // 5 et diminue la stat n % 5
+# de (attack, defense, speed, special-attack, special-defense) ; si les deux sont égales, neutre.
+NATURES = [
+    "hardy", "lonely", "brave", "adamant", "naughty",
+    "bold", "docile", "relaxed", "impish", "lax",
+    "timid", "hasty", "serious", "jolly", "naive",
+    "modest", "mild", "quiet", "bashful", "rash",
+    "calm", "gentle", "sassy", "careful", "quirky",
+]
+_ORDRE_NATURES = ["attack", "defense", "speed", "special-attack", "special-defense"]
+
+# Multiplicateurs en dixièmes, une ligne par nature (25, 6)
+MULTIPLICATEURS = np.full((len(NATURES), len(STATS)), 10, dtype=np.int32)
+for _n in range(len(NATURES)):
+    _plus, _moins = _ORDRE_NATURES[_n // 5], _ORDRE_NATURES[_n % 5]
+    if _plus != _moins:
+        MULTIPLICATEURS[_n, STATS.index(_plus)] = 11
+        MULTIPLICATEURS[_n, STATS.index(_moins)] = 9
+del _n, _plus, _moins
+
+# Répartitions d'EV courantes
+REPARTITIONS = {
+    "aucune": {},
+    "physique": {"attack": 252, "speed": 252, "hp": 4},
+    "speciale": {"special-attack": 252, "speed": 252, "hp": 4},
+    "defensive": {"hp": 252, "defense": 252, "special-defense": 4},
+    "mixte": {"hp": 252, "defense": 128, "special-defense": 128},
+}
+
+
+def multiplicateurs(natures) -> np.ndarray:
+    """Multiplicateurs en dixièmes (..., 6) d'une nature ("adamant") ou d'une liste de natures."""
+    if isinstance(natures, str):
+        natures = [natures]
+        unique = True
+    else:
+        unique = False
+    inconnues = [nature for nature in natures if nature.lower() not in NATURES]
+    if inconnues:
+        raise ValueError(f"Nature inconnue : {', '.join(inconnues)}")
+    indices = [NATURES.index(nature.lower()) for nature in natures]
+    return MULTIPLICATEURS[indices[0]] if unique else MULTIPLICATEURS[indices]
+
+
+def vecteur_ev(ev) -> np.ndarray:
+    """
+    Convertit une répartition d'EV en tableau (6,) : nom de REPARTITIONS ("physique"),
+    texte "attack:252,speed:252,hp:4", dictionnaire {stat: EV} ou tableau déjà construit.
+    """
+    if isinstance(ev, str):
+        if ev in REPARTITIONS:
+            ev = REPARTITIONS[ev]
+        else:
+            termes = [terme.partition(":") for terme in ev.split(",") if terme.strip()]
+            try:
+                ev = {stat.strip(): int(valeur) for stat, _, valeur in termes}
+            except ValueError:
+                raise ValueError(f"Répartition d'EV invalide : {ev}") from None
+    if isinstance(ev, dict):
+        inconnues = set(ev) - set(STATS)
+        if inconnues:
+            raise ValueError(f"Statistiques inconnues : {', '.join(sorted(inconnues))}")
+        ev = [ev.get(stat, 0) for stat in STATS]
+    return np.asarray(ev, dtype=np.int32)
+
+
+def calculer(base, niveau=50, iv=IV_MAX, ev=0, nature=10) -> np.ndarray:
+    """
+    Statistiques réelles, colonnes dans l'ordre de STATS. Tous les arguments sont diffusés ensemble :
+    base (..., 6), niveau (...) ou scalaire, iv et ev (..., 6) ou scalaires, nature en dixièmes
+    (..., 6) (voir multiplicateurs) ou scalaire. Lève ValueError pour des IV/EV hors limites.
+    """
+    base = np.asarray(base, dtype=np.int32)
+    niveau = np.asarray(niveau, dtype=np.int32)[..., None]
+    iv = np.asarray(iv, dtype=np.int32)
+    ev = np.asarray(ev, dtype=np.int32)
+    if np.any((iv < 0) | (iv > IV_MAX)) or np.any((ev < 0) | (ev > EV_MAX)):
+        raise ValueError(f"IV entre 0 et {IV_MAX}, EV entre 0 et {EV_MAX}")
+    if ev.ndim and ev.shape[-1] == len(STATS) and np.any(ev.sum(axis=-1) > EV_TOTAL_MAX):
+        raise ValueError(f"Plus de {EV_TOTAL_MAX} EV au total")
+    if np.any((niveau < 1) | (niveau > 100)):
+        raise ValueError("Niveau entre 1 et 100")
+
+    brut = (2 * base + iv + ev // 4) * niveau // 100
+    stats = (brut + 5) * np.asarray(nature, dtype=np.int32) // 10
+    pv = brut[..., 0] + niveau[..., 0] + 10
+    # Munja (base PV 1) a toujours 1 PV
+    stats[..., 0] = np.where(base[..., 0] == 1, 1, pv)
+    return stats
+
+
+def grille(base, niveaux=(50,), natures=NATURES, repartitions=("aucune",), iv=IV_MAX) -> np.ndarray:
+    """
+    Toutes les combinaisons d'un coup : tableau (N, niveaux, natures, répartitions, 6) pour des
+    statistiques de base (N, 6). Ex : grille(matrice.valeurs, (50, 100), NATURES, ("physique", "speciale")).
+    """
+    base = np.asarray(base, dtype=np.int32)[:, None, None, None, :]
+    niveaux = np.asarray(niveaux, dtype=np.int32)[None, :, None, None]
+    natures = multiplicateurs(list(natures))[None, None, :, None, :]
+    evs = np.stack([vecteur_ev(ev) for ev in repartitions])[None, None, None, :, :]
+    return calculer(base, niveaux, iv, evs, natures)
+
+
+def bornes(base, niveau: int = 50) -> tuple:
+    """
+    (minimum, neutre, maximum) des statistiques au niveau donné : IV 0, sans EV, nature
+    défavorable ; IV 31, sans EV, nature neutre ; IV 31, 252 EV, nature favorable.
+    La nature ne s'applique pas aux PV.
+    """
+    defavorable = np.full(len(STATS), 9, dtype=np.int32)
+    favorable = np.full(len(STATS), 11, dtype=np.int32)
+    defavorable[0] = favorable[0] = 10
+    return (calculer(base, niveau, 0, 0, defavorable),
+            calculer(base, niveau, IV_MAX, 0, 10),
+            calculer(base, niveau, IV_MAX, EV_MAX, favorable))
+
+
+def matrice_au_niveau(matrice: MatriceStats, niveau: int = 50, iv=IV_MAX, ev=0, nature: str = "hardy") -> MatriceStats:
+    """MatriceStats des statistiques réelles (mêmes IDs et noms) : les classements s'y appliquent tels quels."""
+    valeurs = calculer(matrice.valeurs, niveau, iv, vecteur_ev(ev) if isinstance(ev, (str, dict)) else ev,
+                       multiplicateurs(nature))
+    return MatriceStats(matrice.ids, matrice.noms, valeurs)
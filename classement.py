@@ -0,0 +1,219 @@
+import numpy as np
+from matrice import STATS, MatriceStats
+
+# Classements multicritères sur une MatriceStats :
+#   - scores pondérés : "attack:1,special-attack:1" (poids négatifs permis), "speed" ou "total",
+#     avec évaluation en lot de plusieurs formules (requêtes « et si ») en un produit matriciel ;
+#   - tri lexicographique sur plusieurs clés : "-speed,attack" (préfixe - : décroissant) ;
+#   - fronts de Pareto : Pokémon qu'aucun autre ne dépasse sur toutes les stats choisies.
+# Les résultats sont des indices de ligne de la matrice (voir resultats pour les afficher).
+
+
+class CritereInvalide(ValueError):
+    """Statistique, poids ou clé de tri inconnus."""
+
+
+# ================================================
+# SCORES PONDÉRÉS
+# ================================================
+
+def analyser_critere(texte: str):
+    """Convertit "speed", "total" ou "attack:1,speed:2" en critère de MatriceStats.score."""
+    texte = texte.strip()
+    if ":" not in texte:
+        if texte != "total" and texte not in STATS:
+            raise CritereInvalide(f"critère inconnu : {texte}")
+        return texte
+    poids = {}
+    for terme in texte.split(","):
+        stat, _, valeur = terme.partition(":")
+        stat = stat.strip()
+        if stat not in STATS:
+            raise CritereInvalide(f"statistique inconnue : {stat}")
+        try:
+            poids[stat] = poids.get(stat, 0.0) + float(valeur)
+        except ValueError:
+            raise CritereInvalide(f"poids invalide : {terme}") from None
+    return poids
+
+
+def matrice_poids(criteres: list) -> np.ndarray:
+    """Matrice (Q, 6) des poids de Q critères, une ligne par critère (colonnes dans l'ordre de STATS)."""
+    poids = np.zeros((len(criteres), len(STATS)))
+    for q, critere in enumerate(criteres):
+        if critere == "total":
+            poids[q] = 1.0
+        elif isinstance(critere, str):
+            poids[q, STATS.index(critere)] = 1.0
+        else:
+            for stat, p in critere.items():
+                poids[q, STATS.index(stat)] = p
+    return poids
+
+
+def scores_lot(matrice: MatriceStats, criteres: list) -> np.ndarray:
+    """Scores (N, Q) de chaque Pokémon pour Q critères, en un seul produit matriciel."""
+    return matrice.valeurs @ matrice_poids(criteres).T
+
+
+def top_k_lot(matrice: MatriceStats, criteres: list, k: int = 10) -> list:
+    """
+    Les k meilleurs pour chaque critère : [[(id, nom, score), ...], ...] dans l'ordre des critères.
+    Une sélection argpartition par colonne de scores, puis seuls les k candidats sont triés.
+    """
+    scores = scores_lot(matrice, criteres)
+    k = min(k, len(matrice))
+    if k == 0:
+        return [[] for _ in criteres]
+    candidats = np.argpartition(-scores, k - 1, axis=0)[:k]
+    resultats = []
+    for q in range(scores.shape[1]):
+        colonne = candidats[:, q]
+        ordre = colonne[np.lexsort((colonne, -scores[colonne, q]))]
+        resultats.append([(int(matrice.ids[i]), matrice.noms[i], scores[i, q].item()) for i in ordre])
+    return resultats
+
+
+# ================================================
+# TRI LEXICOGRAPHIQUE
+# ================================================
+
+def _colonne(matrice: MatriceStats, nom: str) -> np.ndarray:
+    if nom == "id":
+        return matrice.ids
+    if nom != "total" and nom not in STATS:
+        raise CritereInvalide(f"clé de tri inconnue : {nom}")
+    return matrice.score(nom)
+
+
+def analyser_cles(texte: str) -> list:
+    """Convertit "-speed,attack" en [("speed", True), ("attack", False)] (True = décroissant)."""
+    cles = [(cle.strip().lstrip("-"), cle.strip().startswith("-")) for cle in texte.split(",") if cle.strip()]
+    if not cles:
+        raise CritereInvalide("aucune clé de tri")
+    return cles
+
+
+def tri_lexicographique(matrice: MatriceStats, cles: list) -> np.ndarray:
+    """
+    Indices de ligne triés sur plusieurs clés [(nom, décroissant), ...], la première prioritaire ;
+    les égalités restantes sont départagées par ID croissant. Un seul np.lexsort.
+    """
+    # np.lexsort trie sur la dernière clé d'abord : on passe les clés à l'envers, l'ID en premier
+    colonnes = [matrice.ids]
+    for nom, decroissant in reversed(cles):
+        valeurs = _colonne(matrice, nom)
+        colonnes.append(-valeurs if decroissant else valeurs)
+    return np.lexsort(colonnes)
+
+
+# ================================================
+# FRONTS DE PARETO
+# ================================================
+
+def _non_domines_2d(points: np.ndarray) -> np.ndarray:
+    """
+    Masque des points non dominés en dimension 2, par un tri puis un maximum cumulé (O(n log n)).
+    Trié par x puis y décroissants, un point est dominé si un point de x strictement plus grand
+    a un y au moins égal, ou si le premier point de même x a un y strictement plus grand.
+    """
+    ordre = np.lexsort((-points[:, 1], -points[:, 0]))
+    x, y = points[ordre, 0], points[ordre, 1]
+    n = len(ordre)
+    debut_groupe = np.maximum.accumulate(np.where(np.r_[True, x[1:] != x[:-1]], np.arange(n), 0))
+    maximum_avant = np.r_[-np.inf, np.maximum.accumulate(y)[:-1]]
+    domine = (maximum_avant[debut_groupe] >= y) | (y[debut_groupe] > y)
+    masque = np.empty(n, dtype=bool)
+    masque[ordre] = ~domine
+    return masque
+
+
+def _non_domines(points: np.ndarray, taille_bloc: int = 256) -> np.ndarray:
+    """
+    Masque des points (n, d) non dominés, à maximiser sur chaque colonne.
+    En dimension 3 et plus, les points sont parcourus par somme décroissante (un point ne peut
+    être dominé que par un point de somme strictement plus grande) et chaque bloc n'est comparé,
+    de façon vectorisée, qu'au front déjà trouvé et à lui-même : O(n x taille du front).
+    """
+    n, d = points.shape
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    if d == 1:
+        return points[:, 0] == points[:, 0].max()
+    if d == 2:
+        return _non_domines_2d(points)
+    ordre = np.argsort(-points.sum(axis=1), kind="stable")
+    tries = points[ordre]
+    front = np.empty((0, d), dtype=points.dtype)
+    garde = np.empty(n, dtype=bool)
+    for debut in range(0, n, taille_bloc):
+        bloc = tries[debut:debut + taille_bloc]
+        candidats = np.concatenate((front, bloc))[None, :, :]
+        superieurs_ou_egaux = (candidats >= bloc[:, None, :]).all(axis=2)
+        strictement_superieurs = (candidats > bloc[:, None, :]).any(axis=2)
+        non_domine = ~(superieurs_ou_egaux & strictement_superieurs).any(axis=1)
+        garde[debut:debut + len(bloc)] = non_domine
+        front = np.concatenate((front, bloc[non_domine]))
+    masque = np.empty(n, dtype=bool)
+    masque[ordre] = garde
+    return masque
+
+
+def _points(matrice: MatriceStats, stats: list) -> np.ndarray:
+    """Colonnes des stats choisies (préfixe - : à minimiser, donc négées)."""
+    colonnes = []
+    for stat in stats:
+        nom = stat.lstrip("-")
+        if nom != "total" and nom not in STATS:
+            raise CritereInvalide(f"statistique inconnue : {nom}")
+        valeurs = matrice.score(nom).astype(np.float64)
+        colonnes.append(-valeurs if stat.startswith("-") else valeurs)
+    return np.column_stack(colonnes) if colonnes else np.zeros((len(matrice), 0))
+
+
+def front_pareto(matrice: MatriceStats, stats: list) -> np.ndarray:
+    """Indices (ordre des lignes) des Pokémon non dominés sur stats, ex : ["attack", "speed"]."""
+    if not stats:
+        raise CritereInvalide("aucune statistique pour le front de Pareto")
+    return np.flatnonzero(_non_domines(_points(matrice, stats)))
+
+
+def fronts_pareto(matrice: MatriceStats, stats: list, nombre: int = None) -> list:
+    """
+    Fronts successifs (tri non dominé) : le premier est front_pareto, le second le front des
+    Pokémon restants, etc. Retourne au plus nombre tableaux d'indices.
+    """
+    if not stats:
+        raise CritereInvalide("aucune statistique pour le front de Pareto")
+    points = _points(matrice, stats)
+    restants = np.arange(len(matrice))
+    fronts = []
+    while len(restants) and (nombre is None or len(fronts) < nombre):
+        masque = _non_domines(points[restants])
+        fronts.append(restants[masque])
+        restants = restants[~masque]
+    return fronts
+
+
+# ================================================
+# RÉSULTATS
+# ================================================
+
+def resultats(matrice: MatriceStats, indices, scores: np.ndarray = None) -> list:
+    """Lignes choisies sous forme de dictionnaires {"id", "name", stats..., "total"[, "score"]}."""
+    lignes = []
+    for i in np.asarray(indices, dtype=np.int64):
+        ligne = {"id": int(matrice.ids[i]), "name": matrice.noms[i]}
+        ligne.update(zip(STATS, matrice.valeurs[i].tolist()))
+        ligne["total"] = int(matrice.valeurs[i].sum())
+        if scores is not None:
+            ligne["score"] = scores[i].item()
+        lignes.append(ligne)
+    return lignes
+
+
+def depuis_index() -> MatriceStats:
+    """Matrice de tout le Pokédex en cache, depuis l'index des requêtes (sans relire les fiches)."""
+    from requete import charger_index
+    lignes = charger_index().lignes
+    return MatriceStats([l[0] for l in lignes], [l[1] for l in lignes], [l[3] for l in lignes])
@@ -0,0 +1,353 @@
+import os
+import time
+import threading
+import metriques
+from ordonnanceur import Ordonnanceur
+from stockage import CacheLRU, stockage_defaut
+
+# URL de base de l'API (surchargeable pour tester contre un serveur local)
+URL_API = os.environ.get("POKEAPI_URL", "https://pokeapi.co/api/v2")
+
+# Durée de validité (en secondes) d'une entrée du disque ; absente = jamais périmée
+TTL = float(os.environ["POKE_TTL"]) if os.environ.get("POKE_TTL") else None
+
+# Taille du cache en mémoire : nombre d'entrées et/ou octets
+LRU_ENTREES = int(os.environ.get("POKE_LRU_ENTREES", "2048"))
+LRU_OCTETS = int(os.environ["POKE_LRU_OCTETS"]) if os.environ.get("POKE_LRU_OCTETS") else None
+
+# Clés du stockage qui ne viennent pas directement de l'API (dérivées et recalculables)
+PREFIXES_DERIVES = ("compact_", "index_", "agregats")
+
+# Liste de tous les types : PokéAPI pagine par 20 par défaut, une seule page suffit avec ?limit=
+CHEMIN_LISTE_TYPES = "type?limit=1000"
+
+# Ressource de l'API -> préfixe de la clé dans le stockage
+PREFIXES = {
+    "pokemon": "",
+    "pokemon-species": "espece_",
+    "type": "type_",
+    "encounters": "rencontres_",
+}
+
+
+def creer_session(workers: int = 8) -> "requests.Session":
+    """Crée une session HTTP keep-alive partagée, avec un pool de connexions adapté au nombre de workers."""
+    # Import tardif : requests n'est chargé que si une requête réseau est nécessaire
+    import requests
+
+    session = requests.Session()
+    # Réponses compressées : brotli si le module de décodage est installé, sinon gzip
+    session.headers["Accept-Encoding"] = "br, gzip" if _brotli_disponible() else "gzip"
+    adaptateur = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount("http://", adaptateur)
+    session.mount("https://", adaptateur)
+    return session
+
+
+def _brotli_disponible() -> bool:
+    from importlib.util import find_spec
+    return find_spec("brotli") is not None or find_spec("brotlicffi") is not None
+
+
+def validateurs_reponse(response) -> dict:
+    """Validateurs HTTP d'une réponse ({"etag", "modifie"}), ou None si le serveur n'en envoie pas."""
+    etag = response.headers.get("ETag")
+    modifie = response.headers.get("Last-Modified")
+    if etag is None and modifie is None:
+        return None
+    return {"etag": etag, "modifie": modifie}
+
+
+def est_ressource(cle: str) -> bool:
+    """Indique si une clé du stockage est une réponse de l'API (et peut donc être revalidée)."""
+    return not cle.startswith(PREFIXES_DERIVES)
+
+
+class ClientPokeAPI:
+    """
+    Point d'accès unique à PokéAPI : chaque ressource est cherchée dans le cache en mémoire (LRU),
+    puis dans le stockage du disque, et n'est téléchargée (avec une session partagée, via
+    l'ordonnanceur qui limite le débit et réessaie les erreurs passagères) que si elle est absente.
+    Une entrée du disque plus vieille que ttl secondes est revalidée auprès de l'API par une
+    requête conditionnelle (ETag / Last-Modified) : si elle n'a pas changé, la réponse 304 ne
+    contient aucune donnée. Si l'API est injoignable, l'ancienne version continue d'être servie.
+    """
+
+    def __init__(self, url_api: str = None, stockage=None, session: "requests.Session" = None,
+                 memoire: CacheLRU = None, ttl: float = TTL, ordonnanceur: Ordonnanceur = None):
+        self.url_api = (url_api or URL_API).rstrip("/")
+        self.stockage = stockage or stockage_defaut()
+        self.memoire = memoire or CacheLRU(LRU_ENTREES, LRU_OCTETS)
+        self.ttl = ttl
+        self._session = session
+        self._ordonnanceur = ordonnanceur
+        self._verrou_session = threading.Lock()
+
+    @property
+    def session(self) -> "requests.Session":
+        """Session HTTP, créée au premier accès réseau (un cache chaud n'importe jamais requests)."""
+        with self._verrou_session:
+            if self._session is None:
+                self._session = creer_session()
+            return self._session
+
+    @property
+    def ordonnanceur(self) -> Ordonnanceur:
+        """Ordonnanceur des requêtes (débit, concurrence, nouveaux essais) sur la session du client."""
+        session = self.session
+        with self._verrou_session:
+            if self._ordonnanceur is None:
+                self._ordonnanceur = Ordonnanceur(session)
+            return self._ordonnanceur
+
+    # ---------- accès générique ----------
+
+    def _est_perime(self, horodatage: float) -> bool:
+        return self.ttl is not None and time.time() - horodatage > self.ttl
+
+    def obtenir(self, chemin: str, cle: str) -> dict:
+        """Retourne la ressource depuis le cache, ou la télécharge depuis {url_api}/{chemin}/."""
+        entree = self.memoire.lire(cle)
+        if entree is not None and not self._est_perime(entree[1]):
+            metriques.compter("cache_memoire_succes")
+            return entree[0]
+
+        with metriques.etape("lecture_disque"):
+            entree = self.stockage.lire_entree(cle)
+        if entree is None:
+            metriques.compter("cache_absences")
+            return self.telecharger(chemin, cle)
+
+        metriques.compter("cache_disque_succes")
+        donnees, horodatage, taille = entree
+        if self._est_perime(horodatage):
+            try:
+                nouvelles, modifiee = self.revalider(chemin, cle)
+                if modifiee:
+                    return nouvelles
+                horodatage = time.time()
+            except OSError:
+                # API injoignable (requests.RequestException hérite d'OSError) : on sert la version périmée sans réessayer à chaque appel
+                horodatage = time.time()
+        self.memoire.ajouter(cle, donnees, horodatage, taille)
+        return donnees
+
+    def telecharger(self, chemin: str, cle: str) -> dict:
+        """
+        Télécharge la ressource sans consulter le cache, puis l'enregistre sur disque et en mémoire.
+        Une réponse en erreur (après les nouveaux essais de l'ordonnanceur) lève une exception
+        et n'est jamais enregistrée.
+        """
+        return self._enregistrer(chemin, cle, self._requete(chemin))
+
+    def revalider(self, chemin: str, cle: str) -> tuple:
+        """
+        Requête conditionnelle avec les validateurs enregistrés pour l'entrée.
+        Retourne (nouvelles données, True), ou (None, False) sur une réponse 304 : seul
+        l'horodatage de l'entrée est alors mis à jour, sans relire ses données.
+        Sans validateurs, la ressource est simplement retéléchargée.
+        """
+        validateurs = self.stockage.lire_validateurs(cle) or {}
+        entetes = {}
+        if validateurs.get("etag"):
+            entetes["If-None-Match"] = validateurs["etag"]
+        if validateurs.get("modifie"):
+            entetes["If-Modified-Since"] = validateurs["modifie"]
+        if not entetes:
+            return self.telecharger(chemin, cle), True
+
+        response = self._requete(chemin, entetes)
+        if response.status_code != 304:
+            return self._enregistrer(chemin, cle, response), True
+
+        metriques.compter("revalidations_304")
+        self.stockage.toucher(cle)
+        # La copie en mémoire garde son ancien horodatage : elle sera relue depuis le disque
+        self.memoire.retirer(cle)
+        return None, False
+
+    def _requete(self, chemin: str, entetes: dict = None) -> "requests.Response":
+        with metriques.etape("reseau"):
+            chemin, _, parametres = chemin.partition("?")
+            url = f"{self.url_api}/{chemin}/" + (f"?{parametres}" if parametres else "")
+            response = self.ordonnanceur.get(url, timeout=30, headers=entetes)
+        metriques.compter("requetes_http")
+        if metriques.actif():
+            # Octets reçus sur le réseau (compressés) et après décompression
+            metriques.compter("octets_transferes", response.raw.tell() if hasattr(response.raw, "tell") else 0)
+            metriques.compter("octets_recus", len(response.content))
+        return response
+
+    def _enregistrer(self, chemin: str, cle: str, response) -> dict:
+        with metriques.etape("decodage_json"):
+            donnees = response.json()
+        with metriques.etape("ecriture_disque"):
+            self.stockage.ecrire(cle, donnees, validateurs_reponse(response))
+        self.memoire.ajouter(cle, donnees, time.time(), len(response.content))
+        if chemin.startswith("pokemon/") and not chemin.endswith("/encounters"):
+            # Ingestion : la fiche compacte est enregistrée en même temps que la réponse brute
+            self._enregistrer_compact(cle, donnees)
+        return donnees
+
+    def _obtenir_plusieurs(self, cles: list, repli=None, workers: int = 1) -> dict:
+        """
+        Lecture groupée de plusieurs clés (mémoire puis disque) ; repli(cle) récupère celles
+        qui manquent ou sont périmées (et revalide donc ces dernières), sur workers threads.
+        Sans repli, les clés absentes du cache ou périmées ne sont pas dans le résultat.
+        """
+        resultat = {}
+        for cle in cles:
+            entree = self.memoire.lire(cle)
+            if entree is not None and not self._est_perime(entree[1]):
+                resultat[cle] = entree[0]
+        if resultat:
+            metriques.compter("cache_memoire_succes", len(resultat))
+        with metriques.etape("lecture_disque"):
+            entrees = self.stockage.lire_entrees([c for c in cles if c not in resultat])
+        valides = 0
+        for cle, (donnees, horodatage, taille) in entrees.items():
+            if not self._est_perime(horodatage):
+                resultat[cle] = donnees
+                self.memoire.ajouter(cle, donnees, horodatage, taille)
+                valides += 1
+        if valides:
+            metriques.compter("cache_disque_succes", valides)
+        if repli is not None:
+            manquantes = [cle for cle in cles if cle not in resultat]
+            if workers > 1 and len(manquantes) > 1:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=workers) as executeur:
+                    resultat.update(zip(manquantes, executeur.map(repli, manquantes)))
+            else:
+                for cle in manquantes:
+                    resultat[cle] = repli(cle)
+        return resultat
+
+    def reparer(self, cle: str) -> dict:
+        """Reconstruit une entrée (après sa mise en quarantaine) depuis l'API ou depuis la réponse brute."""
+        if cle.startswith("compact_"):
+            return self.pokemon_compact(cle[len("compact_"):])
+        if not est_ressource(cle):
+            raise ValueError(f"{cle} n'est pas une réponse de l'API : elle est recalculée à sa prochaine utilisation")
+        return self.telecharger(chemin_depuis_cle(cle), cle)
+
+    def depuis_url(self, url: str) -> dict:
+        """Résout une URL complète de PokéAPI (ex : species.url d'un Pokémon) via le cache."""
+        chemin, cle = analyser_url(url)
+        return self.obtenir(chemin, cle)
+
+    # ---------- accès typés ----------
+
+    def pokemon(self, id_ou_nom) -> dict:
+        return self.obtenir(f"pokemon/{id_ou_nom}", f"{id_ou_nom}")
+
+    def pokemons(self, ids: list, workers: int = 1) -> dict:
+        """Récupère plusieurs Pokémon : lecture groupée du cache, puis téléchargement des manquants."""
+        return self._obtenir_plusieurs([str(i) for i in ids], self.pokemon, workers)
+
+    def pokemon_compact(self, id_ou_nom) -> dict:
+        """Retourne la fiche compacte d'un Pokémon (voir projeter_pokemon), construite au besoin."""
+        cle = f"compact_{id_ou_nom}"
+        entree = self.memoire.lire(cle)
+        if entree is not None and not self._est_perime(entree[1]):
+            metriques.compter("cache_memoire_succes")
+            return entree[0]
+        with metriques.etape("lecture_disque"):
+            entree = self.stockage.lire_entree(cle)
+        if entree is not None and not self._est_perime(entree[1]):
+            metriques.compter("cache_disque_succes")
+            self.memoire.ajouter(cle, *entree)
+            return entree[0]
+        return self._enregistrer_compact(str(id_ou_nom), self.pokemon(id_ou_nom))
+
+    def pokemons_compacts(self, ids: list, telecharger: bool = True, workers: int = 1) -> dict:
+        """
+        Récupère plusieurs fiches compactes, indexées par ID (en texte), les manquantes sur
+        workers threads. Avec telecharger=False, seules les fiches déjà en cache sont retournées.
+        """
+        cles = [f"compact_{i}" for i in ids]
+        repli = (lambda cle: self.pokemon_compact(cle[len("compact_"):])) if telecharger else None
+        resultat = self._obtenir_plusieurs(cles, repli, workers)
+        return {cle[len("compact_"):]: donnees for cle, donnees in resultat.items()}
+
+    def _enregistrer_compact(self, cle_brute: str, donnees: dict) -> dict:
+        compact = projeter_pokemon(donnees)
+        with metriques.etape("ecriture_disque"):
+            self.stockage.ecrire(f"compact_{cle_brute}", compact)
+        self.memoire.ajouter(f"compact_{cle_brute}", compact, time.time())
+        return compact
+
+    def espece(self, id_espece) -> dict:
+        return self.obtenir(f"pokemon-species/{id_espece}", f"espece_{id_espece}")
+
+    def type(self, id_ou_nom) -> dict:
+        return self.obtenir(f"type/{id_ou_nom}", f"type_{id_ou_nom}")
+
+    def rencontres(self, id_pokemon) -> dict:
+        return self.obtenir(f"pokemon/{id_pokemon}/encounters", f"rencontres_{id_pokemon}")
+
+    def liste_types(self) -> dict:
+        """Liste de tous les types ({"count", "results": [{"name", "url"}, ...]})."""
+        liste = self.obtenir(CHEMIN_LISTE_TYPES, "liste_types")
+        if liste.get("count", 0) > len(liste["results"]):
+            # Liste enregistrée par une version précédente, sans ?limit= : seule sa première page
+            liste = self.telecharger(CHEMIN_LISTE_TYPES, "liste_types")
+        return liste
+
+
+def projeter_pokemon(donnees: dict) -> dict:
+    """
+    Réduit la réponse /pokemon/{id} aux seuls champs utilisés par pokestats et pokefiche
+    (sans moves, game_indices ni la plupart des sprites), en gardant la même structure
+    pour que les fonctions existantes puissent la lire telle quelle.
+    """
+    return {
+        "id": donnees["id"],
+        "name": donnees["name"],
+        "height": donnees["height"],
+        "weight": donnees["weight"],
+        "types": [{"slot": t["slot"], "type": {"name": t["type"]["name"], "url": t["type"]["url"]}}
+                  for t in donnees["types"]],
+        "stats": [{"base_stat": s["base_stat"], "stat": {"name": s["stat"]["name"]}}
+                  for s in donnees["stats"]],
+        "species": {"name": donnees["species"]["name"], "url": donnees["species"]["url"]},
+        "sprites": {"front_default": donnees["sprites"]["front_default"]},
+    }
+
+
+def analyser_url(url: str) -> tuple:
+    """
+    Convertit une URL de PokéAPI en (chemin relatif à l'API, clé de stockage).
+    Ex : https://pokeapi.co/api/v2/pokemon-species/1/ -> ("pokemon-species/1", "espece_1")
+    """
+    morceaux = [m for m in url.split("/api/v2/", 1)[-1].split("/") if m]
+    if len(morceaux) == 3 and morceaux[0] == "pokemon" and morceaux[2] == "encounters":
+        return "/".join(morceaux), f"rencontres_{morceaux[1]}"
+    if len(morceaux) != 2 or morceaux[0] not in PREFIXES:
+        raise ValueError(f"URL de PokéAPI non gérée : {url}")
+    return "/".join(morceaux), f"{PREFIXES[morceaux[0]]}{morceaux[1]}"
+
+
+def chemin_depuis_cle(cle: str) -> str:
+    """Inverse de analyser_url : retrouve le chemin de l'API correspondant à une clé de stockage."""
+    if cle == "liste_types":
+        return CHEMIN_LISTE_TYPES
+    if cle.startswith("rencontres_"):
+        return f"pokemon/{cle[len('rencontres_'):]}/encounters"
+    for ressource, prefixe in PREFIXES.items():
+        if prefixe and cle.startswith(prefixe):
+            return f"{ressource}/{cle[len(prefixe):]}"
+    return f"pokemon/{cle}"
+
+
+_client = None
+_verrou_client = threading.Lock()
+
+
+def client_defaut() -> ClientPokeAPI:
+    """Retourne le client partagé par cache.py, pokestats.py et pokefiche.py."""
+    global _client
+    with _verrou_client:
+        if _client is None:
+            _client = ClientPokeAPI()
+        return _client
@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from matrice import STATS
+from pokestats import iterer_pokemons_plage
+from traductions import id_depuis_url, nom_espece
+
+# ================================================
+# FORMAT DE L'EXPORT (version 1)
+# ================================================
+#
+# Un dossier, une colonne par fichier, sans en-tête (lisible avec np.memmap ou np.fromfile) :
+#   ids.bin, stats.bin, types.bin, taille.bin, poids.bin   colonnes numériques (voir COLONNES)
+#   noms.bin + noms.idx, noms_fr.bin + noms_fr.idx         tables de chaînes : UTF-8 bout à bout,
+#                                                          et N + 1 positions (int64) dans .bin
+#   manifeste.json   version, nombre de lignes, type et forme de chaque colonne, ordre des stats
+#                    et table des types ({code: nom anglais})
+#
+# Les lignes sont dans l'ordre d'ajout. Un ajout écrit d'abord les colonnes puis, en dernier,
+# le manifeste : seules ses « nombre » premières lignes font foi, et des octets en trop laissés
+# par un ajout interrompu sont tronqués au suivant.
+
+VERSION = 1
+
+# Colonnes numériques : nom -> (type numpy petit-boutiste, forme d'une ligne)
+COLONNES = {
+    "ids": ("<i4", ()),
+    "stats": ("<i2", (len(STATS),)),
+    "types": ("<i1", (2,)),  # codes dans manifeste["types"], -1 sans second type
+    "taille": ("<i2", ()),   # décimètres
+    "poids": ("<i2", ()),    # hectogrammes
+}
+
+CHAINES = ("noms", "noms_fr")
+
+
+class ExportInvalide(ValueError):
+    """Dossier d'export d'une version non gérée ou dont les fichiers ne correspondent pas au manifeste."""
+
+
+def _taille_ligne(nom: str) -> int:
+    type_numpy, forme = COLONNES[nom]
+    return np.dtype(type_numpy).itemsize * int(np.prod(forme, dtype=np.int64))
+
+
+def lire_manifeste(dossier: str):
+    """Retourne le manifeste d'un export, ou None si le dossier n'en contient pas encore."""
+    try:
+        with open(os.path.join(dossier, "manifeste.json"), "r", encoding="utf-8") as f:
+            manifeste = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifeste.get("version") != VERSION:
+        raise ExportInvalide(f"Version d'export non gérée : {manifeste.get('version')}")
+    return manifeste
+
+
+def _ecrire_manifeste(dossier: str, manifeste: dict) -> None:
+    descripteur, temporaire = tempfile.mkstemp(prefix=".manifeste.", suffix=".tmp", dir=dossier)
+    with os.fdopen(descripteur, "w", encoding="utf-8") as f:
+        json.dump(manifeste, f, ensure_ascii=False, indent=2)
+    os.chmod(temporaire, 0o644)  # lisible par les autres utilisateurs, comme les colonnes
+    os.replace(temporaire, os.path.join(dossier, "manifeste.json"))
+
+
+def _initialiser(dossier: str) -> dict:
+    os.makedirs(dossier, exist_ok=True)
+    for nom in COLONNES:
+        open(os.path.join(dossier, f"{nom}.bin"), "wb").close()
+    for nom in CHAINES:
+        open(os.path.join(dossier, f"{nom}.bin"), "wb").close()
+        np.zeros(1, dtype="<i8").tofile(os.path.join(dossier, f"{nom}.idx"))
+    manifeste = {
+        "version": VERSION,
+        "nombre": 0,
+        "colonnes": {nom: {"type": type_numpy, "forme": list(forme)} for nom, (type_numpy, forme) in COLONNES.items()},
+        "chaines": list(CHAINES),
+        "stats": STATS,
+        "types": [],
+    }
+    _ecrire_manifeste(dossier, manifeste)
+    return manifeste
+
+
+def _tronquer(dossier: str, nombre: int) -> None:
+    """Ramène chaque fichier aux nombre premières lignes (reste d'un ajout interrompu)."""
+    try:
+        for nom in COLONNES:
+            os.truncate(os.path.join(dossier, f"{nom}.bin"), nombre * _taille_ligne(nom))
+        for nom in CHAINES:
+            chemin_idx = os.path.join(dossier, f"{nom}.idx")
+            os.truncate(chemin_idx, (nombre + 1) * 8)
+            fin = int(np.fromfile(chemin_idx, dtype="<i8", count=1, offset=nombre * 8)[0])
+            os.truncate(os.path.join(dossier, f"{nom}.bin"), fin)
+    except (OSError, IndexError) as erreur:
+        raise ExportInvalide(f"Fichiers de l'export incomplets : {erreur}") from None
+
+
+def _lignes(pokemons: list, noms_fr: list, manifeste: dict) -> tuple:
+    """Convertit un lot de fiches (brutes ou compactes) en (colonnes numpy, chaînes)."""
+    codes = {nom: code for code, nom in enumerate(manifeste["types"])}
+    colonnes = {nom: np.zeros((len(pokemons),) + forme, dtype=type_numpy) for nom, (type_numpy, forme) in COLONNES.items()}
+    colonnes["types"][:] = -1
+    for n, pokemon in enumerate(pokemons):
+        par_nom = {s["stat"]["name"]: s["base_stat"] for s in pokemon["stats"]}
+        colonnes["ids"][n] = pokemon["id"]
+        colonnes["stats"][n] = [par_nom.get(stat, 0) for stat in STATS]
+        for position, t in enumerate(pokemon["types"][:2]):
+            nom_type = t["type"]["name"]
+            if nom_type not in codes:
+                codes[nom_type] = len(manifeste["types"])
+                manifeste["types"].append(nom_type)
+            colonnes["types"][n, position] = codes[nom_type]
+        colonnes["taille"][n] = pokemon["height"]
+        colonnes["poids"][n] = pokemon["weight"]
+    chaines = {"noms": [p["name"] for p in pokemons], "noms_fr": noms_fr}
+    return colonnes, chaines
+
+
+def _ajouter_lot(dossier: str, manifeste: dict, pokemons: list, noms_fr: list) -> None:
+    colonnes, chaines = _lignes(pokemons, noms_fr, manifeste)
+    for nom, valeurs in colonnes.items():
+        with open(os.path.join(dossier, f"{nom}.bin"), "ab") as f:
+            valeurs.tofile(f)
+    for nom, textes in chaines.items():
+        encodes = [texte.encode("utf-8") for texte in textes]
+        chemin_idx = os.path.join(dossier, f"{nom}.idx")
+        fin = int(np.fromfile(chemin_idx, dtype="<i8", count=1, offset=manifeste["nombre"] * 8)[0])
+        positions = fin + np.cumsum([len(e) for e in encodes], dtype=np.int64)
+        with open(os.path.join(dossier, f"{nom}.bin"), "ab") as f:
+            f.write(b"".join(encodes))
+        with open(chemin_idx, "ab") as f:
+            positions.astype("<i8").tofile(f)
+    manifeste["nombre"] += len(pokemons)
+    _ecrire_manifeste(dossier, manifeste)
+
+
+def _plages(ids: list) -> list:
+    """Regroupe des IDs triés en plages contiguës [(debut, fin), ...]."""
+    plages = []
+    for i in ids:
+        if plages and plages[-1][1] == i - 1:
+            plages[-1][1] = i
+        else:
+            plages.append([i, i])
+    return [tuple(plage) for plage in plages]
+
+
+def exporter(debut: int, fin: int, dossier: str = "export", taille_lot: int = 256, workers: int = 8) -> dict:
+    """
+    Ajoute à l'export les Pokémon de debut à fin qui n'y sont pas encore (lus par iterer_pokemons_plage).
+    Retourne un résumé {"ajoutes": n, "presents": n, "nombre": total, "duree": s}.
+    """
+    debut_chrono = time.perf_counter()
+    manifeste = lire_manifeste(dossier)
+    if manifeste is None:
+        manifeste = _initialiser(dossier)
+    _tronquer(dossier, manifeste["nombre"])
+
+    presents = set(np.fromfile(os.path.join(dossier, "ids.bin"), dtype=COLONNES["ids"][0]).tolist())
+    manquants = [i for i in range(debut, fin + 1) if i not in presents]
+    ajoutes = 0
+    with ThreadPoolExecutor(max_workers=workers) as executeur:
+        for debut_plage, fin_plage in _plages(manquants):
+            lot = []
+            for pokemon in iterer_pokemons_plage(debut_plage, fin_plage, workers=workers):
+                lot.append(pokemon)
+                if len(lot) == taille_lot:
+                    ajoutes += _exporter_lot(dossier, manifeste, lot, executeur)
+                    lot = []
+            if lot:
+                ajoutes += _exporter_lot(dossier, manifeste, lot, executeur)
+
+    return {"ajoutes": ajoutes, "presents": fin - debut + 1 - len(manquants),
+            "nombre": manifeste["nombre"], "duree": time.perf_counter() - debut_chrono}
+
+
+def _exporter_lot(dossier: str, manifeste: dict, lot: list, executeur) -> int:
+    # Noms français en parallèle : une espèce absente de l'index des traductions est téléchargée
+    noms_fr = list(executeur.map(lambda p: nom_espece(id_depuis_url(p["species"]["url"])) or "", lot))
+    _ajouter_lot(dossier, manifeste, lot, noms_fr)
+    return len(lot)
+
+
+def charger(dossier: str = "export") -> dict:
+    """
+    Ouvre un export sans rien analyser : chaque colonne numérique est un np.memmap en lecture seule
+    (ids, stats, types, taille, poids), les tables de chaînes sont décodées en listes (noms, noms_fr).
+    "noms_stats" donne l'ordre des colonnes de stats et "noms_types" le nom de chaque code de type.
+    """
+    manifeste = lire_manifeste(dossier)
+    if manifeste is None:
+        raise ExportInvalide(f"Aucun export dans {dossier}")
+    nombre = manifeste["nombre"]
+    donnees = {"noms_stats": manifeste["stats"], "noms_types": manifeste["types"]}
+    for nom, colonne in manifeste["colonnes"].items():
+        forme = (nombre,) + tuple(colonne["forme"])
+        if nombre == 0:
+            donnees[nom] = np.empty(forme, dtype=colonne["type"])
+        else:
+            donnees[nom] = np.memmap(os.path.join(dossier, f"{nom}.bin"), dtype=colonne["type"], mode="r", shape=forme)
+    for nom in manifeste["chaines"]:
+        positions = np.fromfile(os.path.join(dossier, f"{nom}.idx"), dtype="<i8", count=nombre + 1)
+        with open(os.path.join(dossier, f"{nom}.bin"), "rb") as f:
+            texte = f.read(int(positions[-1]))
+        donnees[nom] = [texte[a:b].decode("utf-8") for a, b in zip(positions[:-1].tolist(), positions[1:].tolist())]
+    return donnees
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporter le Pokédex en colonnes binaires (np.memmap).")
+    parser.add_argument("debut", type=int, help="Premier ID à exporter")
+    parser.add_argument("fin", type=int, help="Dernier ID à exporter")
+    parser.add_argument("--dossier", default="export", help="Dossier de l'export (complété s'il existe)")
+    parser.add_argument("--workers", type=int, default=8, help="Nombre de téléchargements simultanés")
+    args = parser.parse_args()
+
+    try:
+        resume = exporter(args.debut, args.fin, args.dossier, workers=args.workers)
+    except ExportInvalide as erreur:
+        print(f"Erreur : {erreur}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{resume['ajoutes']} Pokémon ajoutés ({resume['presents']} déjà présents) : "
+          f"{resume['nombre']} lignes dans {args.dossier} en {resume['duree']:.2f} s")
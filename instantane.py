@@ -0,0 +1,460 @@
+import os
+import sys
+import json
+import mmap
+import time
+import zlib
+import shutil
+import struct
+import hashlib
+import argparse
+import tempfile
+import threading
+from contextlib import ExitStack
+from stockage import EntreeCorrompue, ouvrir_stockage, stockage_defaut
+
+# ================================================
+# FORMAT D'UN INSTANTANÉ (version 1)
+# ================================================
+#
+# EN-TÊTE   : MAGIQUE (6 octets) + version (2 octets)
+# ENTRÉES   : pour chaque clé, un en-tête ENTREE (longueur de la clé, longueur des données
+#             compressées, CRC32 du JSON, horodatage, longueur des validateurs), puis la clé,
+#             les validateurs HTTP en JSON et le JSON compressé avec zlib
+# FIN       : un en-tête ENTREE dont la longueur de clé vaut 0
+# MANIFESTE : JSON (version, date, nombre d'entrées, SHA-256 des entrées, {clé: position})
+# PIED      : PIED (position et longueur du manifeste) + MAGIQUE_FIN
+#
+# Les entrées se lisent dans l'ordre (import en flux, même depuis un tube), et le pied permet
+# de retrouver le manifeste pour lire n'importe quelle entrée sur place (mmap).
+
+MAGIQUE = b"PKSNAP"
+MAGIQUE_FIN = b"PKSNAPFN"
+VERSION = 1
+EN_TETE = struct.Struct(">6sH")
+ENTREE = struct.Struct(">HIIdH")
+PIED = struct.Struct(">QI8s")
+
+
+class InstantaneInvalide(ValueError):
+    """Fichier qui n'est pas un instantané, d'une version non gérée, ou dont une somme ne correspond pas."""
+
+
+def _enregistrement(cle: str, texte: bytes, horodatage: float, validateurs: dict, niveau: int) -> bytes:
+    cle_octets = cle.encode()
+    validateurs_octets = json.dumps(validateurs).encode() if validateurs else b""
+    compresse = zlib.compress(texte, niveau)
+    return (ENTREE.pack(len(cle_octets), len(compresse), zlib.crc32(texte), horodatage, len(validateurs_octets))
+            + cle_octets + validateurs_octets + compresse)
+
+
+# ================================================
+# 1. EXPORT
+# ================================================
+
+def exporter(chemin: str, stockage=None, niveau: int = 6, url_api: str = None) -> dict:
+    """
+    Écrit tout le cache dans un seul fichier compressé (via un fichier temporaire renommé,
+    comme les écritures du stockage). Retourne le manifeste, sans la table des positions.
+    """
+    stockage = stockage or stockage_defaut()
+    dossier = os.path.dirname(os.path.abspath(chemin))
+    descripteur, temporaire = tempfile.mkstemp(prefix=".instantane.", suffix=".tmp", dir=dossier)
+    positions = {}
+    empreinte = hashlib.sha256()
+    octets_json = 0
+    try:
+        with os.fdopen(descripteur, "wb") as f:
+            f.write(EN_TETE.pack(MAGIQUE, VERSION))
+            position = EN_TETE.size
+            for cle in sorted(stockage.cles()):
+                entree = stockage.lire_entree(cle)
+                if entree is None:
+                    continue
+                texte = json.dumps(entree[0]).encode()
+                enregistrement = _enregistrement(cle, texte, entree[1], stockage.lire_validateurs(cle), niveau)
+                f.write(enregistrement)
+                empreinte.update(enregistrement)
+                positions[cle] = position
+                position += len(enregistrement)
+                octets_json += len(texte)
+            f.write(ENTREE.pack(0, 0, 0, 0.0, 0))
+
+            manifeste = {
+                "version": VERSION,
+                "cree": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "url_api": url_api,
+                "nombre": len(positions),
+                "octets_json": octets_json,
+                "octets_compresses": position - EN_TETE.size,
+                "sha256": empreinte.hexdigest(),
+                "positions": positions,
+            }
+            texte_manifeste = json.dumps(manifeste).encode()
+            debut_manifeste = position + ENTREE.size
+            f.write(texte_manifeste)
+            f.write(PIED.pack(debut_manifeste, len(texte_manifeste), MAGIQUE_FIN))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.remove(temporaire)
+        raise
+    del manifeste["positions"]
+    return manifeste
+
+
+# ================================================
+# 2. IMPORT EN FLUX
+# ================================================
+
+def _lire_exactement(flux, taille: int) -> bytes:
+    morceaux = []
+    while taille:
+        morceau = flux.read(taille)
+        if not morceau:
+            raise InstantaneInvalide("instantané tronqué")
+        morceaux.append(morceau)
+        taille -= len(morceau)
+    return b"".join(morceaux)
+
+
+def lire_entrees(flux):
+    """
+    Générateur qui lit un instantané dans l'ordre : (clé, données, horodatage, validateurs).
+    Chaque entrée est vérifiée (CRC32) ; à la fin, le SHA-256 de toutes les entrées est comparé
+    à celui du manifeste. Aucun retour en arrière : le flux peut être un tube.
+    """
+    magique, version = EN_TETE.unpack(_lire_exactement(flux, EN_TETE.size))
+    if magique != MAGIQUE:
+        raise InstantaneInvalide("ce fichier n'est pas un instantané du cache")
+    if version != VERSION:
+        raise InstantaneInvalide(f"version d'instantané non gérée : {version}")
+
+    empreinte = hashlib.sha256()
+    while True:
+        en_tete = _lire_exactement(flux, ENTREE.size)
+        longueur_cle, longueur, somme, horodatage, longueur_validateurs = ENTREE.unpack(en_tete)
+        if longueur_cle == 0:
+            break
+        reste = _lire_exactement(flux, longueur_cle + longueur_validateurs + longueur)
+        empreinte.update(en_tete)
+        empreinte.update(reste)
+        try:
+            cle = reste[:longueur_cle].decode()
+            validateurs = reste[longueur_cle:longueur_cle + longueur_validateurs]
+            texte = zlib.decompress(reste[longueur_cle + longueur_validateurs:])
+        except (UnicodeDecodeError, zlib.error):
+            raise InstantaneInvalide("entrée illisible") from None
+        if zlib.crc32(texte) != somme:
+            raise InstantaneInvalide(f"somme de contrôle invalide pour {cle}")
+        yield cle, json.loads(texte), horodatage, json.loads(validateurs) if validateurs else None
+
+    texte_manifeste = flux.read()[:-PIED.size]
+    try:
+        manifeste = json.loads(texte_manifeste)
+    except ValueError:
+        raise InstantaneInvalide("manifeste illisible") from None
+    if manifeste.get("sha256") != empreinte.hexdigest():
+        raise InstantaneInvalide("SHA-256 des entrées différent de celui du manifeste")
+
+
+def importer(source, stockage=None, taille_paquet: int = 200) -> int:
+    """
+    Importe un instantané (chemin, "-" pour l'entrée standard, ou flux binaire) dans le stockage,
+    par paquets de taille_paquet entrées : la mémoire utilisée ne dépend pas de la taille du fichier.
+    L'instantané est entièrement vérifié (CRC32 et SHA-256) avant la première écriture : un fichier
+    altéré ou tronqué lève InstantaneInvalide sans rien importer. Un flux est pour cela d'abord
+    recopié dans un fichier temporaire, relu ensuite. Retourne le nombre d'entrées importées.
+    """
+    stockage = stockage or stockage_defaut()
+    with ExitStack() as pile:
+        if isinstance(source, str) and source != "-":
+            flux = pile.enter_context(open(source, "rb", buffering=1 << 20))
+        else:
+            flux = pile.enter_context(tempfile.TemporaryFile())
+            shutil.copyfileobj(sys.stdin.buffer if source == "-" else source, flux, 1 << 20)
+            flux.seek(0)
+
+        for _ in lire_entrees(flux):
+            pass
+        flux.seek(0)
+
+        # Les entrées gardent l'horodatage de l'instantané : elles se périment (POKE_TTL) comme
+        # si l'instantané était lu sur place
+        importees = 0
+        paquet, validateurs, horodatages = {}, {}, {}
+        for cle, donnees, horodatage, entetes in lire_entrees(flux):
+            paquet[cle] = donnees
+            validateurs[cle] = entetes
+            horodatages[cle] = horodatage
+            if len(paquet) >= taille_paquet:
+                stockage.ecrire_plusieurs(paquet, validateurs, horodatages)
+                importees += len(paquet)
+                paquet, validateurs, horodatages = {}, {}, {}
+        stockage.ecrire_plusieurs(paquet, validateurs, horodatages)
+        importees += len(paquet)
+    return importees
+
+
+# ================================================
+# 3. LECTURE SUR PLACE (mmap)
+# ================================================
+
+class StockageInstantane:
+    """
+    Stockage en lecture seule qui lit un instantané sur place : le fichier est projeté en mémoire
+    (mmap) et seul le manifeste est décodé à l'ouverture ; chaque entrée n'est décompressée
+    (et sa somme vérifiée) qu'au moment où elle est lue. Les pages du fichier sont partagées
+    par tous les processus qui ouvrent le même instantané.
+    """
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self._fichier = open(chemin, "rb")
+        try:
+            self._carte = mmap.mmap(self._fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fichier.close()
+            raise InstantaneInvalide(f"{chemin} est vide") from None
+        taille = len(self._carte)
+        if taille < EN_TETE.size + ENTREE.size + PIED.size:
+            self.fermer()
+            raise InstantaneInvalide(f"{chemin} est trop court pour être un instantané du cache")
+        magique, version = EN_TETE.unpack_from(self._carte, 0)
+        debut, longueur, fin = PIED.unpack_from(self._carte, taille - PIED.size)
+        if magique != MAGIQUE or fin != MAGIQUE_FIN:
+            self.fermer()
+            raise InstantaneInvalide(f"{chemin} n'est pas un instantané du cache")
+        if version != VERSION:
+            self.fermer()
+            raise InstantaneInvalide(f"version d'instantané non gérée : {version}")
+        try:
+            if debut + longueur > taille - PIED.size:
+                raise ValueError("manifeste hors du fichier")
+            self.manifeste = json.loads(self._carte[debut:debut + longueur])
+        except ValueError:
+            self.fermer()
+            raise InstantaneInvalide(f"manifeste illisible dans {chemin}") from None
+        self.positions = self.manifeste["positions"]
+        self.quarantaine = set()
+        self._verrou = threading.Lock()
+
+    def _lire_enregistrement(self, cle: str):
+        position = self.positions.get(cle)
+        if position is None or cle in self.quarantaine:
+            return None
+        longueur_cle, longueur, somme, horodatage, longueur_validateurs = ENTREE.unpack_from(self._carte, position)
+        debut = position + ENTREE.size + longueur_cle
+        return debut, longueur_validateurs, longueur, somme, horodatage
+
+    def _charger(self, cle: str):
+        enregistrement = self._lire_enregistrement(cle)
+        if enregistrement is None:
+            return None
+        debut, longueur_validateurs, longueur, somme, horodatage = enregistrement
+        debut += longueur_validateurs
+        try:
+            texte = zlib.decompress(self._carte[debut:debut + longueur])
+        except zlib.error as erreur:
+            raise EntreeCorrompue(cle, str(erreur)) from erreur
+        if zlib.crc32(texte) != somme:
+            raise EntreeCorrompue(cle, "somme de contrôle invalide")
+        return json.loads(texte), horodatage, len(texte)
+
+    def contient(self, cle: str) -> bool:
+        return cle in self.positions and cle not in self.quarantaine
+
+    def lire_entree(self, cle: str):
+        """Retourne (données, horodatage d'écriture, taille en octets), ou None si la clé est absente ou corrompue."""
+        try:
+            return self._charger(cle)
+        except EntreeCorrompue as erreur:
+            self.mettre_en_quarantaine(cle, erreur.raison)
+            return None
+
+    def lire(self, cle: str):
+        entree = self.lire_entree(cle)
+        return entree[0] if entree is not None else None
+
+    def lire_entrees(self, cles: list) -> dict:
+        resultat = {}
+        for cle in cles:
+            entree = self.lire_entree(cle)
+            if entree is not None:
+                resultat[cle] = entree
+        return resultat
+
+    def lire_plusieurs(self, cles: list) -> dict:
+        return {cle: entree[0] for cle, entree in self.lire_entrees(cles).items()}
+
+    def verifier_entree(self, cle: str) -> bool:
+        try:
+            return self._charger(cle) is not None
+        except EntreeCorrompue:
+            return False
+
+    def lire_validateurs(self, cle: str):
+        enregistrement = self._lire_enregistrement(cle)
+        if enregistrement is None or not enregistrement[1]:
+            return None
+        debut, longueur_validateurs = enregistrement[0], enregistrement[1]
+        return json.loads(self._carte[debut:debut + longueur_validateurs])
+
+    def mettre_en_quarantaine(self, cle: str, raison: str = "") -> None:
+        """Le fichier n'est pas modifié : l'entrée est seulement ignorée jusqu'à la fermeture."""
+        with self._verrou:
+            self.quarantaine.add(cle)
+
+    def cles(self) -> list:
+        return [cle for cle in self.positions if cle not in self.quarantaine]
+
+    def ecrire(self, cle: str, donnees: dict, validateurs: dict = None) -> None:
+        raise PermissionError("un instantané est en lecture seule (voir StockageSuperpose)")
+
+    def horodatages(self) -> dict:
+        """Horodatage de chaque entrée, lu dans son en-tête sans décompresser les données."""
+        return {cle: self._lire_enregistrement(cle)[4] for cle in self.cles()}
+
+    def signature(self):
+        """Seules les entrées masquées (quarantaine) changent : le fichier est en lecture seule."""
+        return self.manifeste.get("sha256"), len(self.quarantaine)
+
+    def ecrire_plusieurs(self, elements: dict, validateurs: dict = None, horodatages: dict = None) -> None:
+        raise PermissionError("un instantané est en lecture seule (voir StockageSuperpose)")
+
+    def fermer(self) -> None:
+        if getattr(self, "_carte", None) is not None:
+            self._carte.close()
+            self._carte = None
+        self._fichier.close()
+
+
+class StockageSuperpose:
+    """
+    Stockage local (en écriture) posé sur un instantané (en lecture seule) : les lectures
+    cherchent d'abord dans le stockage local, puis dans l'instantané ; les écritures ne vont
+    que dans le stockage local. Un nouveau nœud sert ainsi tout le cache de l'instantané
+    dès son ouverture, sans rien importer.
+    """
+
+    def __init__(self, local, instantane: StockageInstantane):
+        self.local = local
+        self.instantane = instantane
+
+    def contient(self, cle: str) -> bool:
+        return self.local.contient(cle) or self.instantane.contient(cle)
+
+    def lire_entree(self, cle: str):
+        entree = self.local.lire_entree(cle)
+        return entree if entree is not None else self.instantane.lire_entree(cle)
+
+    def lire(self, cle: str):
+        entree = self.lire_entree(cle)
+        return entree[0] if entree is not None else None
+
+    def lire_entrees(self, cles: list) -> dict:
+        resultat = self.local.lire_entrees(cles)
+        resultat.update(self.instantane.lire_entrees([cle for cle in cles if cle not in resultat]))
+        return resultat
+
+    def lire_plusieurs(self, cles: list) -> dict:
+        return {cle: entree[0] for cle, entree in self.lire_entrees(cles).items()}
+
+    def verifier_entree(self, cle: str) -> bool:
+        if self.local.contient(cle):
+            return self.local.verifier_entree(cle)
+        return self.instantane.verifier_entree(cle)
+
+    def lire_validateurs(self, cle: str):
+        if self.local.contient(cle):
+            return self.local.lire_validateurs(cle)
+        return self.instantane.lire_validateurs(cle)
+
+    def toucher(self, cle: str) -> None:
+        """Une entrée de l'instantané revalidée est recopiée dans le stockage local avec l'horodatage actuel."""
+        if self.local.contient(cle):
+            self.local.toucher(cle)
+            return
+        donnees = self.instantane.lire(cle)
+        if donnees is not None:
+            self.local.ecrire(cle, donnees, self.instantane.lire_validateurs(cle))
+
+    def ecrire(self, cle: str, donnees: dict, validateurs: dict = None) -> None:
+        self.local.ecrire(cle, donnees, validateurs)
+
+    def ecrire_plusieurs(self, elements: dict, validateurs: dict = None, horodatages: dict = None) -> None:
+        self.local.ecrire_plusieurs(elements, validateurs, horodatages)
+
+    def mettre_en_quarantaine(self, cle: str, raison: str = "") -> None:
+        if self.local.contient(cle):
+            self.local.mettre_en_quarantaine(cle, raison)
+        else:
+            self.instantane.mettre_en_quarantaine(cle, raison)
+
+    def supprimer(self, cle: str) -> None:
+        """Supprime l'entrée locale ; une entrée de l'instantané est seulement masquée."""
+        self.local.supprimer(cle)
+        self.instantane.mettre_en_quarantaine(cle, "supprimée")
+
+    def cles(self) -> list:
+        return list(dict.fromkeys(self.local.cles() + self.instantane.cles()))
+
+    def horodatages(self) -> dict:
+        horodatages = self.instantane.horodatages()
+        horodatages.update(self.local.horodatages())
+        return horodatages
+
+    def signature(self):
+        return self.local.signature(), self.instantane.signature()
+
+    def fermer(self) -> None:
+        self.local.fermer()
+        self.instantane.fermer()
+
+
+def verifier(chemin: str) -> dict:
+    """Relit tout l'instantané (sommes CRC32 et SHA-256) et retourne son manifeste."""
+    with open(chemin, "rb", buffering=1 << 20) as flux:
+        nombre = sum(1 for _ in lire_entrees(flux))
+    instantane = StockageInstantane(chemin)
+    manifeste = {k: v for k, v in instantane.manifeste.items() if k != "positions"}
+    instantane.fermer()
+    if nombre != manifeste["nombre"]:
+        raise InstantaneInvalide(f"{nombre} entrées lues, {manifeste['nombre']} annoncées par le manifeste")
+    return manifeste
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Instantanés compressés du cache.")
+    sous_commandes = parser.add_subparsers(dest="commande", required=True)
+    # Option des sous-commandes qui lisent ou écrivent le cache (après le nom de la sous-commande)
+    avec_stockage = argparse.ArgumentParser(add_help=False)
+    avec_stockage.add_argument("--stockage", choices=["sqlite", "repertoire"], help="Stockage du cache (défaut : POKE_STOCKAGE)")
+    export = sous_commandes.add_parser("exporter", parents=[avec_stockage], help="Écrire tout le cache dans un instantané")
+    export.add_argument("fichier", help="Fichier de l'instantané")
+    export.add_argument("--niveau", type=int, default=6, help="Niveau de compression zlib (1-9)")
+    import_ = sous_commandes.add_parser("importer", parents=[avec_stockage], help="Importer un instantané dans le cache (en flux)")
+    import_.add_argument("fichier", help="Fichier de l'instantané, ou - pour l'entrée standard")
+    verification = sous_commandes.add_parser("verifier", help="Vérifier les sommes d'un instantané")
+    verification.add_argument("fichier", help="Fichier de l'instantané")
+    args = parser.parse_args()
+
+    try:
+        if args.commande == "exporter":
+            from client import URL_API
+            debut = time.perf_counter()
+            manifeste = exporter(args.fichier, ouvrir_stockage(args.stockage), args.niveau, URL_API)
+            print(f"{manifeste['nombre']} entrées exportées dans {args.fichier} : "
+                  f"{manifeste['octets_json'] / 1e6:.1f} Mo de JSON -> {manifeste['octets_compresses'] / 1e6:.1f} Mo "
+                  f"en {time.perf_counter() - debut:.1f} s")
+        elif args.commande == "importer":
+            debut = time.perf_counter()
+            n = importer(args.fichier, ouvrir_stockage(args.stockage))
+            print(f"{n} entrées importées en {time.perf_counter() - debut:.1f} s")
+        else:
+            manifeste = verifier(args.fichier)
+            print(f"Instantané valide : {manifeste['nombre']} entrées, créé le {manifeste['cree']}")
+    except InstantaneInvalide as erreur:
+        print(f"Erreur : {erreur}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,92 @@
+import numpy as np
+
+# Ordre des colonnes de la matrice (ordre de l'API)
+STATS = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+
+
+class MatriceStats:
+    """
+    Statistiques de base d'un ensemble de Pokémon rangées en colonnes :
+    - ids : tableau (N,) des IDs
+    - noms : tableau (N,) des noms anglais
+    - valeurs : matrice (N, 6) d'entiers, une colonne par statistique (voir STATS)
+    Toutes les requêtes (top-k, classement, percentiles, min/max) sont vectorisées.
+    """
+
+    def __init__(self, ids, noms, valeurs):
+        self.ids = np.asarray(ids, dtype=np.int32)
+        self.noms = np.asarray(noms, dtype=object)
+        self.valeurs = np.asarray(valeurs, dtype=np.int32).reshape(-1, len(STATS))
+        self._ligne_par_id = {int(i): n for n, i in enumerate(self.ids)}
+
+    @classmethod
+    def depuis_pokemons(cls, pokemons) -> "MatriceStats":
+        """Construit la matrice à partir de fiches Pokémon (brutes ou compactes)."""
+        ids, noms, valeurs = [], [], []
+        for pokemon in pokemons:
+            par_nom = {s["stat"]["name"]: s["base_stat"] for s in pokemon["stats"]}
+            ids.append(pokemon["id"])
+            noms.append(pokemon["name"])
+            valeurs.append([par_nom.get(stat, 0) for stat in STATS])
+        return cls(ids, noms, np.array(valeurs, dtype=np.int32).reshape(-1, len(STATS)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def ligne(self, id_pokemon: int) -> int:
+        """Retourne l'indice de ligne d'un ID."""
+        return self._ligne_par_id[int(id_pokemon)]
+
+    # ---------- scores ----------
+
+    def score(self, critere) -> np.ndarray:
+        """
+        Retourne un score par Pokémon. Le critère est soit le nom d'une statistique ("speed"),
+        soit un dictionnaire de poids ({"attack": 1, "special-attack": 1}), soit "total".
+        """
+        if isinstance(critere, str):
+            if critere == "total":
+                return self.valeurs.sum(axis=1)
+            return self.valeurs[:, STATS.index(critere)]
+        poids = np.zeros(len(STATS))
+        for stat, p in critere.items():
+            poids[STATS.index(stat)] = p
+        return self.valeurs @ poids
+
+    # ---------- requêtes ----------
+
+    def top_k(self, critere, k: int = 10) -> list:
+        """Retourne les k meilleurs [(id, nom, score), ...] par ordre décroissant."""
+        scores = self.score(critere)
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        candidats = np.argpartition(-scores, k - 1)[:k]
+        ordre = candidats[np.lexsort((candidats, -scores[candidats]))]
+        return [(int(self.ids[i]), self.noms[i], scores[i].item()) for i in ordre]
+
+    def classement(self, critere) -> np.ndarray:
+        """Retourne les indices de ligne triés du meilleur au moins bon (ordre stable en cas d'égalité)."""
+        return np.argsort(-self.score(critere), kind="stable")
+
+    def rangs(self, critere) -> np.ndarray:
+        """Retourne le rang (1 = meilleur) de chaque Pokémon."""
+        rangs = np.empty(len(self), dtype=np.int32)
+        rangs[self.classement(critere)] = np.arange(1, len(self) + 1)
+        return rangs
+
+    def percentile(self, critere, q) -> np.ndarray:
+        """Retourne le ou les percentiles q (0-100) du critère."""
+        return np.percentile(self.score(critere), q)
+
+    def maximum(self, critere) -> tuple:
+        """Retourne (id, score) du Pokémon ayant le plus haut score (le premier en cas d'égalité)."""
+        scores = self.score(critere)
+        i = int(np.argmax(scores))
+        return int(self.ids[i]), scores[i].item()
+
+    def minimum(self, critere) -> tuple:
+        """Retourne (id, score) du Pokémon ayant le plus bas score (le premier en cas d'égalité)."""
+        scores = self.score(critere)
+        i = int(np.argmin(scores))
+        return int(self.ids[i]), scores[i].item()
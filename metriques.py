@@ -0,0 +1,139 @@
+import sys
+import json
+import time
+import atexit
+import threading
+from contextlib import nullcontext
+
+# Métriques du processus : durée de chaque étape (réseau, lecture disque, JSON, Markdown, HTML...),
+# octets transférés et compteurs du cache (succès mémoire/disque, absences, entrées corrompues).
+# Désactivées par défaut : chaque point de mesure ne coûte alors qu'un test sur _actif.
+
+_actif = False
+_verrou = threading.Lock()
+_compteurs = {}
+_etapes = {}  # nom -> [nombre, durée totale, durée max]
+_NUL = nullcontext()
+
+
+class _Chrono:
+    __slots__ = ("nom", "debut")
+
+    def __init__(self, nom: str):
+        self.nom = nom
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duree = time.perf_counter() - self.debut
+        with _verrou:
+            mesure = _etapes.get(self.nom)
+            if mesure is None:
+                _etapes[self.nom] = [1, duree, duree]
+            else:
+                mesure[0] += 1
+                mesure[1] += duree
+                if duree > mesure[2]:
+                    mesure[2] = duree
+        return False
+
+
+def actif() -> bool:
+    return _actif
+
+
+def activer(format: str = None, fichier: str = None) -> None:
+    """
+    Active la collecte. Avec format ("json" ou "prometheus"), le rapport est écrit à la fin
+    du processus, dans fichier ou à défaut sur la sortie d'erreur.
+    """
+    global _actif
+    _actif = True
+    if format is not None:
+        atexit.register(ecrire_rapport, format, fichier)
+
+
+def etape(nom: str):
+    """Chronomètre un bloc : with etape("reseau"): ..."""
+    return _Chrono(nom) if _actif else _NUL
+
+
+def compter(nom: str, valeur: float = 1) -> None:
+    """Incrémente un compteur (ex : compter("octets_recus", len(contenu)))."""
+    if not _actif:
+        return
+    with _verrou:
+        _compteurs[nom] = _compteurs.get(nom, 0) + valeur
+
+
+def reinitialiser() -> None:
+    with _verrou:
+        _compteurs.clear()
+        _etapes.clear()
+
+
+def etat() -> dict:
+    """Compteurs et étapes bruts, à transmettre depuis un processus de travail (voir fusionner)."""
+    with _verrou:
+        return {"compteurs": dict(_compteurs), "etapes": {nom: list(mesure) for nom, mesure in _etapes.items()}}
+
+
+def fusionner(etat_processus: dict) -> None:
+    """Ajoute aux métriques de ce processus celles mesurées dans un autre (ex : rendu en lot)."""
+    with _verrou:
+        for nom, valeur in etat_processus["compteurs"].items():
+            _compteurs[nom] = _compteurs.get(nom, 0) + valeur
+        for nom, (n, total, maximum) in etat_processus["etapes"].items():
+            mesure = _etapes.setdefault(nom, [0, 0.0, 0.0])
+            mesure[0] += n
+            mesure[1] += total
+            mesure[2] = max(mesure[2], maximum)
+
+
+def rapport() -> dict:
+    with _verrou:
+        return {
+            "compteurs": dict(sorted(_compteurs.items())),
+            "etapes": {
+                nom: {"nombre": n, "total_s": total, "moyenne_s": total / n, "max_s": maximum}
+                for nom, (n, total, maximum) in sorted(_etapes.items())
+            },
+        }
+
+
+def en_prometheus(prefixe: str = "pokeapi") -> str:
+    """Rapport au format texte de Prometheus."""
+    donnees = rapport()
+    lignes = []
+    for nom, valeur in donnees["compteurs"].items():
+        lignes.append(f"# TYPE {prefixe}_{nom}_total counter")
+        lignes.append(f"{prefixe}_{nom}_total {valeur}")
+    if donnees["etapes"]:
+        lignes.append(f"# TYPE {prefixe}_etape_secondes summary")
+        for nom, mesure in donnees["etapes"].items():
+            lignes.append(f'{prefixe}_etape_secondes_count{{etape="{nom}"}} {mesure["nombre"]}')
+            lignes.append(f'{prefixe}_etape_secondes_sum{{etape="{nom}"}} {mesure["total_s"]:.6f}')
+    return "\n".join(lignes) + "\n"
+
+
+def ecrire_rapport(format: str = "json", fichier: str = None) -> None:
+    texte = en_prometheus() if format == "prometheus" else json.dumps(rapport(), indent=2) + "\n"
+    if fichier:
+        with open(fichier, "w", encoding="utf-8") as f:
+            f.write(texte)
+    else:
+        sys.stderr.write(texte)
+
+
+def ajouter_option(parser) -> None:
+    """Ajoute --metrics [json|prometheus] et --metrics-fichier à un parser argparse."""
+    parser.add_argument("--metrics", nargs="?", const="json", choices=["json", "prometheus"],
+                        help="Écrire les métriques (temps par étape, cache, octets) à la fin du programme")
+    parser.add_argument("--metrics-fichier", help="Fichier du rapport de métriques (défaut : sortie d'erreur)")
+
+
+def depuis_arguments(args) -> None:
+    if args.metrics:
+        activer(args.metrics, args.metrics_fichier)
@@ -0,0 +1,151 @@
+import re
+import unicodedata
+from traductions import charger_index, version_index
+
+# Nombre de candidats (partageant le plus de trigrammes) comparés par distance d'édition
+CANDIDATS = 20
+
+# Longueur minimale (nom normalisé) d'une entrée pour la recherche approchée : en dessous,
+# une seule faute suffit à tomber sur un autre Pokémon ("ab" -> "abo")
+LONGUEUR_APPROCHEE = 4
+
+# Symboles de genre gardés sous la forme des noms de l'API : "Nidoran♀" -> "nidoranf" (nidoran-f)
+_GENRES = str.maketrans({"♀": "f", "♂": "m"})
+
+_SLUG = re.compile(r"[a-z0-9]+(-[a-z0-9]+)*")
+
+
+def normaliser(nom: str) -> str:
+    """Minuscules, sans accents ni ponctuation : "Mr. Mime" -> "mrmime", "Électhor" -> "electhor"."""
+    decompose = unicodedata.normalize("NFKD", nom.translate(_GENRES).casefold())
+    return "".join(c for c in decompose if c.isalnum() and not unicodedata.combining(c))
+
+
+def trigrammes(nom: str) -> set:
+    nom = f"  {nom} "
+    return {nom[i:i + 3] for i in range(len(nom) - 2)}
+
+
+def distance_edition(a: str, b: str, maximum: int) -> int:
+    """Distance de Levenshtein entre a et b, arrêtée dès qu'elle dépasse maximum."""
+    if abs(len(a) - len(b)) > maximum:
+        return maximum + 1
+    precedente = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        courante = [i]
+        for j, cb in enumerate(b, start=1):
+            courante.append(min(precedente[j] + 1, courante[j - 1] + 1, precedente[j - 1] + (ca != cb)))
+        if min(courante) > maximum:
+            return maximum + 1
+        precedente = courante
+    return precedente[-1]
+
+
+class IndexNoms:
+    """
+    Index des noms de Pokémon dans toutes les langues de l'index des traductions.
+    Recherche exacte sur le nom normalisé (sans accents), puis approchée : les noms partageant
+    le plus de trigrammes avec l'entrée sont départagés par distance d'édition.
+    Un nom normalisé porté par plusieurs espèces est ambigu : il n'est jamais résolu localement.
+    """
+
+    def __init__(self, noms: dict, ambigus: dict = None):
+        # noms : {nom normalisé: id} ; ambigus : {nom normalisé: {ids}}
+        self.ids = noms
+        self.ambigus = ambigus or {}
+        self.noms = list(noms)
+        self.trigrammes = {}
+        for position, nom in enumerate(self.noms):
+            for trigramme in trigrammes(nom):
+                self.trigrammes.setdefault(trigramme, []).append(position)
+
+    @classmethod
+    def depuis_traductions(cls, index_traductions: dict) -> "IndexNoms":
+        noms, ambigus = {}, {}
+        for id_espece, par_langue in index_traductions["especes"].items():
+            for nom in par_langue.values():
+                cle = normaliser(nom)
+                if noms.setdefault(cle, int(id_espece)) != int(id_espece):
+                    ambigus.setdefault(cle, {noms[cle]}).add(int(id_espece))
+        for cle in ambigus:
+            del noms[cle]
+        return cls(noms, ambigus)
+
+    def rechercher(self, entree: str, tolerance: int = None) -> tuple:
+        """
+        Retourne (id, nom normalisé trouvé, distance), ou None si rien d'assez proche ou si le
+        nom est ambigu. Par défaut, la distance tolérée est d'une faute pour 4 lettres, et une
+        entrée de moins de LONGUEUR_APPROCHEE lettres n'est cherchée qu'exactement.
+        """
+        cible = normaliser(entree)
+        if not cible or cible in self.ambigus:
+            return None
+        if cible in self.ids:
+            return self.ids[cible], cible, 0
+
+        if tolerance is None:
+            tolerance = len(cible) // 4 if len(cible) >= LONGUEUR_APPROCHEE else 0
+        if tolerance == 0:
+            return None
+        communs = {}
+        for trigramme in trigrammes(cible):
+            for position in self.trigrammes.get(trigramme, ()):
+                communs[position] = communs.get(position, 0) + 1
+        candidats = sorted(communs, key=lambda position: -communs[position])[:CANDIDATS]
+
+        meilleur = None
+        for position in candidats:
+            nom = self.noms[position]
+            distance = distance_edition(cible, nom, tolerance)
+            if distance <= tolerance and (meilleur is None or distance < meilleur[2]):
+                meilleur = (self.ids[nom], nom, distance)
+        return meilleur
+
+
+_index = None
+_version = None
+
+
+def index_noms() -> IndexNoms:
+    """
+    Retourne l'index des noms, construit depuis l'index des traductions, et reconstruit
+    seulement quand celui-ci a changé dans le processus (construction ou entrée complétée).
+    """
+    global _index, _version
+    version = version_index()
+    if _index is None or _version != version:
+        _index = IndexNoms.depuis_traductions(charger_index())
+        _version = version
+    return _index
+
+
+_slugs_inconnus = set()
+
+
+def _depuis_api(slug: str) -> int:
+    """ID d'un nom de l'API (ex : "nidoran-f") absent de l'index, via le cache puis l'API ; None si inconnu."""
+    if slug in _slugs_inconnus:
+        return None
+    from client import client_defaut
+    try:
+        return client_defaut().pokemon_compact(slug)["id"]
+    except (OSError, ValueError):  # requests.RequestException (404 compris) hérite d'OSError
+        _slugs_inconnus.add(slug)
+        return None
+
+
+def resoudre(entree) -> int:
+    """
+    Convertit un ID, un nom (toutes langues, avec ou sans accents) ou un nom mal orthographié en ID.
+    Tout est d'abord résolu localement (nom exact, puis recherche approchée) ; seulement si rien
+    n'est assez proche, l'entrée est essayée telle quelle comme nom de l'API (ex : une forme
+    absente de l'index des traductions). None si rien ne correspond.
+    """
+    entree = str(entree).strip()
+    if entree.isdigit():
+        return int(entree)
+    trouve = index_noms().rechercher(entree)
+    if trouve:
+        return trouve[0]
+    slug = entree.lower()
+    return _depuis_api(slug) if _SLUG.fullmatch(slug) else None
@@ -0,0 +1,190 @@
+import os
+import time
+import random
+import threading
+import metriques
+
+# Débit maximal vers l'API (requêtes par seconde) ; 0 = pas de limite
+DEBIT = float(os.environ.get("POKE_DEBIT", "100"))
+
+# Nombre maximal d'essais d'une requête (le premier compris)
+ESSAIS = int(os.environ.get("POKE_ESSAIS", "5"))
+
+# Réponses qui méritent un nouvel essai : trop de requêtes, ou erreur passagère du serveur
+STATUTS_A_REESSAYER = {429, 500, 502, 503, 504}
+
+
+class PauseTropLongue(OSError):
+    """
+    Le serveur a demandé (Retry-After) une pause plus longue que l'attente maximale de
+    l'ordonnanceur : la requête échoue au lieu d'être réessayée avant la fin de la pause.
+    Hérite d'OSError, comme requests.RequestException : elle est traitée comme une API injoignable.
+    """
+
+    def __init__(self, delai: float, maximum: float, response=None):
+        super().__init__(f"le serveur demande une pause de {delai:.0f} s (Retry-After), "
+                         f"plus longue que l'attente maximale de {maximum:.0f} s")
+        self.delai = delai
+        self.response = response
+
+
+class SeauJetons:
+    """
+    Limiteur de débit à seau de jetons : debit jetons par seconde, au plus capacite en réserve
+    (rafale autorisée). Chaque requête prend un jeton, ou attend qu'il y en ait un.
+    """
+
+    def __init__(self, debit: float, capacite: float = None):
+        self.debit = debit
+        self.capacite = capacite or max(1.0, debit)
+        self.jetons = self.capacite
+        self.dernier = time.monotonic()
+        self._verrou = threading.Lock()
+
+    def acquerir(self) -> None:
+        with self._verrou:
+            maintenant = time.monotonic()
+            self.jetons = min(self.capacite, self.jetons + (maintenant - self.dernier) * self.debit)
+            self.dernier = maintenant
+            # Le jeton est réservé tout de suite : les suivants attendent leur tour derrière
+            self.jetons -= 1
+            attente = -self.jetons / self.debit if self.jetons < 0 else 0.0
+        if attente:
+            time.sleep(attente)
+
+
+class ConcurrenceAdaptative:
+    """
+    Nombre de requêtes simultanées ajusté en AIMD : +1 par « tour » de réponses rapides,
+    divisé par deux sur un 429 ou une réponse plus lente que seuil_latence secondes
+    (au plus une division par intervalle, pour ne pas réagir plusieurs fois à la même rafale).
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, seuil_latence: float = 5.0, intervalle: float = 1.0):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.seuil_latence = seuil_latence
+        self.intervalle = intervalle
+        self.limite = float(maximum)
+        self.en_cours = 0
+        self._dernier_ralentissement = 0.0
+        self._condition = threading.Condition()
+
+    def acquerir(self) -> None:
+        with self._condition:
+            while self.en_cours >= int(self.limite):
+                self._condition.wait()
+            self.en_cours += 1
+
+    def liberer(self) -> None:
+        with self._condition:
+            self.en_cours -= 1
+            self._condition.notify_all()
+
+    def succes(self, latence: float) -> None:
+        if latence > self.seuil_latence:
+            self.ralentir()
+            return
+        with self._condition:
+            self.limite = min(self.maximum, self.limite + 1 / self.limite)
+            self._condition.notify_all()
+
+    def ralentir(self) -> None:
+        with self._condition:
+            maintenant = time.monotonic()
+            if maintenant - self._dernier_ralentissement < self.intervalle:
+                return
+            self._dernier_ralentissement = maintenant
+            self.limite = max(self.minimum, self.limite / 2)
+        metriques.compter("ralentissements")
+
+
+def delai_retry_after(valeur: str):
+    """Convertit l'en-tête Retry-After (secondes ou date HTTP) en secondes d'attente, ou None."""
+    if not valeur:
+        return None
+    try:
+        return max(0.0, float(valeur))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(valeur).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Ordonnanceur:
+    """
+    Passe toutes les requêtes vers l'API : limite de débit (seau de jetons), concurrence
+    adaptative, et nouveaux essais avec attente exponentielle aléatoire (« full jitter »)
+    sur les 429, les erreurs 5xx et les erreurs réseau. Un en-tête Retry-After est respecté
+    par toutes les requêtes en cours, pas seulement celle qui l'a reçu ; s'il dépasse
+    attente_max, ces requêtes lèvent PauseTropLongue jusqu'à la fin de la pause.
+    Une réponse en erreur lève toujours une exception : elle n'arrive jamais dans le cache.
+    """
+
+    def __init__(self, session, debit: float = DEBIT, concurrence: int = 8, essais: int = ESSAIS,
+                 attente_base: float = 0.5, attente_max: float = 30.0):
+        self.session = session
+        self.seau = SeauJetons(debit) if debit and debit > 0 else None
+        self.concurrence = ConcurrenceAdaptative(concurrence)
+        self.essais = essais
+        self.attente_base = attente_base
+        self.attente_max = attente_max
+        self._reprise = 0.0
+        self._verrou = threading.Lock()
+
+    def _attendre_reprise(self) -> None:
+        attente = self._reprise - time.monotonic()
+        if attente > self.attente_max:
+            raise PauseTropLongue(attente, self.attente_max)
+        if attente > 0:
+            time.sleep(attente)
+
+    def _suspendre(self, duree: float) -> None:
+        with self._verrou:
+            self._reprise = max(self._reprise, time.monotonic() + duree)
+
+    def _attente(self, essai: int) -> float:
+        return random.uniform(0, min(self.attente_max, self.attente_base * 2 ** essai))
+
+    def get(self, url: str, timeout: float = 30, **options) -> "requests.Response":
+        """GET avec nouveaux essais ; retourne une réponse 2xx ou lève requests.RequestException."""
+        for essai in range(self.essais):
+            self._attendre_reprise()
+            if self.seau:
+                self.seau.acquerir()
+            self.concurrence.acquerir()
+            debut = time.monotonic()
+            try:
+                response = self.session.get(url, timeout=timeout, **options)
+            except OSError:  # requests.ConnectionError, Timeout... héritent d'OSError
+                self.concurrence.liberer()
+                if essai == self.essais - 1:
+                    raise
+                metriques.compter("reessais")
+                time.sleep(self._attente(essai))
+                continue
+            self.concurrence.liberer()
+
+            if response.status_code not in STATUTS_A_REESSAYER:
+                if response.ok:
+                    self.concurrence.succes(time.monotonic() - debut)
+                response.raise_for_status()
+                return response
+
+            metriques.compter(f"reponses_{response.status_code}")
+            if response.status_code == 429:
+                self.concurrence.ralentir()
+            if essai == self.essais - 1:
+                response.raise_for_status()
+            retry_after = delai_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None and retry_after > self.attente_max:
+                self._suspendre(retry_after)
+                raise PauseTropLongue(retry_after, self.attente_max, response)
+            metriques.compter("reessais")
+            if retry_after is not None:
+                self._suspendre(retry_after)
+            else:
+                time.sleep(self._attente(essai))
@@ -1,8 +1,59 @@
-import markdown 
-import requests
-import webbrowser
 import argparse
 
+import os
+
+import sys
+
+import time
+
+import shutil
+
+import threading
+
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from functools import partial
+
+import metriques
+
+import sprites
+
+from client import client_defaut
+
+from traductions import completer_especes, id_depuis_url, nom_espece, nom_type
+
+
+# Téléchargements simultanés du parent avant un lot (fiches compactes, espèces, sprites)
+
+TELECHARGEMENTS = 8
+
+
+
+# Convertisseur Markdown réutilisé d'une fiche à l'autre (un par thread : il n'est pas partagé)
+
+_convertisseurs = threading.local()
+
+
+
+def convertir_markdown(texte: str) -> str:
+
+    convertisseur = getattr(_convertisseurs, "markdown", None)
+
+    if convertisseur is None:
+
+        # Import tardif : markdown n'est chargé que pour le rendu d'une fiche
+
+        import markdown
+
+        convertisseur = _convertisseurs.markdown = markdown.Markdown()
+
+    with metriques.etape("markdown"):
+
+        return convertisseur.reset().convert(texte)
+
+
 
 # Fonction pour convertir un texte Markdown en HTML
 
@@ -14,9 +65,9 @@ def md_to_html(fichier_markdown :str, fichier_html: str) -> None:
 
         txt = f.read()
 
-    html = markdown.markdown(txt)
+    html = convertir_markdown(txt)
 
-    with open(fichier_html, "w", encoding="UTF-8") as f:
+    with metriques.etape("ecriture_html"), open(fichier_html, "w", encoding="UTF-8") as f:
 
         f.write(html)
 
@@ -24,15 +75,11 @@ def md_to_html(fichier_markdown :str, fichier_html: str) -> None:
 
 
 
-# Fonction pour récupérer les données d'un Pokémon
+# Fonction pour récupérer les données d'un Pokémon (via le cache partagé)
 
 def download_poke(id: int):
 
-    link = f"https://pokeapi.co/api/v2/pokemon/{id}"
-
-    response = requests.get(link)
-
-    return response.json()
+    return client_defaut().pokemon_compact(id)
 
 
 
@@ -52,7 +99,9 @@ def get_translation(info: list, lang: str) -> str:
 
 
 
-def css():
+# Retourne le contenu de la feuille de style des fiches
+
+def feuille_de_style() -> str:
 
     contenu_css = """
 
@@ -320,29 +369,41 @@ body {
 
     
 
+    return contenu_css
+
+
+
+def css(dossier: str = "."):
+
+    contenu_css = feuille_de_style()
+
     # Sauvegarder le contenu CSS dans un fichier
 
-    with open("styles.css", "w", encoding="UTF-8") as f:
+    chemin_css = os.path.join(dossier, "styles.css")
+
+    with open(chemin_css, "w", encoding="UTF-8") as f:
 
         f.write(contenu_css)
 
-    print("CSS créé : styles.css")
+    print(f"CSS créé : {chemin_css}")
 
 
 
-# Fonction principale pour générer une fiche Pokémon
+# Retourne (Markdown, page HTML complète) de la fiche d'un Pokémon sans rien écrire sur disque,
+
+# ou None si le Pokémon n'existe pas (utilisée par pokefiche et par service.py)
+
+# lien_css : chemin de la feuille de style vu depuis la page
 
-def pokefiche(id: int):
+# source_sprite : URL du sprite -> valeur de src (ex : sprites.source) ; None = lien vers l'URL d'origine
 
-    css()
+def rendre_fiche(id, lien_css: str = "styles.css", source_sprite=None):
 
     data = download_poke(id)
 
     if not data:
 
-        print(f"Aucun Pokémon trouvé pour l'ID {id}.")
-
-        return
+        return None
 
 
 
@@ -350,6 +411,10 @@ def pokefiche(id: int):
 
     sprite = data["sprites"]["front_default"]
 
+    if source_sprite is not None:
+
+        sprite = source_sprite(sprite)
+
     name = data["name"]
 
     height = data["height"] 
@@ -362,11 +427,11 @@ def pokefiche(id: int):
 
 
 
-    species_url = data["species"]["url"]
+    # Noms en français depuis l'index des traductions (sans lire les fiches espèce/type)
 
-    species_data = requests.get(species_url).json()
+    species_url = data["species"]["url"]
 
-    translated_name = get_translation(species_data["names"], "fr")
+    translated_name = nom_espece(id_depuis_url(species_url), "fr") or "Traduction introuvable pour la langue : fr"
 
 
 
@@ -376,9 +441,7 @@ def pokefiche(id: int):
 
     for t in types:
 
-        type_data = requests.get(t["type"]["url"]).json()
-
-        translated_type = get_translation(type_data["names"], "fr")
+        translated_type = nom_type(t["type"]["name"], "fr") or "Traduction introuvable pour la langue : fr"
 
         type_names.append(translated_type)
 
@@ -386,13 +449,23 @@ def pokefiche(id: int):
 
 
 
+    # Statistiques réelles au niveau 50 (IV 31, sans EV, nature neutre), avec la fourchette
+
+    # de la pire (IV 0, nature défavorable) à la meilleure (252 EV, nature favorable)
+
+    from calcul_stats import STATS, bornes
+
     stats_md = ""
 
     if len(stats) > 0:
 
-        for stat in stats:
+        bases = {stat["stat"]["name"]: stat["base_stat"] for stat in stats}
+
+        minimum, neutre, maximum = bornes([bases.get(nom, 0) for nom in STATS], 50)
+
+        for n, nom in enumerate(STATS):
 
-            stats_md += f"{stat['stat']['name']} : {stat['base_stat']}\n\n"
+            stats_md += f"{nom} : {neutre[n]} (base {bases.get(nom, 0)}, de {minimum[n]} à {maximum[n]})\n\n"
 
 
 
@@ -416,17 +489,8 @@ def pokefiche(id: int):
 
 """
 
-    fichier_md = "poke_fiche.md"
 
-    with open(fichier_md, "w", encoding="UTF-8") as f:
-
-        f.write(contenu_md)
-
-
-
-    fichier_html = "index.html"
-
-    contenu_html = md_to_html(fichier_md, fichier_html)
+    contenu_html = convertir_markdown(contenu_md)
 
 
 
@@ -448,7 +512,7 @@ def pokefiche(id: int):
 
     <title>Pokédex - {translated_name}</title>
 
-    <link rel="stylesheet" href="styles.css">
+    <link rel="stylesheet" href="{lien_css}">
 
 </head>
 
@@ -493,8 +557,61 @@ def pokefiche(id: int):
     """
 
 
+    return contenu_md, contenu_html_complet
+
+
+
+
+
+
+
+# Fonction principale pour générer une fiche Pokémon
+
+# dossier : où écrire poke_fiche.md et index.html
+
+# ouvrir : ouvrir la page dans le navigateur (désactivé en mode headless)
+
+# lien_css : chemin de la feuille de style vu depuis la page ; si None, la page pointe vers
+
+#            une feuille partagée déjà écrite (mode lot) et styles.css n'est pas recréé
+
+# site : dossier racine du site, où le sprite est publié dans sprites/ (par défaut dossier)
+
+def pokefiche(id: int, dossier: str = ".", ouvrir: bool = True, lien_css: str = None, bavard: bool = True,
 
-    with open(fichier_html, "w", encoding="UTF-8") as f:
+              site: str = None):
+
+    os.makedirs(dossier, exist_ok=True)
+
+    if lien_css is None:
+
+        css(dossier)
+
+        lien_css = "styles.css"
+
+    fiche = rendre_fiche(id, lien_css, partial(sprites.source, dossier_page=dossier, dossier_site=site))
+
+    if fiche is None:
+
+        print(f"Aucun Pokémon trouvé pour l'ID {id}.")
+
+        return
+
+    contenu_md, contenu_html_complet = fiche
+
+
+
+    fichier_md = os.path.join(dossier, "poke_fiche.md")
+
+    with open(fichier_md, "w", encoding="UTF-8") as f:
+
+        f.write(contenu_md)
+
+
+
+    fichier_html = os.path.join(dossier, "index.html")
+
+    with metriques.etape("ecriture_html"), open(fichier_html, "w", encoding="UTF-8") as f:
 
         f.write(contenu_html_complet)
 
@@ -504,9 +621,193 @@ def pokefiche(id: int):
 
 
 
-    print(f"Page principale générée : {fichier_html}")
+    if bavard:
+
+        print(f"Page principale générée : {fichier_html}")
+
+    if ouvrir:
+
+        import webbrowser
+
+        webbrowser.open(fichier_html)
+
+
+
+
+
+# Convertit "1-151,200,250-260" en liste d'IDs
+
+def analyser_ids(texte: str) -> list:
+
+    ids = []
+
+    for morceau in texte.split(","):
+
+        morceau = morceau.strip()
+
+        if not morceau:
+
+            continue
+
+        if "-" in morceau:
+
+            debut, fin = map(int, morceau.split("-"))
+
+            ids.extend(range(debut, fin + 1))
+
+        else:
+
+            ids.append(int(morceau))
+
+    return ids
+
+
+
+
+
+
+
+# Retourne l'ID et les métriques mesurées dans le processus pour cette fiche (None si désactivées)
+
+def _fiche_du_lot(id: int, dossier: str) -> tuple:
+
+    metriques.reinitialiser()
+
+    pokefiche(id, os.path.join(dossier, str(id)), ouvrir=False, lien_css="../styles.css", bavard=False, site=dossier)
+
+    return id, metriques.etat() if metriques.actif() else None
+
+
+
+
+
+
+
+# Génère les fiches de plusieurs Pokémon en parallèle dans dossier/<id>/index.html,
+
+# avec une seule feuille de style partagée dossier/styles.css
+
+def generer_lot(ids: list, dossier: str = "out", processus: int = None) -> dict:
+
+    os.makedirs(dossier, exist_ok=True)
+
+    css(dossier)
+
+    # Les images de fond sont référencées par la feuille de style, relativement à elle
+
+    for image in ("background.jpeg", "background2.webp"):
+
+        source = os.path.join(os.path.dirname(os.path.abspath(__file__)), image)
+
+        if os.path.isfile(source):
+
+            shutil.copyfile(source, os.path.join(dossier, image))
+
+
+
+    # Fiches compactes récupérées en parallèle dans le parent : les sprites et les traductions
+
+    # du lot en dépendent, et les processus les relisent ensuite depuis le cache
+
+    client = client_defaut()
+
+    try:
+
+        compacts = client.pokemons_compacts(ids, workers=TELECHARGEMENTS)
+
+    except (OSError, ValueError) as erreur:  # hors ligne : les processus réessaieront chacun leur fiche
+
+        print(f"Fiches non préchargées : {erreur}", file=sys.stderr)
+
+        compacts = client.pokemons_compacts(ids, telecharger=False)
+
+
+
+    # Noms des espèces du lot ajoutés à l'index en une fois : sinon chaque processus complète
+
+    # l'index entrée par entrée, en relisant et réécrivant tout l'index sous verrou
+
+    try:
+
+        especes = {id_depuis_url(compact["species"]["url"]) for compact in compacts.values()}
+
+        completer_especes(especes, TELECHARGEMENTS)
+
+    except (OSError, ValueError) as erreur:
+
+        print(f"Traductions non préchargées : {erreur}", file=sys.stderr)
+
+
+
+    # Sprites téléchargés en parallèle avant le rendu : les processus n'ont plus qu'à les publier
+
+    try:
+
+        sprites.magasin_defaut().telecharger(compact["sprites"]["front_default"] for compact in compacts.values())
+
+    except (OSError, ValueError) as erreur:  # hors ligne : les fiches garderont les URL d'origine
+
+        print(f"Sprites non téléchargés : {erreur}", file=sys.stderr)
+
+
+
+    debut = time.perf_counter()
+
+    generees, echecs = [], {}
+
+    initialisation = metriques.activer if metriques.actif() else None
+
+    # Processus lancés (spawn) et non dupliqués (fork) : le parent a déjà ouvert le stockage
+
+    # (connexion SQLite comprise) et la session HTTP, qui ne doivent pas être partagés par fork
+
+    with ProcessPoolExecutor(max_workers=processus, mp_context=multiprocessing.get_context("spawn"),
+
+                             initializer=initialisation) as executeur:
+
+        futurs = {executeur.submit(_fiche_du_lot, id, dossier): id for id in ids}
+
+        for n, futur in enumerate(as_completed(futurs), start=1):
+
+            id = futurs[futur]
+
+            try:
+
+                id, mesures = futur.result()
+
+                generees.append(id)
+
+                if mesures:
+
+                    metriques.fusionner(mesures)
+
+            except Exception as erreur:
+
+                echecs[id] = f"{type(erreur).__name__}: {erreur}"
+
+            print(f"\r[{n}/{len(ids)}] fiches", end="", file=sys.stderr, flush=True)
+
+    if ids:
+
+        print(file=sys.stderr)
+
+
+
+    duree = time.perf_counter() - debut
+
+    return {
+
+        "generees": sorted(generees),
+
+        "echecs": echecs,
+
+        "duree": duree,
+
+        "fiches_par_seconde": len(generees) / duree if duree > 0 else 0.0,
+
+    }
+
 
-    webbrowser.open(fichier_html) # A retirer 
 
 
 
@@ -516,12 +817,41 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Générer une fiche Pokémon.")
 
-    parser.add_argument("id", type=int, help="ID du Pokémon")
+    parser.add_argument("id", type=int, nargs="?", help="ID du Pokémon")
+
+    parser.add_argument("--lot", help="IDs à générer en parallèle, ex : 1-151,200,250-260")
+
+    parser.add_argument("--sortie", default="out", help="Dossier de sortie du mode lot")
+
+    parser.add_argument("--processus", type=int, default=None, help="Nombre de processus du mode lot")
+
+    parser.add_argument("--headless", action="store_true", help="Ne jamais ouvrir le navigateur")
+
+    metriques.ajouter_option(parser)
 
     args = parser.parse_args()
 
+    metriques.depuis_arguments(args)
+
+
+
+    if args.lot:
+
+        rapport = generer_lot(analyser_ids(args.lot), args.sortie, args.processus)
+
+        print(f"{len(rapport['generees'])} fiches générées dans {args.sortie}/ en {rapport['duree']:.1f} s "
+
+              f"({rapport['fiches_par_seconde']:.1f} fiches/s), {len(rapport['echecs'])} échecs")
+
+        for id, erreur in sorted(rapport["echecs"].items()):
+
+            print(f"  {id} : {erreur}")
+
+    elif args.id is not None:
 
+        pokefiche(args.id, ouvrir=not args.headless)
 
-    pokefiche(args.id)
+    else:
 
+        parser.error("indiquer un ID ou --lot")
 
@@ -1,8 +1,22 @@
 import os
-import json
-import requests
-import matplotlib.pyplot as plt
-import webbrowser
+import re
+import sys
+import time
+import argparse
+import multiprocessing
+import metriques
+import sprites
+from functools import partial
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from agregation import Agregateur
+from client import analyser_url, client_defaut
+from noms import resoudre
+from traductions import id_depuis_url, nom_espece
+
+# matplotlib, numpy (matrice) et webbrowser sont importés dans les fonctions qui les utilisent :
+# une simple consultation du cache ne paie pas leur temps de chargement.
+from stockage import cle_depuis_chemin
 
 # ================================================
 # 1. GESTION DU CACHE
@@ -10,18 +24,12 @@ import webbrowser
 
 def telecharger_avec_cache(url: str, chemin_cache: str) -> dict:
     """
-    Télécharge les données JSON depuis une URL ou utilise un fichier cache.
-    Si le fichier cache existe, il est utilisé. Sinon, une requête est effectuée.
+    Télécharge les données JSON depuis une URL ou utilise le cache.
+    Le chemin cache/{nom}.json est converti en clé du stockage partagé avec cache.py.
+    Si l'entrée existe, elle est utilisée. Sinon, une requête est effectuée par le client partagé.
     """
-    if os.path.exists(chemin_cache):
-        with open(chemin_cache, "r") as fichier:
-            return json.load(fichier)
-    
-    response = requests.get(url)
-    donnees = response.json()
-    with open(chemin_cache, "w") as fichier:
-        json.dump(donnees, fichier)
-    return donnees
+    chemin, _ = analyser_url(url)
+    return client_defaut().obtenir(chemin, cle_depuis_chemin(chemin_cache))
 
 # ================================================
 # 2. RÉCUPÉRATION DES DONNÉES D'UN POKÉMON
@@ -29,13 +37,13 @@ def telecharger_avec_cache(url: str, chemin_cache: str) -> dict:
 
 def recuperer_donnees_pokemon(id_ou_nom: str) -> dict:
     """
-    Récupère les données d'un Pokémon avec gestion du cache.
+    Récupère la fiche compacte d'un Pokémon (types, stats, espèce, sprite, taille, poids, nom)
+    avec gestion du cache.
+    Un nom est d'abord résolu localement (toutes langues, sans accents, fautes de frappe
+    tolérées) ; s'il n'est pas reconnu, il est transmis tel quel à l'API.
     """
-    if not os.path.exists("cache"):
-        os.mkdir("cache")
-    chemin_cache = f"cache/{id_ou_nom}.json"
-    url = f"https://pokeapi.co/api/v2/pokemon/{id_ou_nom}/"
-    return telecharger_avec_cache(url, chemin_cache)
+    id_pokemon = resoudre(id_ou_nom)
+    return client_defaut().pokemon_compact(id_pokemon if id_pokemon is not None else id_ou_nom)
 
 # ================================================
 # 3. RÉCUPÉRATION DU NOM EN FRANÇAIS D'UN POKÉMON
@@ -43,67 +51,39 @@ def recuperer_donnees_pokemon(id_ou_nom: str) -> dict:
 
 def nom_pokemon_en_francais(url_espece: str) -> str:
     """
-    Récupère le nom en français d'un Pokémon à partir de l'URL de son espèce.
+    Récupère le nom en français d'un Pokémon à partir de l'URL de son espèce,
+    via l'index des traductions (sans relire la fiche de l'espèce).
     """
-    chemin_cache = f"cache/espece_{url_espece.split('/')[-2]}.json"
-    donnees_espece = telecharger_avec_cache(url_espece, chemin_cache)
-
-    if donnees_espece:
-        for name_entry in donnees_espece["names"]:
-            if name_entry["language"]["name"] == "fr":
-                return name_entry["name"]
-    return "Nom non disponible"
+    nom = nom_espece(id_depuis_url(url_espece), "fr")
+    return nom if nom else "Nom non disponible"
 
 # ================================================
 # 4. CLASSEMENT DES TYPES DE POKÉMON
 # ================================================
 
-def classer_types(pokemons: list) -> dict:
+def classer_types(pokemons) -> dict:
     """
     Classe les types de Pokémon par fréquence.
+    pokemons peut être une liste ou un flux (ex : iterer_pokemons_plage), parcouru une seule fois.
+    Pour les doubles types, statistiques par type et distributions, voir agregation.Agregateur.
     """
-
-    types_count = {}
-    for pokemon in pokemons:
-        for t in pokemon["types"]:
-            type_name = t["type"]["name"]
-            if type_name in types_count:
-                types_count[type_name] += 1
-            else:
-                types_count[type_name] = 1
-
-
-    types_list = []
-    for type_name, count in types_count.items():
-        types_list.append((type_name, count))
-
-
-    for i in range(len(types_list)):
-
-        max_index = i
-        for j in range(i + 1, len(types_list)):
-            if types_list[j][1] > types_list[max_index][1]: 
-                max_index = j
-
-        if max_index != i:
-            types_list[i], types_list[max_index] = types_list[max_index], types_list[i]
-
-    types_dict = {}
-    for type_name, count in types_list:
-        types_dict[type_name] = count
-
-
-    return types_dict
+    return Agregateur().ajouter_tout(pokemons).frequences_types()
 
 
 # ================================================
 # 5. GÉNÉRATION DE LA CARTE HTML D'UN POKÉMON
 # ================================================
 
-def generer_carte_pokemon(pokemon: dict, nom_francais: str):
-    """Génère une carte HTML pour un Pokémon avec des reflets et un design moderne."""
+def rendre_carte(pokemon: dict, nom_francais: str, source_sprite=None) -> str:
+    """
+    Retourne le HTML de la carte d'un Pokémon avec des reflets et un design moderne.
+    source_sprite convertit l'URL du sprite en valeur de src (ex : sprites.source) ; sans elle,
+    la carte pointe vers l'URL d'origine.
+    """
 
     sprite = pokemon["sprites"]["front_default"]
+    if source_sprite is not None:
+        sprite = source_sprite(sprite)
     types = [] 
     for t in pokemon["types"]: 
         type_name = t["type"]["name"]
@@ -277,12 +257,26 @@ def generer_carte_pokemon(pokemon: dict, nom_francais: str):
     for stat, value in stats.items():
         html_content += f"<tr><td>{stat}</td><td>{value}</td></tr>"
 
+    return html_content
+
+
+def generer_carte_pokemon(pokemon: dict, nom_francais: str,
+                          chemin_fichier: str = "carte_pokemon_reflet.html", ouvrir: bool = True):
+    """
+    Génère une carte HTML pour un Pokémon, l'écrit dans chemin_fichier et l'ouvre dans le navigateur.
+    Le sprite est publié dans sprites/ à côté de la carte, qui s'affiche ainsi hors ligne.
+    """
+    dossier = os.path.dirname(os.path.abspath(chemin_fichier))
+    html_content = rendre_carte(pokemon, nom_francais, partial(sprites.source, dossier_page=dossier))
+
     # Sauvegarde et ouverture
-    chemin_fichier = "carte_pokemon_reflet.html"
-    with open(chemin_fichier, "w", encoding="utf-8") as fichier:
+    with metriques.etape("ecriture_html"), open(chemin_fichier, "w", encoding="utf-8") as fichier:
         fichier.write(html_content)
-    print(f"Carte générée : {chemin_fichier}")
-    webbrowser.open(chemin_fichier)
+    if ouvrir:
+        print(f"Carte générée : {chemin_fichier}")
+        import webbrowser
+        webbrowser.open(chemin_fichier)
+    return chemin_fichier
 
 
 def generer_dataset_to_md(pokemons: list):
@@ -291,14 +285,8 @@ def generer_dataset_to_md(pokemons: list):
         fichier.write("# Dataset des Pokémon\n\n")
         for pokemon in pokemons:
             nom_francais = nom_pokemon_en_francais(pokemon["species"]["url"])
-            types = ""
-            for t in pokemon["types"]:
-                types += t["type"]["name"] + ", "
-            types = types(", ")
-            stats = ""
-            for stat in pokemon["stats"]:
-                stats += f"{stat['stat']['name']}: {stat['base_stat']}, "
-            stats = stats(", ")
+            types = ", ".join(t["type"]["name"] for t in pokemon["types"])
+            stats = ", ".join(f"{stat['stat']['name']}: {stat['base_stat']}" for stat in pokemon["stats"])
             fichier.write(f"## {nom_francais}\n")
             fichier.write(f"Type(s): {types}\n")
             fichier.write(f"Stats: {stats}\n\n")
@@ -309,10 +297,7 @@ def generer_infos_locales(pokemons: list):
     with open("infos_locales.txt", "w", encoding="utf-8") as fichier:
         for pokemon in pokemons:
             nom_francais = nom_pokemon_en_francais(pokemon["species"]["url"])
-            types = ""
-            for t in pokemon["types"]:
-                types += t["type"]["name"] + ", "
-            types = types(", ") 
+            types = ", ".join(t["type"]["name"] for t in pokemon["types"])
             fichier.write(f"{nom_francais} - Types: {types}\n")
     print("Fichier infos_locales.txt généré.")
 
@@ -321,16 +306,31 @@ def generer_infos_locales(pokemons: list):
 # 6. RÉCUPÉRATION D'UNE PLAGE D'ID DE POKÉMON
 # ================================================
 
+def iterer_pokemons_plage(debut: int, fin: int, taille_lot: int = 64, workers: int = 8):
+    """
+    Générateur qui produit les Pokémon d'une plage d'IDs dans l'ordre, au fur et à mesure.
+    Les IDs sont traités par lots de taille_lot : lecture groupée du cache, puis téléchargement
+    en parallèle des manquants. La mémoire utilisée ne dépend que de la taille d'un lot.
+    """
+    client = client_defaut()
+    with ThreadPoolExecutor(max_workers=workers) as executeur:
+        for debut_lot in range(debut, fin + 1, taille_lot):
+            ids = range(debut_lot, min(debut_lot + taille_lot, fin + 1))
+            en_cache = client.pokemons_compacts(ids, telecharger=False)
+            manquants = [i for i in ids if str(i) not in en_cache]
+            telecharges = dict(zip(manquants, executeur.map(client.pokemon_compact, manquants)))
+
+            for id_pokemon in ids:
+                donnees = en_cache.get(str(id_pokemon)) or telecharges.get(id_pokemon)
+                if donnees:
+                    yield donnees
+
+
 def recuperer_pokemons_plage(debut: int, fin: int) -> list:
     """
     Récupère les données pour une plage d'IDs Pokémon (entre debut et fin).
     """
-    pokemons = []
-    for id_pokemon in range(debut, fin + 1):
-        donnees = recuperer_donnees_pokemon(id_pokemon)
-        if donnees:
-            pokemons.append(donnees)
-    return pokemons
+    return list(iterer_pokemons_plage(debut, fin))
 
 # ================================================
 # 7. CHOIX DE LA STATISTIQUE À TRIER
@@ -370,9 +370,11 @@ def obtenir_base_stat(pokemon, statistique_choisie):
     return 0 
 
 
-def trier_par_statistique(pokemons: list, choix: int) -> dict:
+def trier_par_statistique(pokemons, choix: int, taille_lot: int = 256) -> dict:
     """
     Trie les Pokémon par la statistique choisie.
+    pokemons peut être une liste ou un flux (ex : iterer_pokemons_plage) : il est consommé
+    par lots de taille_lot, en ne gardant que le meilleur Pokémon rencontré.
     """
 
     statistiques = ["hp", "attack", "defense", "speed", "special-attack", "special-defense"]
@@ -383,17 +385,22 @@ def trier_par_statistique(pokemons: list, choix: int) -> dict:
 
     statistique_choisie = statistiques[choix - 1]
 
-    pokemon_max_stat = None
-    max_stat_value = -1  
+    from matrice import MatriceStats
 
-    for pokemon in pokemons:
-        # Obtenir la valeur de la statistique choisie
-        base_stat = obtenir_base_stat(pokemon, statistique_choisie)
-        
-        # Comparer et mettre à jour si la statistique est la plus haute
-        if base_stat > max_stat_value:
-            max_stat_value = base_stat
-            pokemon_max_stat = pokemon
+    pokemon_max_stat = None
+    max_stat_value = -1
+    flux = iter(pokemons)
+    while True:
+        lot = list(islice(flux, taille_lot))
+        if not lot:
+            break
+        # Classement vectorisé du lot (le premier en cas d'égalité)
+        matrice = MatriceStats.depuis_pokemons(lot)
+        meilleur = int(matrice.classement(statistique_choisie)[0])
+        valeur = int(matrice.score(statistique_choisie)[meilleur])
+        if valeur > max_stat_value:
+            max_stat_value = valeur
+            pokemon_max_stat = lot[meilleur]
 
     return pokemon_max_stat
 
@@ -401,12 +408,12 @@ def trier_par_statistique(pokemons: list, choix: int) -> dict:
 # 9. Graphique
 # ================================================
 
-def generer_graphique_statistiques(noms_pokemons: list):
-    """Génère un graphique comparatif des statistiques des Pokémon."""
+def stats_du_groupe(noms_pokemons: list) -> dict:
+    """Retourne {nom français: {statistique: valeur}} pour un groupe de Pokémon."""
     stats_pokemons = {}
 
     for nom in noms_pokemons:
-        nom = nom
+        nom = nom.strip() if isinstance(nom, str) else nom
         donnees = recuperer_donnees_pokemon(nom) 
 
         if donnees:
@@ -420,8 +427,27 @@ def generer_graphique_statistiques(noms_pokemons: list):
 
             stats_pokemons[nom_francais] = stats
 
-    if stats_pokemons:
-        noms_stats = list(next(iter(stats_pokemons.values())).keys())
+    return stats_pokemons
+
+
+def generer_graphique_statistiques(noms_pokemons: list, fichier: str = None):
+    """
+    Génère un graphique comparatif des statistiques des Pokémon.
+    Sans fichier, le graphique est affiché ; avec un fichier (.png, .svg...), il est écrit
+    sur disque sans fenêtre (backend Agg).
+    """
+    stats_pokemons = stats_du_groupe(noms_pokemons)
+    if not stats_pokemons:
+        print("Aucun Pokémon trouvé.")
+        return
+
+    if fichier:
+        RenduGraphiques().rendre(stats_pokemons, fichier)
+        return
+
+    import matplotlib.pyplot as plt
+
+    noms_stats = list(next(iter(stats_pokemons.values())).keys())
 
     x = range(len(noms_stats)) 
     largeur = 0.8 / len(stats_pokemons)
@@ -451,14 +477,246 @@ def generer_graphique_statistiques(noms_pokemons: list):
     plt.show()
 
 
+class RenduGraphiques:
+    """
+    Dessine des graphiques comparatifs dans une figure Agg (sans écran) réutilisée d'un graphique
+    à l'autre : quand deux groupes ont le même nombre de Pokémon, les barres existantes sont
+    seulement mises à jour (hauteurs et légende) au lieu d'être recréées.
+    """
+
+    def __init__(self, taille: tuple = (10, 6)):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self.figure = Figure(figsize=taille)
+        FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self._barres = []
+        self._noms_stats = None
+
+    def _construire(self, nombre: int, noms_stats: list):
+        """(Re)crée les barres pour nombre Pokémon et les statistiques données."""
+        self.ax.clear()
+        x = range(len(noms_stats))
+        largeur = 0.8 / nombre
+        self._barres = []
+        for i in range(nombre):
+            positions = [p + i * largeur for p in x]
+            self._barres.append(self.ax.bar(positions, [0] * len(noms_stats), largeur))
+
+        positions_x = [p + largeur * (nombre - 1) / 2 for p in x]
+        self.ax.set_xticks(positions_x)
+        self.ax.set_xticklabels(noms_stats, rotation=45, ha="right")
+        self.ax.set_xlabel("Statistiques")
+        self.ax.set_ylabel("Valeurs")
+        self._noms_stats = noms_stats
+
+    def rendre(self, stats_pokemons: dict, fichier: str):
+        """Écrit le graphique de stats_pokemons ({nom: {statistique: valeur}}) dans fichier."""
+        noms_stats = list(next(iter(stats_pokemons.values())).keys())
+        if len(stats_pokemons) != len(self._barres) or noms_stats != self._noms_stats:
+            self._construire(len(stats_pokemons), noms_stats)
+
+        maximum = 1
+        for barres, (nom, stats) in zip(self._barres, stats_pokemons.items()):
+            for rectangle, stat in zip(barres, noms_stats):
+                rectangle.set_height(stats.get(stat, 0))
+                maximum = max(maximum, stats.get(stat, 0))
+            barres.set_label(nom)
+
+        self.ax.set_ylim(0, maximum * 1.1)
+        self.ax.legend()
+        with metriques.etape("rendu_graphique"):
+            self.figure.tight_layout()
+            self.figure.savefig(fichier)
+
+
+_rendu_processus = None
+
+
+def _rendre_groupe(tache: tuple):
+    """Rend un groupe (noms, fichier) avec la figure partagée du processus courant."""
+    global _rendu_processus
+    noms, fichier = tache
+    try:
+        stats_pokemons = stats_du_groupe(noms)
+    except (OSError, ValueError) as erreur:
+        print(f"Groupe {','.join(map(str, noms))} ignoré : {erreur}", file=sys.stderr)
+        return None
+    if not stats_pokemons:
+        return None
+    if _rendu_processus is None:
+        _rendu_processus = RenduGraphiques()
+    _rendu_processus.rendre(stats_pokemons, fichier)
+    return fichier
+
+
+def generer_graphiques_statistiques(groupes: list, dossier: str = "graphiques", format: str = "png",
+                                    processus: int = 0) -> list:
+    """
+    Génère un graphique par groupe de Pokémon (liste de listes de noms/IDs) dans dossier,
+    sans fenêtre. Avec processus > 0, les groupes sont répartis entre plusieurs processus.
+    Retourne la liste des fichiers écrits (None pour un groupe sans Pokémon trouvé).
+    """
+    os.makedirs(dossier, exist_ok=True)
+    taches = []
+    for numero, noms in enumerate(groupes, start=1):
+        suffixe = "_".join(re.sub(r"[^\w-]", "", str(nom)) for nom in noms)[:80]
+        taches.append((noms, os.path.join(dossier, f"{numero:04d}_{suffixe}.{format}")))
+
+    if processus:
+        # spawn et non fork : le stockage (connexion SQLite) et la session du parent ne se partagent pas
+        with ProcessPoolExecutor(max_workers=processus, mp_context=multiprocessing.get_context("spawn")) as executeur:
+            return list(executeur.map(_rendre_groupe, taches, chunksize=max(1, len(taches) // (processus * 4))))
+    return [_rendre_groupe(tache) for tache in taches]
+
+
 # ================================================
-# 10. MAIN
+# 10. REQUÊTES
+# ================================================
+
+def noms_francais(lignes: list) -> list:
+    """
+    Noms français des lignes d'un résultat ({"id", ...}), par l'espèce de chaque Pokémon
+    (nom_pokemon_en_francais) : les formes (ID > 10000) ont le nom de leur espèce.
+    """
+    compacts = client_defaut().pokemons_compacts([ligne["id"] for ligne in lignes])
+    return [nom_pokemon_en_francais(compacts[str(ligne["id"])]["species"]["url"]) for ligne in lignes]
+
+
+def executer_requete(requete: str) -> list:
+    """
+    Exécute une requête du type "type=fire speed>100 sort=-attack limit=20" sur l'index
+    du Pokédex en cache (voir requete.py) et affiche les résultats.
+    """
+    from requete import charger_index
+
+    resultats = charger_index().executer(requete)
+    print(f"{len(resultats)} Pokémon trouvés")
+    for r, nom in zip(resultats, noms_francais(resultats)):
+        stats = " ".join(f"{stat}={r[stat]}" for stat in ("hp", "attack", "defense", "special-attack", "special-defense", "speed"))
+        print(f"{r['id']:>5}  {nom:<20} {'/'.join(r['types']):<18} {stats} total={r['total']}")
+    return resultats
+
+
+# ================================================
+# 11. CLASSEMENTS MULTICRITÈRES
+# ================================================
+
+def classer(mode: str, valeur: str, plage: tuple = None, k: int = 10, niveau: int = None,
+            nature: str = "hardy", ev="aucune") -> list:
+    """
+    Classe le Pokédex en cache, ou la plage d'IDs plage = (debut, fin), et retourne les lignes
+    retenues (voir classement.resultats) :
+    - mode "score" : les k meilleurs pour un critère pondéré, valeur "attack:1,special-attack:1" ;
+    - mode "tri" : les k premiers d'un tri sur plusieurs clés, valeur "-speed,attack" ;
+    - mode "pareto" : tout le front de Pareto des stats valeur "attack,speed", par total décroissant.
+    Avec niveau, le classement porte sur les statistiques réelles à ce niveau (IV 31, nature
+    et répartition d'EV données, voir calcul_stats) au lieu des statistiques de base.
+    """
+    import classement
+    from matrice import MatriceStats
+
+    if plage:
+        matrice = MatriceStats.depuis_pokemons(iterer_pokemons_plage(*plage))
+    else:
+        matrice = classement.depuis_index()
+    if niveau:
+        from calcul_stats import matrice_au_niveau
+        matrice = matrice_au_niveau(matrice, niveau, ev=ev, nature=nature)
+
+    if mode == "score":
+        critere = classement.analyser_critere(valeur)
+        return classement.resultats(matrice, matrice.classement(critere)[:k], matrice.score(critere))
+    if mode == "tri":
+        return classement.resultats(matrice, classement.tri_lexicographique(matrice, classement.analyser_cles(valeur))[:k])
+    front = classement.front_pareto(matrice, valeur.split(","))
+    return sorted(classement.resultats(matrice, front), key=lambda ligne: -ligne["total"])
+
+
+def afficher_classement(lignes: list, carte: bool = False, graphique: str = None, graphique_max: int = 8):
+    """
+    Affiche un classement ; avec carte, génère la carte HTML du premier Pokémon, et avec graphique,
+    le graphique comparatif des graphique_max premiers.
+    """
+    print(f"{len(lignes)} Pokémon")
+    for ligne, nom in zip(lignes, noms_francais(lignes)):
+        score = f" score={ligne['score']:g}" if "score" in ligne else ""
+        stats = " ".join(f"{stat}={ligne[stat]}" for stat in ("hp", "attack", "defense", "special-attack", "special-defense", "speed"))
+        print(f"{ligne['id']:>5}  {nom:<20} {stats} total={ligne['total']}{score}")
+
+    if carte and lignes:
+        pokemon = client_defaut().pokemon_compact(lignes[0]["id"])
+        generer_carte_pokemon(pokemon, nom_pokemon_en_francais(pokemon["species"]["url"]))
+    if graphique and lignes:
+        generer_graphique_statistiques([str(ligne["id"]) for ligne in lignes[:graphique_max]], graphique)
+
+
+# ================================================
+# 12. MAIN
 # ================================================
 
 if __name__ == "__main__":
-    entree = input("Entrez les noms/IDs des Pokémon (séparés par des virgules ',') ou une plage avec un tiret '-' : ")
+    parser = argparse.ArgumentParser(description="Statistiques des Pokémon.")
+    parser.add_argument("--graphiques", help="Fichier avec un groupe de noms/IDs par ligne (séparés par des virgules)")
+    parser.add_argument("--sortie", default="graphiques", help="Dossier de sortie des graphiques")
+    parser.add_argument("--format", default="png", help="Format des graphiques (png, svg...)")
+    parser.add_argument("--processus", type=int, default=0, help="Nombre de processus de rendu")
+    parser.add_argument("--requete", help="Requête, ex : \"type=fire speed>100 sort=-attack limit=20\"")
+    parser.add_argument("--score", help="Classement pondéré, ex : \"attack:1,special-attack:1\" ou \"total\"")
+    parser.add_argument("--tri", help="Tri sur plusieurs clés, ex : --tri=-speed,attack (- : décroissant)")
+    parser.add_argument("--pareto", help="Front de Pareto des stats, ex : \"attack,speed\"")
+    parser.add_argument("--plage", help="Plage d'IDs à classer, ex : 1-151 (défaut : tout le Pokédex en cache)")
+    parser.add_argument("--k", type=int, default=10, help="Nombre de Pokémon classés (--score, --tri)")
+    parser.add_argument("--niveau", type=int, help="Classer les statistiques réelles à ce niveau (IV 31)")
+    parser.add_argument("--nature", default="hardy", help="Nature pour --niveau, ex : adamant")
+    parser.add_argument("--ev", default="aucune", help="EV pour --niveau : physique, speciale, defensive, mixte "
+                                                       "ou \"attack:252,speed:252,hp:4\"")
+    parser.add_argument("--carte", action="store_true", help="Générer la carte du premier Pokémon classé")
+    parser.add_argument("--graphique-classement", help="Fichier du graphique comparatif des premiers classés")
+    metriques.ajouter_option(parser)
+    args = parser.parse_args()
+    metriques.depuis_arguments(args)
+
+    if args.requete:
+        try:
+            executer_requete(args.requete)
+        except ValueError as erreur:  # requete.RequeteInvalide
+            print(f"Erreur : {erreur}")
+            sys.exit(1)
+        sys.exit(0)
+
+    if args.score or args.tri or args.pareto:
+        mode, valeur = ("score", args.score) if args.score else ("tri", args.tri) if args.tri else ("pareto", args.pareto)
+        try:
+            plage = tuple(map(int, args.plage.split("-"))) if args.plage else None
+            lignes = classer(mode, valeur, plage, args.k, args.niveau, args.nature, args.ev)
+        except ValueError as erreur:  # classement.CritereInvalide, plage, nature ou EV invalides
+            print(f"Erreur : {erreur}")
+            sys.exit(1)
+        afficher_classement(lignes, args.carte, args.graphique_classement)
+        sys.exit(0)
+
+    if args.graphiques:
+        with open(args.graphiques, "r", encoding="utf-8") as fichier:
+            groupes = [ligne.strip().split(",") for ligne in fichier if ligne.strip()]
+        debut_rendu = time.perf_counter()
+        fichiers = generer_graphiques_statistiques(groupes, args.sortie, args.format, args.processus)
+        ecrits = [f for f in fichiers if f]
+        print(f"{len(ecrits)} graphiques écrits dans {args.sortie}/ en {time.perf_counter() - debut_rendu:.1f} s")
+        sys.exit(0)
+
+    entree = input("Entrez les noms/IDs des Pokémon (séparés par des virgules ',') ou une plage avec un tiret '-' "
+                   "(ou une requête, ex : type=fire speed>100 sort=-attack limit=20) : ")
+
+    if any(operateur in entree for operateur in ("=", "<", ">")):
+        # Mode requête
+        try:
+            executer_requete(entree)
+        except ValueError as erreur:  # requete.RequeteInvalide
+            print(f"Erreur : {erreur}")
 
-    if "," in entree:
+    elif "," in entree:
         noms_separes = entree.split(",")
     
         noms = []
@@ -475,14 +733,14 @@ if __name__ == "__main__":
         # Mode plage d'IDs
         try:
             debut, fin = map(int, entree.split("-"))
-            pokemons = recuperer_pokemons_plage(debut, fin)
         except ValueError:
             print("Erreur : veuillez entrer une plage valide au format 'début-fin' (ex : 1-10).")
-            pokemons = []
+            debut, fin = None, None
 
-        if pokemons:
-            choix = choisir_statistique()
-            pokemon_max_stat = trier_par_statistique(pokemons, choix)
+        choix = choisir_statistique() if debut is not None else None
+        if choix is not None:
+            # Les Pokémon sont lus en flux : le premier lot est traité avant la fin des téléchargements
+            pokemon_max_stat = trier_par_statistique(iterer_pokemons_plage(debut, fin), choix)
             if pokemon_max_stat:
                 nom_francais = nom_pokemon_en_francais(pokemon_max_stat["species"]["url"])
                 print(f"\nLe Pokémon avec le plus de {choix} est : {nom_francais}")
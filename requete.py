@@ -0,0 +1,186 @@
+import re
+import numpy as np
+from client import client_defaut
+from matrice import STATS
+
+# Clé de l'index des requêtes dans le stockage du cache
+CLE_INDEX = "index_requetes"
+
+# Colonnes numériques utilisables dans les filtres et les tris
+COLONNES = ["id"] + STATS + ["total", "height", "weight"]
+
+_OPERATEURS = re.compile(r"^([a-z-]+)(<=|>=|!=|=|<|>)(.+)$")
+
+
+class RequeteInvalide(ValueError):
+    """Requête mal formée (colonne, opérateur ou valeur inconnus)."""
+
+
+class IndexPokedex:
+    """
+    Index secondaire de tout le Pokédex en cache :
+    - une colonne NumPy par valeur numérique (ID, 6 statistiques, total, taille, poids) ;
+    - pour chaque colonne, l'ordre trié des lignes (recherche d'intervalle par dichotomie) ;
+    - pour chaque type, un masque booléen des lignes qui ont ce type.
+    Une requête se résout par combinaison de masques, sans relire les fiches JSON.
+    """
+
+    def __init__(self, lignes: list):
+        # lignes : [[id, nom, [types], [6 stats], height, weight], ...]
+        self.lignes = lignes
+        self.noms = np.array([ligne[1] for ligne in lignes], dtype=object)
+        self.types = [ligne[2] for ligne in lignes]
+        stats = np.array([ligne[3] for ligne in lignes], dtype=np.int32).reshape(-1, len(STATS))
+        self.colonnes = {"id": np.array([ligne[0] for ligne in lignes], dtype=np.int32)}
+        for i, stat in enumerate(STATS):
+            self.colonnes[stat] = stats[:, i]
+        self.colonnes["total"] = stats.sum(axis=1)
+        self.colonnes["height"] = np.array([ligne[4] for ligne in lignes], dtype=np.int32)
+        self.colonnes["weight"] = np.array([ligne[5] for ligne in lignes], dtype=np.int32)
+
+        self.ordres = {nom: np.argsort(valeurs, kind="stable") for nom, valeurs in self.colonnes.items()}
+        self.tries = {nom: self.colonnes[nom][ordre] for nom, ordre in self.ordres.items()}
+
+        self.masques_types = {}
+        for ligne, types in enumerate(self.types):
+            for type_name in types:
+                if type_name not in self.masques_types:
+                    self.masques_types[type_name] = np.zeros(len(lignes), dtype=bool)
+                self.masques_types[type_name][ligne] = True
+
+    def __len__(self) -> int:
+        return len(self.lignes)
+
+    # ---------- filtres ----------
+
+    def _masque_intervalle(self, colonne: str, operateur: str, valeur: int) -> np.ndarray:
+        """Lignes dont la colonne vérifie la comparaison, trouvées par dichotomie dans l'ordre trié."""
+        tries = self.tries[colonne]
+        if operateur in ("=", "!="):
+            debut, fin = np.searchsorted(tries, valeur, "left"), np.searchsorted(tries, valeur, "right")
+        elif operateur == ">":
+            debut, fin = np.searchsorted(tries, valeur, "right"), len(tries)
+        elif operateur == ">=":
+            debut, fin = np.searchsorted(tries, valeur, "left"), len(tries)
+        elif operateur == "<":
+            debut, fin = 0, np.searchsorted(tries, valeur, "left")
+        else:
+            debut, fin = 0, np.searchsorted(tries, valeur, "right")
+        masque = np.zeros(len(tries), dtype=bool)
+        masque[self.ordres[colonne][debut:fin]] = True
+        return ~masque if operateur == "!=" else masque
+
+    def executer(self, requete: str) -> list:
+        """
+        Exécute une requête du type "type=fire speed>100 sort=-attack limit=20" et retourne
+        les lignes correspondantes sous forme de dictionnaires.
+        """
+        masque = np.ones(len(self), dtype=bool)
+        tris = []
+        limite = None
+
+        for terme in requete.split():
+            morceaux = _OPERATEURS.match(terme.lower())
+            if not morceaux:
+                raise RequeteInvalide(f"Terme non compris : {terme}")
+            colonne, operateur, valeur = morceaux.groups()
+
+            if colonne in ("sort", "limit") and operateur != "=":
+                raise RequeteInvalide(f"{colonne} s'écrit avec = : {terme}")
+            if colonne == "sort":
+                for cle in valeur.split(","):
+                    nom = cle.lstrip("-")
+                    if nom not in self.colonnes:
+                        raise RequeteInvalide(f"Colonne de tri inconnue : {nom} (dans {terme})")
+                    tris.append((nom, cle.startswith("-")))
+            elif colonne == "limit":
+                if not valeur.isdigit():
+                    raise RequeteInvalide(f"Entier positif attendu : {terme}")
+                limite = int(valeur)
+            elif colonne == "type":
+                if operateur not in ("=", "!="):
+                    raise RequeteInvalide(f"Les types ne se comparent qu'avec = ou != : {terme}")
+                # type=fire,flying : l'un des types ; plusieurs termes type= : tous les types
+                masque_type = np.zeros(len(self), dtype=bool)
+                for type_name in valeur.split(","):
+                    masque_type |= self.masques_types.get(type_name, np.zeros(len(self), dtype=bool))
+                masque &= ~masque_type if operateur == "!=" else masque_type
+            elif colonne == "name":
+                if operateur not in ("=", "!="):
+                    raise RequeteInvalide(f"Les noms ne se comparent qu'avec = ou != : {terme}")
+                egal = self.noms == valeur
+                masque &= ~egal if operateur == "!=" else egal
+            elif colonne in self.colonnes:
+                try:
+                    masque &= self._masque_intervalle(colonne, operateur, int(valeur))
+                except (ValueError, OverflowError):
+                    raise RequeteInvalide(f"Valeur numérique attendue : {terme}") from None
+            else:
+                raise RequeteInvalide(f"Colonne inconnue : {colonne} (dans {terme})")
+
+        lignes = np.flatnonzero(masque)
+        if tris:
+            # np.lexsort trie sur la dernière clé d'abord : on passe les clés à l'envers
+            cles = [-self.colonnes[nom][lignes] if decroissant else self.colonnes[nom][lignes]
+                    for nom, decroissant in reversed(tris)]
+            lignes = lignes[np.lexsort(cles)]
+        if limite is not None:
+            lignes = lignes[:limite]
+        return [self.resultat(int(ligne)) for ligne in lignes]
+
+    def resultat(self, ligne: int) -> dict:
+        resultat = {"name": self.noms[ligne], "types": self.types[ligne]}
+        for nom, valeurs in self.colonnes.items():
+            resultat[nom] = int(valeurs[ligne])
+        return resultat
+
+
+# ================================================
+# CONSTRUCTION ET PERSISTANCE
+# ================================================
+
+def ligne_depuis_pokemon(pokemon: dict) -> list:
+    par_stat = {s["stat"]["name"]: s["base_stat"] for s in pokemon["stats"]}
+    return [
+        pokemon["id"],
+        pokemon["name"],
+        [t["type"]["name"] for t in pokemon["types"]],
+        [par_stat.get(stat, 0) for stat in STATS],
+        pokemon["height"],
+        pokemon["weight"],
+    ]
+
+
+def charger_index() -> IndexPokedex:
+    """
+    Charge l'index sauvegardé (une seule lecture) et le met à jour : les Pokémon arrivés dans
+    le cache depuis sa construction y sont ajoutés, et les lignes dont la fiche a été réécrite
+    depuis (horodatage plus récent que celui gardé avec la ligne) sont reconstruites.
+    """
+    client = client_defaut()
+    sauvegarde = client.stockage.lire(CLE_INDEX) or {}
+    if isinstance(sauvegarde, list):
+        # Format précédent, sans horodatages : toutes les lignes sont reconstruites une fois
+        sauvegarde = {"lignes": sauvegarde}
+    lignes = {ligne[0]: ligne for ligne in sauvegarde.get("lignes", [])}
+    construites = sauvegarde.get("horodatages", {})  # {id: horodatage de la fiche lors de la construction}
+
+    # Source d'une ligne : la fiche compacte, sinon la réponse brute (réécrites ensemble par le client)
+    horodatages = client.stockage.horodatages()
+    sources = {}
+    for cle, horodatage in horodatages.items():
+        compacte = cle.startswith("compact_")
+        id_pokemon = cle[len("compact_"):] if compacte else cle
+        if id_pokemon.isdigit() and (compacte or f"compact_{id_pokemon}" not in horodatages):
+            sources[id_pokemon] = horodatage
+    a_construire = sorted(int(i) for i, horodatage in sources.items() if horodatage > construites.get(i, -1))
+    for id_pokemon in a_construire:
+        # La copie en mémoire du client peut dater d'avant la réécriture (par un autre processus)
+        client.memoire.retirer(f"compact_{id_pokemon}")
+    for id_pokemon, pokemon in client.pokemons_compacts(a_construire).items():
+        lignes[int(id_pokemon)] = ligne_depuis_pokemon(pokemon)
+        construites[id_pokemon] = sources[id_pokemon]
+    lignes = sorted(lignes.values(), key=lambda ligne: ligne[0])
+    if a_construire:
+        client.stockage.ecrire(CLE_INDEX, {"lignes": lignes, "horodatages": construites})
+    return IndexPokedex(lignes)
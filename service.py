@@ -0,0 +1,348 @@
+import os
+import sys
+import re
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+import metriques
+import sprites
+from client import client_defaut
+from noms import index_noms, resoudre
+from stockage import CacheLRU
+from traductions import charger_index as charger_traductions, id_depuis_url, nom_espece, recharger_index
+
+# Service HTTP local qui garde en mémoire le Pokédex, les traductions et les gabarits, et sert :
+#   /fiche/<id ou nom>        fiche HTML (celle de pokefiche.pokefiche)
+#   /carte/<id ou nom>        carte HTML (celle de pokestats.generer_carte_pokemon)
+#   /stats?noms=a,b,c         comparaison des statistiques d'un groupe (JSON)
+#   /classement?critere=speed&k=10   meilleurs Pokémon (stat, "total" ou poids "attack:1,speed:2") ;
+#                             plusieurs critères séparés par ";" sont évalués en un seul lot
+#   /tri?cles=-speed,attack&k=10     tri sur plusieurs clés (voir classement.py)
+#   /pareto?stats=attack,speed       front de Pareto
+#   (ces trois pages acceptent niveau=50&nature=adamant&ev=physique : statistiques réelles, voir calcul_stats.py)
+#   /requete?q=type=fire speed>100   requête sur l'index du Pokédex (voir requete.py)
+#   /sprites/<objet>          sprites du magasin local (voir sprites.py)
+#   /styles.css, /sante, /metriques
+
+TYPES_CONTENU = {
+    "html": "text/html; charset=utf-8",
+    "css": "text/css; charset=utf-8",
+    "json": "application/json",
+    "texte": "text/plain; charset=utf-8",
+    "png": "image/png",
+    "gif": "image/gif",
+    "svg": "image/svg+xml",
+}
+
+# Nom d'un objet du magasin de sprites : empreinte SHA-256 et extension
+_OBJET_SPRITE = re.compile(r"^[0-9a-f]{64}\.(png|gif|svg)$")
+
+RAISONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error", 502: "Bad Gateway"}
+
+# Au-delà, le corps d'une requête n'est pas lu et la connexion est fermée après la réponse
+CORPS_MAX = 1 << 20
+
+# Intervalle (secondes) entre deux vérifications du stockage : s'il a changé (autre processus,
+# Pokémon téléchargés par le service), l'index, la matrice et les noms sont rechargés
+RECHARGEMENT = float(os.environ.get("POKE_RECHARGEMENT", "30"))
+
+
+class ErreurService(Exception):
+    def __init__(self, statut: int, message: str):
+        super().__init__(message)
+        self.statut = statut
+
+
+class ServicePokedex:
+    """
+    Rend les pages dans un pool de threads et garde les réponses dans un cache LRU, pour la
+    durée de validité du cache du client (POKE_TTL) : au-delà, la page est rendue à nouveau
+    depuis des données revalidées. Deux requêtes identiques simultanées ne sont rendues
+    qu'une fois : la seconde attend le résultat de la première.
+    Toutes les RECHARGEMENT secondes, la signature du stockage est comparée à celle du dernier
+    chargement : si elle a changé, les données en mémoire et les réponses sont renouvelées.
+    """
+
+    def __init__(self, taille_cache: int = 1024, workers: int = 8):
+        self.reponses = CacheLRU(taille_cache)
+        self.en_cours = {}
+        self.executeur = ThreadPoolExecutor(max_workers=workers)
+        self.index = None
+        self.matrice = None
+        self.feuille_de_style = None
+        self.signature = None
+        self._prochaine_verification = 0.0
+
+    def _charger(self) -> None:
+        """(Re)charge l'index du Pokédex, sa matrice, les traductions et l'index des noms."""
+        from matrice import MatriceStats
+        from requete import charger_index
+
+        charger_traductions()
+        index_noms()
+        index = charger_index()
+        self.matrice = MatriceStats([l[0] for l in index.lignes], [l[1] for l in index.lignes],
+                                    [l[3] for l in index.lignes])
+        self.index = index
+        # Fiches compactes en mémoire (LRU du client) pour les cartes et les fiches
+        client_defaut().pokemons_compacts([l[0] for l in index.lignes], telecharger=False)
+        # Prise après le chargement, qui peut lui-même écrire dans le stockage (index complétés)
+        self.signature = client_defaut().stockage.signature()
+
+    def prechauffer(self) -> dict:
+        """Charge l'index du Pokédex, les traductions, les noms et les gabarits avant la première requête."""
+        from pokefiche import convertir_markdown, feuille_de_style
+
+        debut = time.perf_counter()
+        self._charger()
+        self.feuille_de_style = feuille_de_style().encode()
+        convertir_markdown("")
+        return {"pokemons": len(self.index), "duree": time.perf_counter() - debut}
+
+    def recharger_si_modifie(self) -> bool:
+        """Recharge les données en mémoire si le stockage a changé depuis le dernier chargement."""
+        if client_defaut().stockage.signature() == self.signature:
+            return False
+        recharger_index()
+        self._charger()
+        self.reponses.vider()
+        metriques.compter("service_rechargements")
+        return True
+
+    # ---------- pages ----------
+
+    def _identifiant(self, entree: str) -> int:
+        id_pokemon = resoudre(unquote(entree))
+        if id_pokemon is None:
+            raise ErreurService(404, f"Pokémon inconnu : {entree}")
+        return id_pokemon
+
+    def _source_sprite(self, url: str) -> str:
+        nom = sprites.magasin_defaut().obtenir(url)
+        return f"/sprites/{nom}" if nom else url
+
+    def _sprite(self, nom: str) -> tuple:
+        correspondance = _OBJET_SPRITE.match(nom)
+        if not correspondance:
+            raise ErreurService(404, f"sprite inconnu : {nom}")
+        try:
+            with open(sprites.magasin_defaut().chemin_objet(nom), "rb") as f:
+                return correspondance.group(1), f.read()
+        except FileNotFoundError:
+            raise ErreurService(404, f"sprite inconnu : {nom}") from None
+
+    def _fiche(self, entree: str) -> tuple:
+        from pokefiche import rendre_fiche
+        fiche = rendre_fiche(self._identifiant(entree), "/styles.css", self._source_sprite)
+        if fiche is None:
+            raise ErreurService(404, f"Pokémon inconnu : {entree}")
+        return "html", fiche[1].encode()
+
+    def _carte(self, entree: str) -> tuple:
+        from pokestats import rendre_carte
+        pokemon = client_defaut().pokemon_compact(self._identifiant(entree))
+        nom = nom_espece(id_depuis_url(pokemon["species"]["url"])) or pokemon["name"]
+        return "html", rendre_carte(pokemon, nom, self._source_sprite).encode()
+
+    def _stats(self, parametres: dict) -> tuple:
+        from pokestats import stats_du_groupe
+        noms = [nom.strip() for nom in parametres.get("noms", "").split(",") if nom.strip()]
+        if not noms:
+            raise ErreurService(400, "paramètre noms manquant, ex : /stats?noms=pikachu,salameche")
+        ids = [resoudre(nom) for nom in noms]
+        inconnus = [nom for nom, id_pokemon in zip(noms, ids) if id_pokemon is None]
+        if inconnus:
+            raise ErreurService(400, f"Pokémon inconnus : {', '.join(inconnus)}")
+        return "json", json.dumps(stats_du_groupe(ids), ensure_ascii=False).encode()
+
+    def _matrice(self, parametres: dict):
+        """Matrice des stats de base, ou des stats réelles si la requête donne un niveau."""
+        if "niveau" not in parametres:
+            return self.matrice
+        from calcul_stats import matrice_au_niveau
+        return matrice_au_niveau(self.matrice, int(parametres["niveau"]), ev=parametres.get("ev", "aucune"),
+                                 nature=parametres.get("nature", "hardy"))
+
+    def _classement(self, parametres: dict) -> tuple:
+        import classement
+        matrice = self._matrice(parametres)
+        criteres = [classement.analyser_critere(c) for c in parametres.get("critere", "total").split(";")]
+        k = int(parametres.get("k", "10"))
+        if len(criteres) == 1:
+            lots = [matrice.top_k(criteres[0], k)]
+        else:
+            lots = classement.top_k_lot(matrice, criteres, k)
+        lots = [[{"id": i, "name": nom, "score": score} for i, nom, score in meilleurs] for meilleurs in lots]
+        return "json", json.dumps(lots[0] if len(lots) == 1 else lots).encode()
+
+    def _tri(self, parametres: dict) -> tuple:
+        import classement
+        matrice = self._matrice(parametres)
+        ordre = classement.tri_lexicographique(matrice, classement.analyser_cles(parametres.get("cles", "")))
+        k = int(parametres.get("k", "10"))
+        return "json", json.dumps(classement.resultats(matrice, ordre[:k])).encode()
+
+    def _pareto(self, parametres: dict) -> tuple:
+        import classement
+        matrice = self._matrice(parametres)
+        front = classement.front_pareto(matrice, [s for s in parametres.get("stats", "").split(",") if s])
+        return "json", json.dumps(classement.resultats(matrice, front)).encode()
+
+    def _requete(self, parametres: dict) -> tuple:
+        return "json", json.dumps(self.index.executer(parametres.get("q", ""))).encode()
+
+    def rendre(self, chemin: str, parametres: dict) -> tuple:
+        """Retourne (type de contenu, corps) d'une page ; lève ErreurService si elle n'existe pas."""
+        morceaux = [m for m in chemin.split("/") if m]
+        if not morceaux:
+            return "json", json.dumps({"pages": ["/fiche/<id>", "/carte/<id>", "/stats?noms=", "/classement?critere=",
+                                                 "/tri?cles=", "/pareto?stats=", "/requete?q=", "/styles.css",
+                                                 "/sante", "/metriques"]}).encode()
+        page = morceaux[0]
+        try:
+            if page == "fiche" and len(morceaux) == 2:
+                return self._fiche(morceaux[1])
+            if page == "carte" and len(morceaux) == 2:
+                return self._carte(morceaux[1])
+            if page == "sprites" and len(morceaux) == 2:
+                return self._sprite(morceaux[1])
+            if page == "stats":
+                return self._stats(parametres)
+            if page == "classement":
+                return self._classement(parametres)
+            if page == "tri":
+                return self._tri(parametres)
+            if page == "pareto":
+                return self._pareto(parametres)
+            if page == "requete":
+                return self._requete(parametres)
+        except ValueError as erreur:  # requete.RequeteInvalide, nombre invalide...
+            raise ErreurService(400, str(erreur)) from None
+        except OSError as erreur:  # PokéAPI injoignable (requests.RequestException hérite d'OSError)
+            if getattr(getattr(erreur, "response", None), "status_code", None) == 404:
+                raise ErreurService(404, f"inconnu de PokéAPI : {chemin}") from None
+            raise ErreurService(502, str(erreur)) from None
+        raise ErreurService(404, f"page inconnue : {chemin}")
+
+    # ---------- HTTP ----------
+
+    async def reponse(self, cible: str) -> tuple:
+        """Retourne (statut, type de contenu, corps), depuis le cache des réponses si possible."""
+        morceaux = urlsplit(cible)
+        if time.monotonic() >= self._prochaine_verification:
+            # Une seule vérification à la fois : les autres requêtes servent les données actuelles
+            self._prochaine_verification = time.monotonic() + RECHARGEMENT
+            try:
+                await asyncio.get_running_loop().run_in_executor(self.executeur, self.recharger_si_modifie)
+            except Exception as erreur:
+                print(f"Rechargement impossible : {type(erreur).__name__}: {erreur}", file=sys.stderr)
+
+        if morceaux.path == "/styles.css":
+            return 200, "css", self.feuille_de_style
+        if morceaux.path == "/sante":
+            return 200, "json", json.dumps({"etat": "ok", "pokemons": len(self.index)}).encode()
+        if morceaux.path == "/metriques":
+            return 200, "texte", metriques.en_prometheus().encode()
+
+        cle = morceaux.path + "?" + morceaux.query
+        entree = self.reponses.lire(cle)
+        ttl = client_defaut().ttl
+        if entree is not None and (ttl is None or time.time() - entree[1] <= ttl):
+            metriques.compter("service_cache_succes")
+            return entree[0]
+
+        attente = self.en_cours.get(cle)
+        if attente is not None:
+            return await asyncio.shield(attente)
+
+        futur = asyncio.get_running_loop().create_future()
+        self.en_cours[cle] = futur
+        parametres = {nom: valeurs[-1] for nom, valeurs in parse_qs(morceaux.query).items()}
+        try:
+            type_contenu, corps = await asyncio.get_running_loop().run_in_executor(
+                self.executeur, self.rendre, morceaux.path, parametres)
+            resultat = (200, type_contenu, corps)
+            self.reponses.ajouter(cle, resultat, time.time(), len(corps))
+        except ErreurService as erreur:
+            resultat = (erreur.statut, "json", json.dumps({"erreur": str(erreur)}, ensure_ascii=False).encode())
+        except Exception as erreur:
+            # Jamais mise en cache : la requête suivante réessaie
+            resultat = (500, "json", json.dumps({"erreur": f"{type(erreur).__name__}: {erreur}"}).encode())
+        del self.en_cours[cle]
+        futur.set_result(resultat)
+        return resultat
+
+    async def connexion(self, lecteur: asyncio.StreamReader, ecrivain: asyncio.StreamWriter) -> None:
+        """Sert les requêtes d'une connexion (keep-alive en HTTP/1.1)."""
+        try:
+            while True:
+                ligne = await lecteur.readline()
+                if not ligne:
+                    break
+                methode, cible, version = ligne.decode("latin-1").split()
+                entetes = {}
+                while True:
+                    ligne = await lecteur.readline()
+                    if ligne in (b"\r\n", b"\n", b""):
+                        break
+                    nom, _, valeur = ligne.decode("latin-1").partition(":")
+                    entetes[nom.strip().lower()] = valeur.strip()
+
+                # Le corps (ignoré) est lu en entier : sinon il serait pris pour la requête suivante
+                longueur = int(entetes.get("content-length", "0"))
+                lisible = "transfer-encoding" not in entetes and 0 <= longueur <= CORPS_MAX
+                if lisible and longueur:
+                    await lecteur.readexactly(longueur)
+
+                with metriques.etape("service_reponse"):
+                    if methode in ("GET", "HEAD"):
+                        statut, type_contenu, corps = await self.reponse(cible)
+                    else:
+                        statut, type_contenu, corps = 405, "texte", b"GET uniquement"
+
+                garder = lisible and version == "HTTP/1.1" and entetes.get("connection", "").lower() != "close"
+                en_tete = (f"HTTP/1.1 {statut} {RAISONS.get(statut, '')}\r\n"
+                           f"Content-Type: {TYPES_CONTENU[type_contenu]}\r\n"
+                           f"Content-Length: {len(corps)}\r\n"
+                           f"Connection: {'keep-alive' if garder else 'close'}\r\n\r\n").encode()
+                ecrivain.write(en_tete if methode == "HEAD" else en_tete + corps)
+                await ecrivain.drain()
+                if not garder:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            ecrivain.close()
+
+
+async def servir(hote: str = "127.0.0.1", port: int = 8080, taille_cache: int = 1024, workers: int = 8) -> None:
+    # Collecte toujours active : /metriques en sert l'état courant (--metrics écrit en plus un rapport à l'arrêt)
+    metriques.activer()
+    service = ServicePokedex(taille_cache, workers)
+    # Démarrage à chaud : tout est chargé avant d'accepter la première requête
+    resume = await asyncio.get_running_loop().run_in_executor(service.executeur, service.prechauffer)
+    serveur = await asyncio.start_server(service.connexion, hote, port)
+    print(f"{resume['pokemons']} Pokémon chargés en {resume['duree']:.2f} s ; service sur http://{hote}:{port}/",
+          file=sys.stderr)
+    async with serveur:
+        await serveur.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service HTTP local : fiches, cartes, statistiques et classements.")
+    parser.add_argument("--hote", default="127.0.0.1", help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=8080, help="Port d'écoute")
+    parser.add_argument("--cache", type=int, default=1024, help="Nombre de réponses gardées en mémoire")
+    parser.add_argument("--workers", type=int, default=8, help="Nombre de threads de rendu")
+    metriques.ajouter_option(parser)
+    args = parser.parse_args()
+    metriques.depuis_arguments(args)
+
+    try:
+        asyncio.run(servir(args.hote, args.port, args.cache, args.workers))
+    except KeyboardInterrupt:
+        pass
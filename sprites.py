@@ -0,0 +1,263 @@
+import os
+import sys
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+import metriques
+
+# Dossier du magasin local des sprites (surchargeable)
+DOSSIER = os.environ.get("POKE_SPRITES", os.path.join("cache", "sprites"))
+
+# Structure du magasin :
+#   objets/ab/ab12...ef.png        une image par contenu, nommée par son SHA-256 : deux URL dont
+#                                  les images sont identiques partagent le même fichier
+#   urls/<SHA-1 de l'URL>          nom de l'objet de cette URL (un petit fichier par URL, écrit
+#                                  atomiquement : plusieurs processus peuvent remplir le magasin)
+#   vignettes/ab12...ef_48.png     miniatures, si Pillow est installé
+# Les pages ne pointent jamais vers le magasin : l'image est publiée (lien physique, sinon copie)
+# dans le dossier sprites/ du site généré, qui reste ainsi autonome et lisible hors ligne.
+
+
+def _ecrire_atomique(chemin: str, contenu: bytes) -> None:
+    dossier = os.path.dirname(chemin)
+    os.makedirs(dossier, exist_ok=True)
+    descripteur, temporaire = tempfile.mkstemp(prefix=".sprite.", suffix=".tmp", dir=dossier)
+    try:
+        with os.fdopen(descripteur, "wb") as f:
+            f.write(contenu)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.unlink(temporaire)
+        raise
+
+
+def extension(url: str) -> str:
+    return os.path.splitext(urlsplit(url).path)[1].lower() or ".png"
+
+
+class MagasinSprites:
+    """
+    Magasin local des sprites, adressé par contenu. Les téléchargements passent par un
+    Ordonnanceur (débit limité, nouveaux essais) ; une URL en échec n'est pas réessayée
+    dans le même processus et la page garde alors l'URL d'origine.
+    """
+
+    def __init__(self, dossier: str = DOSSIER):
+        self.dossier = dossier
+        self._objets = {}  # URL -> nom de l'objet
+        self._echecs = set()
+        self._ordonnanceur = None
+        self._verrou = threading.Lock()
+
+    def chemin_objet(self, nom: str) -> str:
+        return os.path.join(self.dossier, "objets", nom[:2], nom)
+
+    def _chemin_url(self, url: str) -> str:
+        return os.path.join(self.dossier, "urls", hashlib.sha1(url.encode()).hexdigest())
+
+    def objet(self, url: str):
+        """Nom de l'objet d'une URL déjà téléchargée, ou None."""
+        nom = self._objets.get(url)
+        if nom is not None:
+            return nom
+        try:
+            with open(self._chemin_url(url), "r") as f:
+                nom = f.read().strip()
+        except OSError:
+            return None
+        if not os.path.isfile(self.chemin_objet(nom)):
+            return None
+        self._objets[url] = nom
+        return nom
+
+    def ajouter(self, url: str, contenu: bytes) -> tuple:
+        """Range une image ; retourne (nom de l'objet, False si ce contenu était déjà dans le magasin)."""
+        nom = hashlib.sha256(contenu).hexdigest() + extension(url)
+        chemin = self.chemin_objet(nom)
+        nouveau = not os.path.exists(chemin)
+        if nouveau:
+            _ecrire_atomique(chemin, contenu)
+        else:
+            metriques.compter("sprites_doublons")
+        _ecrire_atomique(self._chemin_url(url), nom.encode())
+        self._objets[url] = nom
+        return nom, nouveau
+
+    def _telecharger_un(self, ordonnanceur, url: str) -> tuple:
+        with metriques.etape("sprites"):
+            contenu = ordonnanceur.get(url, timeout=10).content
+        metriques.compter("sprites_telecharges")
+        metriques.compter("octets_sprites", len(contenu))
+        return self.ajouter(url, contenu)
+
+    def obtenir(self, url: str):
+        """Nom de l'objet d'une URL, téléchargé si besoin (un seul essai) ; None si indisponible."""
+        if not url:
+            return None
+        nom = self.objet(url)
+        if nom is not None or url in self._echecs:
+            return nom
+        with self._verrou:
+            if self._ordonnanceur is None:
+                from client import creer_session
+                from ordonnanceur import Ordonnanceur
+                self._ordonnanceur = Ordonnanceur(creer_session(), essais=1)
+        try:
+            return self._telecharger_un(self._ordonnanceur, url)[0]
+        except (OSError, ValueError):  # requests.RequestException hérite d'OSError
+            self._echecs.add(url)
+            return None
+
+    def telecharger(self, urls, workers: int = 8, progression: bool = False) -> dict:
+        """Télécharge en parallèle les sprites absents du magasin.
+
+        Retourne un résumé {"telecharges": n, "presents": n, "doublons": n, "echecs": {url: erreur}, "duree": s} ;
+        doublons compte les images téléchargées dont le contenu était déjà dans le magasin.
+        """
+        from client import creer_session
+        from ordonnanceur import Ordonnanceur
+
+        urls = list(dict.fromkeys(url for url in urls if url))
+        a_telecharger = [url for url in urls if self.objet(url) is None]
+        resume = {"telecharges": 0, "presents": len(urls) - len(a_telecharger), "doublons": 0, "echecs": {}}
+        debut = time.perf_counter()
+        session = creer_session(workers)
+        ordonnanceur = Ordonnanceur(session, concurrence=workers)
+        with session, ThreadPoolExecutor(max_workers=workers) as executeur:
+            futurs = {executeur.submit(self._telecharger_un, ordonnanceur, url): url for url in a_telecharger}
+            for n, futur in enumerate(as_completed(futurs), start=1):
+                try:
+                    resume["doublons"] += not futur.result()[1]
+                    resume["telecharges"] += 1
+                except (OSError, ValueError) as erreur:
+                    resume["echecs"][futurs[futur]] = str(erreur)
+                if progression:
+                    print(f"\r[{n}/{len(a_telecharger)}] sprites", end="", file=sys.stderr, flush=True)
+        if progression and a_telecharger:
+            print(file=sys.stderr)
+        resume["duree"] = time.perf_counter() - debut
+        return resume
+
+    def vignette(self, nom: str, taille: int):
+        """Miniature (taille x taille au plus) d'un objet, créée au besoin ; None sans Pillow."""
+        chemin = os.path.join(self.dossier, "vignettes", f"{os.path.splitext(nom)[0]}_{taille}.png")
+        if os.path.isfile(chemin):
+            return chemin
+        try:
+            from PIL import Image
+        except ImportError:
+            return None
+        with Image.open(self.chemin_objet(nom)) as image:
+            image.thumbnail((taille, taille))
+            dossier = os.path.dirname(chemin)
+            os.makedirs(dossier, exist_ok=True)
+            descripteur, temporaire = tempfile.mkstemp(prefix=".vignette.", suffix=".png", dir=dossier)
+            with os.fdopen(descripteur, "wb") as f:
+                image.save(f, "PNG", optimize=True)
+        os.replace(temporaire, chemin)
+        return chemin
+
+    def publier(self, nom: str, dossier_site: str, taille: int = None) -> str:
+        """Place l'objet (ou sa miniature) dans dossier_site/sprites/ et retourne le chemin publié."""
+        source = self.vignette(nom, taille) if taille else None
+        if source is None:
+            source = self.chemin_objet(nom)
+        cible = os.path.join(dossier_site, "sprites", os.path.basename(source))
+        if not os.path.exists(cible):
+            os.makedirs(os.path.dirname(cible), exist_ok=True)
+            try:
+                os.link(source, cible)
+            except FileExistsError:
+                pass
+            except OSError:  # autre système de fichiers, liens physiques interdits...
+                shutil.copyfile(source, cible)
+        return cible
+
+    def verifier(self) -> dict:
+        """Recalcule l'empreinte de chaque objet et supprime ceux qui ne correspondent plus à leur nom."""
+        resume = {"verifies": 0, "corrompus": []}
+        racine = os.path.join(self.dossier, "objets")
+        for dossier, _, fichiers in os.walk(racine):
+            for nom in fichiers:
+                if nom.startswith("."):
+                    continue
+                chemin = os.path.join(dossier, nom)
+                with open(chemin, "rb") as f:
+                    empreinte = hashlib.sha256(f.read()).hexdigest()
+                resume["verifies"] += 1
+                if empreinte != os.path.splitext(nom)[0]:
+                    os.unlink(chemin)
+                    resume["corrompus"].append(nom)
+        return resume
+
+
+_magasin = None
+_verrou_magasin = threading.Lock()
+
+
+def magasin_defaut() -> MagasinSprites:
+    global _magasin
+    with _verrou_magasin:
+        if _magasin is None:
+            _magasin = MagasinSprites()
+        return _magasin
+
+
+def source(url: str, dossier_page: str, dossier_site: str = None, taille: int = None) -> str:
+    """
+    Valeur de l'attribut src d'un sprite pour une page écrite dans dossier_page : le chemin relatif
+    de l'image publiée dans dossier_site/sprites/ (par défaut dossier_page), ou l'URL d'origine
+    si le sprite est indisponible (hors ligne, URL absente).
+    """
+    nom = magasin_defaut().obtenir(url)
+    if nom is None:
+        return url
+    publie = magasin_defaut().publier(nom, dossier_site or dossier_page, taille)
+    return os.path.relpath(publie, dossier_page).replace(os.sep, "/")
+
+
+def urls_sprites(ids: list, workers: int = 8) -> list:
+    """URL des sprites des Pokémon demandés (fiches compactes, téléchargées en parallèle si besoin)."""
+    from client import client_defaut
+    compacts = client_defaut().pokemons_compacts(ids, workers=workers)
+    return [compacts[str(i)]["sprites"]["front_default"] for i in ids if str(i) in compacts]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Télécharger les sprites des Pokémon dans le magasin local.")
+    parser.add_argument("ids", nargs="?", help="IDs, ex : 1-151,200,250-260")
+    parser.add_argument("--workers", type=int, default=8, help="Nombre de téléchargements simultanés")
+    parser.add_argument("--vignette", type=int, help="Créer aussi des miniatures de cette taille (Pillow)")
+    parser.add_argument("--verifier", action="store_true", help="Vérifier les images du magasin")
+    metriques.ajouter_option(parser)
+    args = parser.parse_args()
+    metriques.depuis_arguments(args)
+
+    magasin = magasin_defaut()
+    if args.verifier:
+        resume = magasin.verifier()
+        print(f"{resume['verifies']} images vérifiées, {len(resume['corrompus'])} corrompues supprimées.")
+        sys.exit(1 if resume["corrompus"] else 0)
+    if not args.ids:
+        parser.error("indiquer des IDs ou --verifier")
+
+    from pokefiche import analyser_ids
+    urls = urls_sprites(analyser_ids(args.ids), args.workers)
+    resume = magasin.telecharger(urls, args.workers, progression=True)
+    print(f"{resume['telecharges']} sprites téléchargés ({resume['doublons']} en double), "
+          f"{resume['presents']} déjà présents en {resume['duree']:.2f} s.")
+    for url, erreur in resume["echecs"].items():
+        print(f"Échec pour {url} : {erreur}", file=sys.stderr)
+    if args.vignette:
+        noms = {magasin.objet(url) for url in urls} - {None}
+        creees = [nom for nom in noms if magasin.vignette(nom, args.vignette)]
+        if len(creees) < len(noms):
+            print("Miniatures non créées : Pillow n'est pas installé.", file=sys.stderr)
+        else:
+            print(f"{len(creees)} miniatures de {args.vignette} px.")
+    sys.exit(1 if resume["echecs"] else 0)
@@ -0,0 +1,502 @@
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import argparse
+import tempfile
+import threading
+import metriques
+from collections import OrderedDict
+
+class EntreeCorrompue(ValueError):
+    """Entrée du cache vide, tronquée ou dont la somme de contrôle ne correspond pas."""
+
+    def __init__(self, cle: str, raison: str):
+        super().__init__(f"Entrée corrompue {cle} : {raison}")
+        self.cle = cle
+        self.raison = raison
+
+
+# ================================================
+# 1. STOCKAGE EN RÉPERTOIRE (un fichier JSON par ressource)
+# ================================================
+
+class StockageRepertoire:
+    """
+    Stocke chaque ressource dans son propre fichier : cache/{cle}.json.
+    Les écritures passent par un fichier temporaire renommé ensuite, pour qu'une interruption
+    ne laisse jamais de fichier tronqué. Un fichier vide ou illisible est déplacé dans
+    cache/quarantaine/ et traité comme absent, ce qui provoque son retéléchargement.
+    Les validateurs HTTP (ETag, Last-Modified) d'une entrée sont rangés dans cache/validateurs/.
+    """
+
+    def __init__(self, dossier: str = "cache"):
+        self.dossier = dossier
+        self.dossier_quarantaine = os.path.join(dossier, "quarantaine")
+        self.dossier_validateurs = os.path.join(dossier, "validateurs")
+        os.makedirs(dossier, exist_ok=True)
+
+    def _chemin(self, cle: str) -> str:
+        return os.path.join(self.dossier, f"{cle}.json")
+
+    def _chemin_validateurs(self, cle: str) -> str:
+        return os.path.join(self.dossier_validateurs, f"{cle}.json")
+
+    def contient(self, cle: str) -> bool:
+        return os.path.isfile(self._chemin(cle))
+
+    def _charger(self, cle: str):
+        """Lit et décode une entrée ; lève EntreeCorrompue si le fichier est vide ou illisible."""
+        try:
+            with open(self._chemin(cle), "rb") as f:
+                contenu = f.read()
+                horodatage = os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            return None
+        if not contenu:
+            raise EntreeCorrompue(cle, "fichier vide")
+        try:
+            return json.loads(contenu), horodatage, len(contenu)
+        except ValueError as erreur:
+            raise EntreeCorrompue(cle, str(erreur)) from erreur
+
+    def lire_entree(self, cle: str):
+        """Retourne (données, horodatage d'écriture, taille en octets), ou None si la clé est absente ou corrompue."""
+        try:
+            return self._charger(cle)
+        except EntreeCorrompue:
+            self.mettre_en_quarantaine(cle)
+            return None
+
+    def lire(self, cle: str):
+        """Retourne les données associées à la clé, ou None si elle est absente ou corrompue."""
+        entree = self.lire_entree(cle)
+        return entree[0] if entree is not None else None
+
+    def verifier_entree(self, cle: str) -> bool:
+        """Indique si l'entrée est lisible, sans la mettre en quarantaine."""
+        try:
+            return self._charger(cle) is not None
+        except EntreeCorrompue:
+            return False
+
+    def ecrire(self, cle: str, donnees: dict, validateurs: dict = None) -> None:
+        """Écrit une entrée ; validateurs : {"etag": ..., "modifie": ...} reçus avec la réponse."""
+        descripteur, temporaire = tempfile.mkstemp(prefix=f".{cle}.", suffix=".tmp", dir=self.dossier)
+        try:
+            with os.fdopen(descripteur, "w") as f:
+                json.dump(donnees, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporaire, self._chemin(cle))
+        except BaseException:
+            os.remove(temporaire)
+            raise
+        if validateurs:
+            os.makedirs(self.dossier_validateurs, exist_ok=True)
+            with open(self._chemin_validateurs(cle), "w") as f:
+                json.dump(validateurs, f)
+        else:
+            # Les validateurs d'une version précédente ne décrivent plus ces données
+            self._supprimer_validateurs(cle)
+
+    def lire_validateurs(self, cle: str):
+        """Retourne les validateurs HTTP enregistrés avec l'entrée, ou None."""
+        try:
+            with open(self._chemin_validateurs(cle), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _supprimer_validateurs(self, cle: str) -> None:
+        try:
+            os.remove(self._chemin_validateurs(cle))
+        except FileNotFoundError:
+            pass
+
+    def toucher(self, cle: str) -> None:
+        """Remet l'horodatage de l'entrée à maintenant (réponse 304 : les données sont toujours valides)."""
+        try:
+            os.utime(self._chemin(cle))
+        except FileNotFoundError:
+            pass
+
+    def mettre_en_quarantaine(self, cle: str, raison: str = "") -> None:
+        """Déplace une entrée corrompue dans cache/quarantaine/ pour pouvoir l'examiner plus tard."""
+        metriques.compter("cache_corrompues")
+        os.makedirs(self.dossier_quarantaine, exist_ok=True)
+        try:
+            os.replace(self._chemin(cle), os.path.join(self.dossier_quarantaine, f"{cle}.json"))
+        except FileNotFoundError:
+            pass
+        self._supprimer_validateurs(cle)
+
+    def lire_entrees(self, cles: list) -> dict:
+        """Lit plusieurs clés d'un coup : {cle: (données, horodatage, taille)}, sans les clés absentes ou corrompues."""
+        resultat = {}
+        for cle in cles:
+            entree = self.lire_entree(cle)
+            if entree is not None:
+                resultat[cle] = entree
+        return resultat
+
+    def lire_plusieurs(self, cles: list) -> dict:
+        """Lit plusieurs clés d'un coup. Les clés absentes ou corrompues ne sont pas dans le résultat."""
+        return {cle: entree[0] for cle, entree in self.lire_entrees(cles).items()}
+
+    def ecrire_plusieurs(self, elements: dict, validateurs: dict = None, horodatages: dict = None) -> None:
+        """Écrit plusieurs entrées ; horodatages : {cle: secondes} gardés à la place de maintenant (import)."""
+        validateurs = validateurs or {}
+        horodatages = horodatages or {}
+        for cle, donnees in elements.items():
+            self.ecrire(cle, donnees, validateurs.get(cle))
+            if horodatages.get(cle) is not None:
+                os.utime(self._chemin(cle), (horodatages[cle], horodatages[cle]))
+
+    def supprimer(self, cle: str) -> None:
+        if self.contient(cle):
+            os.remove(self._chemin(cle))
+        self._supprimer_validateurs(cle)
+
+    def cles(self) -> list:
+        return [nom[:-5] for nom in os.listdir(self.dossier) if nom.endswith(".json")]
+
+    def horodatages(self) -> dict:
+        """Horodatage d'écriture de chaque entrée, {cle: secondes}, sans lire les données."""
+        return {entree.name[:-5]: entree.stat().st_mtime
+                for entree in os.scandir(self.dossier) if entree.name.endswith(".json")}
+
+    def signature(self):
+        """Valeur qui change quand une entrée est ajoutée, remplacée ou supprimée (date du répertoire)."""
+        return os.stat(self.dossier).st_mtime_ns
+
+    def fermer(self) -> None:
+        pass
+
+
+# ================================================
+# 2. STOCKAGE SQLITE (un seul fichier indexé)
+# ================================================
+
+class StockageSQLite:
+    """
+    Stocke toutes les ressources dans une seule base SQLite indexée par clé.
+    Chaque écriture est une transaction, et une somme CRC32 du JSON est vérifiée à la lecture :
+    une entrée qui ne correspond pas est déplacée dans la table quarantaine et traitée comme absente.
+    Les validateurs HTTP (ETag, Last-Modified) sont gardés dans les colonnes etag et modifie.
+    """
+
+    def __init__(self, chemin: str = "cache.sqlite"):
+        self.chemin = chemin
+        self._verrou = threading.Lock()
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False)
+        self._connexion.execute("PRAGMA journal_mode=WAL")
+        self._connexion.execute("PRAGMA synchronous=NORMAL")
+        self._connexion.execute(
+            "CREATE TABLE IF NOT EXISTS entrees (cle TEXT PRIMARY KEY, donnees TEXT NOT NULL)"
+        )
+        self._connexion.execute(
+            "CREATE TABLE IF NOT EXISTS quarantaine (cle TEXT PRIMARY KEY, donnees TEXT, raison TEXT)"
+        )
+        # Ajout des colonnes aux bases créées par une version précédente
+        colonnes = [ligne[1] for ligne in self._connexion.execute("PRAGMA table_info(entrees)")]
+        if "horodatage" not in colonnes:
+            self._connexion.execute("ALTER TABLE entrees ADD COLUMN horodatage REAL NOT NULL DEFAULT 0")
+        if "somme" not in colonnes:
+            self._connexion.execute("ALTER TABLE entrees ADD COLUMN somme INTEGER")
+        if "etag" not in colonnes:
+            self._connexion.execute("ALTER TABLE entrees ADD COLUMN etag TEXT")
+            self._connexion.execute("ALTER TABLE entrees ADD COLUMN modifie TEXT")
+        self._connexion.commit()
+
+    def contient(self, cle: str) -> bool:
+        with self._verrou:
+            ligne = self._connexion.execute("SELECT 1 FROM entrees WHERE cle = ?", (cle,)).fetchone()
+        return ligne is not None
+
+    def _decoder(self, cle: str, texte: str, somme):
+        """Décode une entrée ; lève EntreeCorrompue si la somme ou le JSON ne sont pas valides."""
+        if somme is not None and zlib.crc32(texte.encode()) != somme:
+            raise EntreeCorrompue(cle, "somme de contrôle invalide")
+        try:
+            return json.loads(texte)
+        except ValueError as erreur:
+            raise EntreeCorrompue(cle, str(erreur)) from erreur
+
+    def lire_entree(self, cle: str):
+        """Retourne (données, horodatage d'écriture, taille en octets), ou None si la clé est absente ou corrompue."""
+        with self._verrou:
+            ligne = self._connexion.execute(
+                "SELECT donnees, horodatage, somme FROM entrees WHERE cle = ?", (cle,)
+            ).fetchone()
+        if ligne is None:
+            return None
+        try:
+            return self._decoder(cle, ligne[0], ligne[2]), ligne[1], len(ligne[0])
+        except EntreeCorrompue as erreur:
+            self.mettre_en_quarantaine(cle, erreur.raison)
+            return None
+
+    def lire(self, cle: str):
+        """Retourne les données associées à la clé, ou None si elle est absente ou corrompue."""
+        entree = self.lire_entree(cle)
+        return entree[0] if entree is not None else None
+
+    def verifier_entree(self, cle: str) -> bool:
+        """Indique si l'entrée est lisible, sans la mettre en quarantaine."""
+        with self._verrou:
+            ligne = self._connexion.execute(
+                "SELECT donnees, somme FROM entrees WHERE cle = ?", (cle,)
+            ).fetchone()
+        if ligne is None:
+            return False
+        try:
+            self._decoder(cle, ligne[0], ligne[1])
+            return True
+        except EntreeCorrompue:
+            return False
+
+    def ecrire(self, cle: str, donnees: dict, validateurs: dict = None) -> None:
+        """Écrit une entrée ; validateurs : {"etag": ..., "modifie": ...} reçus avec la réponse."""
+        self.ecrire_plusieurs({cle: donnees}, {cle: validateurs} if validateurs else None)
+
+    def lire_validateurs(self, cle: str):
+        """Retourne les validateurs HTTP enregistrés avec l'entrée, ou None."""
+        with self._verrou:
+            ligne = self._connexion.execute(
+                "SELECT etag, modifie FROM entrees WHERE cle = ?", (cle,)
+            ).fetchone()
+        if ligne is None or (ligne[0] is None and ligne[1] is None):
+            return None
+        return {"etag": ligne[0], "modifie": ligne[1]}
+
+    def toucher(self, cle: str) -> None:
+        """Remet l'horodatage de l'entrée à maintenant (réponse 304 : les données sont toujours valides)."""
+        with self._verrou, self._connexion:
+            self._connexion.execute("UPDATE entrees SET horodatage = ? WHERE cle = ?", (time.time(), cle))
+
+    def mettre_en_quarantaine(self, cle: str, raison: str = "") -> None:
+        """Déplace une entrée corrompue dans la table quarantaine."""
+        metriques.compter("cache_corrompues")
+        with self._verrou, self._connexion:
+            self._connexion.execute(
+                "INSERT OR REPLACE INTO quarantaine (cle, donnees, raison) "
+                "SELECT cle, donnees, ? FROM entrees WHERE cle = ?", (raison, cle)
+            )
+            self._connexion.execute("DELETE FROM entrees WHERE cle = ?", (cle,))
+
+    def lire_entrees(self, cles: list) -> dict:
+        """
+        Lit plusieurs clés en une requête par paquet de 500 : {cle: (données, horodatage, taille)}.
+        Les clés absentes ou corrompues ne sont pas dans le résultat.
+        """
+        cles = list(cles)
+        resultat = {}
+        for i in range(0, len(cles), 500):
+            paquet = cles[i:i + 500]
+            marques = ",".join("?" * len(paquet))
+            with self._verrou:
+                lignes = self._connexion.execute(
+                    f"SELECT cle, donnees, horodatage, somme FROM entrees WHERE cle IN ({marques})", paquet
+                ).fetchall()
+            for cle, texte, horodatage, somme in lignes:
+                try:
+                    resultat[cle] = self._decoder(cle, texte, somme), horodatage, len(texte)
+                except EntreeCorrompue as erreur:
+                    self.mettre_en_quarantaine(cle, erreur.raison)
+        return resultat
+
+    def lire_plusieurs(self, cles: list) -> dict:
+        """Lit plusieurs clés en une requête par paquet de 500. Les clés absentes ou corrompues ne sont pas dans le résultat."""
+        return {cle: entree[0] for cle, entree in self.lire_entrees(cles).items()}
+
+    def ecrire_plusieurs(self, elements: dict, validateurs: dict = None, horodatages: dict = None) -> None:
+        """
+        Écrit plusieurs entrées dans une seule transaction (validateurs : {cle: {"etag", "modifie"}}) ;
+        horodatages : {cle: secondes} gardés à la place de maintenant (import d'un instantané).
+        """
+        maintenant = time.time()
+        validateurs = validateurs or {}
+        horodatages = horodatages or {}
+        lignes = []
+        for cle, donnees in elements.items():
+            texte = json.dumps(donnees)
+            entetes = validateurs.get(cle) or {}
+            horodatage = horodatages.get(cle)
+            if horodatage is None:
+                horodatage = maintenant
+            lignes.append((cle, texte, horodatage, zlib.crc32(texte.encode()),
+                           entetes.get("etag"), entetes.get("modifie")))
+        with self._verrou, self._connexion:
+            self._connexion.executemany(
+                "INSERT OR REPLACE INTO entrees (cle, donnees, horodatage, somme, etag, modifie) "
+                "VALUES (?, ?, ?, ?, ?, ?)", lignes
+            )
+
+    def supprimer(self, cle: str) -> None:
+        with self._verrou, self._connexion:
+            self._connexion.execute("DELETE FROM entrees WHERE cle = ?", (cle,))
+
+    def cles(self) -> list:
+        with self._verrou:
+            return [ligne[0] for ligne in self._connexion.execute("SELECT cle FROM entrees")]
+
+    def horodatages(self) -> dict:
+        """Horodatage d'écriture de chaque entrée, {cle: secondes}, sans lire les données."""
+        with self._verrou:
+            return dict(self._connexion.execute("SELECT cle, horodatage FROM entrees"))
+
+    def signature(self):
+        """Valeur qui change quand une entrée est ajoutée, réécrite ou supprimée (nombre et dernier horodatage)."""
+        with self._verrou:
+            return tuple(self._connexion.execute("SELECT COUNT(*), MAX(horodatage) FROM entrees").fetchone())
+
+    def fermer(self) -> None:
+        with self._verrou:
+            self._connexion.close()
+
+
+# ================================================
+# 3. CACHE EN MÉMOIRE (LRU)
+# ================================================
+
+class CacheLRU:
+    """
+    Garde en mémoire les objets déjà lus, en évinçant les moins récemment utilisés
+    au-delà de max_entrees entrées ou de max_octets octets (taille JSON sur disque).
+    Les objets retournés sont partagés : ils ne doivent pas être modifiés par l'appelant.
+    """
+
+    def __init__(self, max_entrees: int = 2048, max_octets: int = None):
+        self.max_entrees = max_entrees
+        self.max_octets = max_octets
+        self.octets = 0
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def lire(self, cle: str):
+        """Retourne (données, horodatage) ou None, et marque l'entrée comme récemment utilisée."""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return None
+            self._entrees.move_to_end(cle)
+            return entree[0], entree[1]
+
+    def ajouter(self, cle: str, donnees: dict, horodatage: float, taille: int = 0) -> None:
+        with self._verrou:
+            ancienne = self._entrees.pop(cle, None)
+            if ancienne is not None:
+                self.octets -= ancienne[2]
+            self._entrees[cle] = (donnees, horodatage, taille)
+            self.octets += taille
+            while self._entrees and (
+                (self.max_entrees is not None and len(self._entrees) > self.max_entrees)
+                or (self.max_octets is not None and self.octets > self.max_octets)
+            ):
+                _, evincee = self._entrees.popitem(last=False)
+                self.octets -= evincee[2]
+
+    def retirer(self, cle: str) -> None:
+        with self._verrou:
+            ancienne = self._entrees.pop(cle, None)
+            if ancienne is not None:
+                self.octets -= ancienne[2]
+
+    def vider(self) -> None:
+        with self._verrou:
+            self._entrees.clear()
+            self.octets = 0
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+
+# ================================================
+# 4. CHOIX DU STOCKAGE
+# ================================================
+
+_stockage = None
+_verrou_stockage = threading.Lock()
+
+
+def ouvrir_stockage(type_stockage: str = None, chemin: str = None):
+    """
+    Ouvre un stockage. Le type est pris dans POKE_STOCKAGE ("repertoire" ou "sqlite") ;
+    à défaut, la base SQLite est utilisée si elle existe déjà, sinon le répertoire cache/.
+    Si POKE_INSTANTANE désigne un instantané (voir instantane.py), il est lu sur place
+    sous le stockage local, qui ne reçoit que les nouvelles écritures.
+    """
+    type_stockage = type_stockage or os.environ.get("POKE_STOCKAGE")
+    if type_stockage is None:
+        type_stockage = "sqlite" if os.path.isfile(chemin or "cache.sqlite") else "repertoire"
+
+    if type_stockage == "sqlite":
+        stockage = StockageSQLite(chemin or "cache.sqlite")
+    elif type_stockage == "repertoire":
+        stockage = StockageRepertoire(chemin or "cache")
+    else:
+        raise ValueError(f"Type de stockage inconnu : {type_stockage}")
+
+    if os.environ.get("POKE_INSTANTANE"):
+        from instantane import StockageInstantane, StockageSuperpose
+        return StockageSuperpose(stockage, StockageInstantane(os.environ["POKE_INSTANTANE"]))
+    return stockage
+
+
+def stockage_defaut():
+    """Retourne le stockage partagé par cache.py et pokestats.py (ouvert au premier appel)."""
+    global _stockage
+    with _verrou_stockage:
+        if _stockage is None:
+            _stockage = ouvrir_stockage()
+        return _stockage
+
+
+def cle_depuis_chemin(chemin_cache: str) -> str:
+    """Convertit un ancien chemin de cache (ex : cache/espece_1.json) en clé de stockage."""
+    nom = os.path.basename(chemin_cache)
+    if nom.endswith(".json"):
+        nom = nom[:-5]
+    return nom
+
+
+# ================================================
+# 5. MIGRATION
+# ================================================
+
+def migrer(dossier: str = "cache", base: str = "cache.sqlite", taille_paquet: int = 200) -> int:
+    """Importe tous les fichiers JSON de l'ancien répertoire cache/ dans la base SQLite."""
+    source = StockageRepertoire(dossier)
+    destination = StockageSQLite(base)
+    cles = source.cles()
+    importees = 0
+    for i in range(0, len(cles), taille_paquet):
+        paquet = {}
+        validateurs = {}
+        for cle in cles[i:i + taille_paquet]:
+            donnees = source.lire(cle)
+            if donnees is None:
+                print(f"Entrée illisible mise en quarantaine : {cle}", file=sys.stderr)
+            else:
+                paquet[cle] = donnees
+                validateurs[cle] = source.lire_validateurs(cle)
+        destination.ecrire_plusieurs(paquet, validateurs)
+        importees += len(paquet)
+    destination.fermer()
+    return importees
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gestion du stockage du cache.")
+    sous_commandes = parser.add_subparsers(dest="commande", required=True)
+    migration = sous_commandes.add_parser("migrer", help="Importer le répertoire cache/ dans la base SQLite")
+    migration.add_argument("--dossier", default="cache", help="Répertoire source")
+    migration.add_argument("--base", default="cache.sqlite", help="Base SQLite de destination")
+    args = parser.parse_args()
+
+    if args.commande == "migrer":
+        n = migrer(args.dossier, args.base)
+        print(f"{n} entrées importées dans {args.base}")
@@ -0,0 +1,199 @@
+import os
+import sys
+import argparse
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from client import client_defaut
+
+try:
+    import fcntl
+except ImportError:  # Windows : l'index n'est alors protégé qu'entre les threads d'un processus
+    fcntl = None
+
+# Clé de l'index dans le stockage du cache
+CLE_INDEX = "index_traductions"
+
+# Structure de l'index :
+# {"especes": {"1": {"fr": "Bulbizarre", "en": "Bulbasaur", ...}, ...},
+#  "types": {"grass": {"fr": "Plante", "en": "Grass", ...}, ...}}
+
+_index = None
+_version = 0  # incrémentée à chaque modification de l'index (voir version_index)
+_verrou = threading.Lock()
+
+
+def noms_par_langue(noms: list) -> dict:
+    """Convertit le champ names de PokéAPI en {langue: nom}."""
+    return {entree["language"]["name"]: entree["name"] for entree in noms}
+
+
+def charger_index() -> dict:
+    """Retourne l'index des traductions, lu une seule fois depuis le cache."""
+    global _index
+    with _verrou:
+        if _index is None:
+            _index = client_defaut().stockage.lire(CLE_INDEX) or {"especes": {}, "types": {}}
+        return _index
+
+
+def recharger_index() -> None:
+    """Oublie l'index en mémoire : il sera relu depuis le cache (modifié par un autre processus)."""
+    global _index, _version
+    with _verrou:
+        _index = None
+        _version += 1
+
+
+def version_index() -> int:
+    """Numéro qui change à chaque modification de l'index dans ce processus (index dérivés à reconstruire)."""
+    return _version
+
+
+def sauvegarder_index(index: dict) -> None:
+    client_defaut().stockage.ecrire(CLE_INDEX, index)
+
+
+@contextmanager
+def _verrou_processus():
+    """
+    Verrou exclusif entre processus (fichier verrou à côté du stockage) : les processus d'un lot
+    de fiches complètent l'index en même temps, chacun doit relire l'index avant de l'écrire.
+    """
+    stockage = client_defaut().stockage
+    stockage = getattr(stockage, "local", stockage)  # StockageSuperpose : seul le local est écrit
+    if fcntl is None:
+        yield
+        return
+    if hasattr(stockage, "dossier"):
+        chemin = os.path.join(stockage.dossier, f".{CLE_INDEX}.verrou")
+    else:
+        chemin = f"{stockage.chemin}.{CLE_INDEX}.verrou"
+    with open(chemin, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def construire_index(ids_especes=None, workers: int = 8) -> dict:
+    """
+    Construit l'index en une fois : toutes les espèces demandées (par défaut celles des
+    Pokémon déjà en cache) et tous les types, téléchargés en parallèle si besoin.
+    """
+    global _index, _version
+    client = client_defaut()
+    if ids_especes is None:
+        ids_especes = set()
+        for cle in client.stockage.cles():
+            if cle.startswith("espece_"):
+                ids_especes.add(cle[len("espece_"):])
+            elif cle.startswith("compact_"):
+                compact = client.stockage.lire(cle)
+                if compact:
+                    ids_especes.add(id_depuis_url(compact["species"]["url"]))
+
+    def recuperer(fonction, cle):
+        try:
+            return fonction(cle)
+        except (OSError, ValueError) as erreur:  # requests.RequestException hérite d'OSError
+            print(f"Traductions ignorées pour {cle} : {erreur}", file=sys.stderr)
+            return None
+
+    ids_especes = sorted({str(i) for i in ids_especes}, key=lambda i: (len(i), i))
+    with ThreadPoolExecutor(max_workers=workers) as executeur:
+        especes = list(executeur.map(lambda i: recuperer(client.espece, i), ids_especes))
+        noms_types = [t["name"] for t in client.liste_types()["results"]]
+        types = list(executeur.map(lambda nom: recuperer(client.type, nom), noms_types))
+
+    index = {
+        "especes": {i: noms_par_langue(e["names"]) for i, e in zip(ids_especes, especes) if e},
+        "types": {nom: noms_par_langue(t["names"]) for nom, t in zip(noms_types, types) if t},
+    }
+    with _verrou, _verrou_processus():
+        sauvegarder_index(index)
+        _index = index
+        _version += 1
+    return index
+
+
+def _fusionner(categorie: str, ajouts: dict) -> None:
+    """Ajoute des entrées ({cle: noms}) à une catégorie de l'index et l'écrit une seule fois."""
+    global _version
+    index = charger_index()
+    # Sous les verrous : un autre thread ne doit pas modifier l'index pendant son écriture, et
+    # les entrées ajoutées entre-temps par d'autres processus sont reprises depuis le disque
+    with _verrou, _verrou_processus():
+        sur_disque = client_defaut().stockage.lire(CLE_INDEX) or {}
+        for categorie_disque, entrees in sur_disque.items():
+            for cle_disque, noms_disque in entrees.items():
+                index.setdefault(categorie_disque, {}).setdefault(cle_disque, noms_disque)
+        index[categorie].update(ajouts)
+        sauvegarder_index(index)
+        _version += 1
+
+
+def _completer(categorie: str, cle: str, donnees: dict) -> dict:
+    """Ajoute une entrée manquante à l'index (cas rare : l'index n'a pas été reconstruit)."""
+    noms = noms_par_langue(donnees["names"])
+    _fusionner(categorie, {cle: noms})
+    return noms
+
+
+def completer_especes(ids_especes, workers: int = 8) -> int:
+    """
+    Ajoute à l'index, en une seule écriture, les espèces demandées qui n'y sont pas encore
+    (téléchargées en parallèle si besoin) ; les entrées déjà indexées sont gardées.
+    Retourne le nombre d'espèces ajoutées.
+    """
+    manquantes = sorted({str(i) for i in ids_especes} - set(charger_index()["especes"]), key=lambda i: (len(i), i))
+    if not manquantes:
+        return 0
+    client = client_defaut()
+    with ThreadPoolExecutor(max_workers=workers) as executeur:
+        especes = list(executeur.map(client.espece, manquantes))
+    _fusionner("especes", {i: noms_par_langue(e["names"]) for i, e in zip(manquantes, especes)})
+    return len(manquantes)
+
+
+def nom_espece(id_espece, langue: str = "fr") -> str:
+    """Retourne le nom d'une espèce dans la langue demandée, ou None si elle n'existe pas."""
+    id_espece = str(id_espece)
+    noms = charger_index()["especes"].get(id_espece)
+    if noms is None:
+        noms = _completer("especes", id_espece, client_defaut().espece(id_espece))
+    return noms.get(langue)
+
+
+def nom_type(type_pokemon: str, langue: str = "fr") -> str:
+    """Retourne le nom d'un type (nom anglais de l'API, ex : "grass") dans la langue demandée."""
+    noms = charger_index()["types"].get(type_pokemon)
+    if noms is None:
+        noms = _completer("types", type_pokemon, client_defaut().type(type_pokemon))
+    return noms.get(langue)
+
+
+def id_depuis_url(url: str) -> str:
+    """Extrait l'ID d'une URL de PokéAPI (ex : .../pokemon-species/25/ -> "25")."""
+    return url.rstrip("/").split("/")[-1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construire l'index des traductions.")
+    parser.add_argument("--especes", help="IDs d'espèces, ex : 1-1025 (par défaut : celles du cache)")
+    parser.add_argument("--workers", type=int, default=8, help="Nombre de téléchargements simultanés")
+    args = parser.parse_args()
+
+    ids = None
+    if args.especes:
+        ids = []
+        for morceau in args.especes.split(","):
+            if "-" in morceau:
+                debut, fin = map(int, morceau.split("-"))
+                ids.extend(range(debut, fin + 1))
+            else:
+                ids.append(int(morceau))
+
+    index = construire_index(ids, args.workers)
+    print(f"Index construit : {len(index['especes'])} espèces, {len(index['types'])} types", file=sys.stderr)